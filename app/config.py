@@ -20,13 +20,135 @@ class Settings:
     # External APIs
     OPEN_METEO_ELEVATION_URL = "https://api.open-meteo.com/v1/elevation"
     OPEN_METEO_FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
-    OVERPASS_API_URL = "http://overpass-api.de/api/interpreter"
+    # Miroirs Overpass (séparés par des virgules), essayés du plus fiable au plus rapide avec bascule
+    OVERPASS_API_URLS = [
+        url.strip()
+        for url in os.getenv(
+            "OVERPASS_API_URLS",
+            "https://overpass-api.de/api/interpreter,"
+            "https://overpass.kumi.systems/api/interpreter,"
+            "https://overpass.private.coffee/api/interpreter",
+        ).split(",")
+        if url.strip()
+    ]
+    # Quarantaine d'un miroir défaillant : doublée à chaque échec consécutif, bornée
+    OVERPASS_COOLDOWN_SECONDS = float(os.getenv("OVERPASS_COOLDOWN_SECONDS", "30"))
+    OVERPASS_MAX_COOLDOWN_SECONDS = float(os.getenv("OVERPASS_MAX_COOLDOWN_SECONDS", "600"))
+    # Emprises plus grandes découpées en sous-requêtes parallèles (côté max en mètres, parallélisme)
+    OVERPASS_SPLIT_CELL_METERS = float(os.getenv("OVERPASS_SPLIT_CELL_METERS", "4000"))
+    OVERPASS_SPLIT_CONCURRENCY = int(os.getenv("OVERPASS_SPLIT_CONCURRENCY", "4"))
+
+    # Client HTTP sortant partagé (keep-alive, HTTP/2 si disponible, concurrence par hôte)
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    HTTP_DEFAULT_PER_HOST_LIMIT = int(os.getenv("HTTP_DEFAULT_PER_HOST_LIMIT", "10"))
+    HTTP_PER_HOST_LIMITS = {
+        "overpass-api.de": 2,
+        "overpass.kumi.systems": 2,
+        "overpass.private.coffee": 2,
+        "nominatim.openstreetmap.org": 1,
+    }
+    # Intervalle minimal (secondes) entre deux requêtes vers un hôte : politique d'usage de Nominatim (1 req/s)
+    HTTP_PER_HOST_MIN_INTERVALS = {
+        "nominatim.openstreetmap.org": float(os.getenv("NOMINATIM_MIN_INTERVAL_SECONDS", "1.0")),
+    }
+
+    # Redis (caches partagés du Moteur d'Impact)
+    REDIS_URL = os.getenv("REDIS_URL")
+
+    # Cache tuilé des données OSM (grille fixe en degrés, mémoire + Redis)
+    OSM_TILE_CACHE_ENABLED = os.getenv("OSM_TILE_CACHE_ENABLED", "true").lower() == "true"
+    OSM_TILE_DEGREES = float(os.getenv("OSM_TILE_DEGREES", "0.025"))
+    OSM_TILE_TTL_SECONDS = int(os.getenv("OSM_TILE_TTL_SECONDS", str(7 * 24 * 3600)))
+    OSM_TILE_MEMORY_MAX_TILES = int(os.getenv("OSM_TILE_MEMORY_MAX_TILES", "2048"))
+
+    # Collecte OSM : "full" (tous les éléments du rayon Macro) ou "adaptive" (décomptes Macro
+    # via "out count", puis éléments détaillés seulement jusqu'au plus grand rayon utile)
+    OSM_FETCH_MODE = os.getenv("OSM_FETCH_MODE", "full")
+
+    # Index OSM hors ligne (.npz construit par scripts/build_osm_index.py) ; vide = désactivé
+    OSM_INDEX_PATH = os.getenv("OSM_INDEX_PATH", "")
+    # Résolutions H3 des décomptes pré-agrégés de l'index (7 ≈ 1,4 km, 9 ≈ 200 m de côté)
+    OSM_CELL_RESOLUTIONS = tuple(int(res) for res in os.getenv("OSM_CELL_RESOLUTIONS", "7,9").split(","))
+
+    # Raster de population maillé (GeoTIFF/COG en WGS84, habitants par pixel) ; vide = estimation par bâtiments OSM
+    POPULATION_RASTER_PATH = os.getenv("POPULATION_RASTER_PATH", "")
+    # Sous-points par côté de pixel pour la couverture des pixels de bord du disque
+    POPULATION_RASTER_SUBSAMPLES = int(os.getenv("POPULATION_RASTER_SUBSAMPLES", "4"))
+
+    # Tuiles d'altitude SRTM locales (.hgt, scripts/fetch_dem_tiles.py) ; vide = pente via Open-Meteo/GEE
+    DEM_TILE_DIR = os.getenv("DEM_TILE_DIR", "")
+    # Nombre de tuiles gardées projetées en mémoire
+    DEM_MAX_OPEN_TILES = int(os.getenv("DEM_MAX_OPEN_TILES", "16"))
+    # Source des tuiles compressées ({lat_dir} = N12, {name} = N12W009)
+    DEM_TILE_URL = os.getenv("DEM_TILE_URL", "https://s3.amazonaws.com/elevation-tiles-prod/skadi/{lat_dir}/{name}.hgt.gz")
     
     # Earth Engine
     # Earth Engine
     GEE_PROJECT_ID = os.getenv("GEE_PROJECT_ID", "votre-id-de-projet")
     GEE_SERVICE_ACCOUNT_FILE = os.getenv("GEE_SERVICE_ACCOUNT_FILE", "gee-key.json")
 
+    # Budget temporel d'une analyse (secondes) et part maximale accordée à chaque fournisseur
+    ANALYSIS_DEADLINE_SECONDS = float(os.getenv("ANALYSIS_DEADLINE_SECONDS", "25"))
+    PROVIDER_MIN_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_MIN_TIMEOUT_SECONDS", "1.0"))
+    PROVIDER_BUDGET_SHARES = {
+        "classification": 0.6,
+        "osm": 0.5,
+        "osm_detail": 0.5,
+        "satellite": 0.4,
+        "slope": 0.3,
+        "weather": 0.2,
+        "geocoding": 0.2,
+    }
+
+    # Regroupement des appels fournisseurs identiques en cours (précision des coordonnées de la clé)
+    SINGLEFLIGHT_COORD_DECIMALS = int(os.getenv("SINGLEFLIGHT_COORD_DECIMALS", "4"))
+
+    # Cache des résultats d'analyse (hash de l'image + position + version de la taxonomie) dans Redis
+    RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(24 * 3600)))
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+    # 5 décimales (~1 m) : une nouvelle tentative du même client renvoie les mêmes coordonnées
+    RESULT_CACHE_COORD_DECIMALS = int(os.getenv("RESULT_CACHE_COORD_DECIMALS", "5"))
+
+    # Tâches d'analyse asynchrones (/analyze/jobs) : conservation dans Redis et notification webhook
+    ANALYSIS_JOB_TTL_SECONDS = int(os.getenv("ANALYSIS_JOB_TTL_SECONDS", str(7 * 24 * 3600)))
+    ANALYSIS_JOB_WEBHOOK_RETRIES = int(os.getenv("ANALYSIS_JOB_WEBHOOK_RETRIES", "3"))
+    # Domaines autorisés pour les webhooks (sous-domaines inclus), séparés par des virgules ; vide = tout hôte public
+    ANALYSIS_JOB_WEBHOOK_ALLOWED_HOSTS = tuple(
+        host.strip().lower() for host in os.getenv("ANALYSIS_JOB_WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()
+    )
+
+    # Météo : cache par cellule de grille (0,1° ≈ 10 km) et tranche de temps, requêtes Open-Meteo multi-points
+    WEATHER_CELL_DEGREES = float(os.getenv("WEATHER_CELL_DEGREES", "0.1"))
+    WEATHER_BUCKET_SECONDS = int(os.getenv("WEATHER_BUCKET_SECONDS", "900"))
+    # Attente avant l'envoi d'une requête groupée, et nombre maximal de points par requête
+    WEATHER_BATCH_WINDOW_SECONDS = float(os.getenv("WEATHER_BATCH_WINDOW_SECONDS", "0.05"))
+    WEATHER_BATCH_MAX_LOCATIONS = int(os.getenv("WEATHER_BATCH_MAX_LOCATIONS", "50"))
+
+    # Géocodage inverse hors ligne (GeoJSON des limites administratives et localités) ; vide = Nominatim seul
+    GEOCODER_BOUNDARIES_PATH = os.getenv("GEOCODER_BOUNDARIES_PATH", "")
+    # admin_level OSM du pays, de la région, du cercle et de la commune
+    GEOCODER_ADMIN_LEVELS = tuple(int(level) for level in os.getenv("GEOCODER_ADMIN_LEVELS", "2,4,6,8").split(","))
+    # Distance maximale à une localité pour la retenir comme ville du point
+    GEOCODER_LOCALITY_MAX_METERS = float(os.getenv("GEOCODER_LOCALITY_MAX_METERS", "3000"))
+
+    # Durée de conservation en mémoire du contexte administratif (Nominatim) d'un lieu
+    GEOCODING_CACHE_TTL_SECONDS = int(os.getenv("GEOCODING_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+    # Courbe d'exposition (/analyze/exposure) : conservation en mémoire des décomptes cumulés d'un point
+    EXPOSURE_CACHE_TTL_SECONDS = int(os.getenv("EXPOSURE_CACHE_TTL_SECONDS", "3600"))
+    EXPOSURE_MAX_POINTS = int(os.getenv("EXPOSURE_MAX_POINTS", "1000"))
+
+    # Analyse par lot (/analyze/batch)
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+    BATCH_CONTEXT_CONCURRENCY = int(os.getenv("BATCH_CONTEXT_CONCURRENCY", "2"))
+    # Taille (en degrés) de la cellule de regroupement des incidents voisins (~1.1 km)
+    BATCH_CLUSTER_CELL_DEGREES = float(os.getenv("BATCH_CLUSTER_CELL_DEGREES", "0.01"))
+
     # Social Vulnerability Weights
     SOCIAL_WEIGHTS = {
         "health_centers": 3.0,
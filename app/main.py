@@ -1,31 +1,67 @@
 import asyncio
+import json
 import logging
+import math
 import time
+from collections import defaultdict
+from contextlib import ExitStack, asynccontextmanager
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from typing import Optional, Dict
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from typing import Optional, Dict, Any, List, Tuple
 
-from app.schemas import AnalyzeRequest, AnalyzeResponse, SpatialData, SatelliteData, HumanImpact, ChatRequest
+from app.schemas import (
+    AnalyzeRequest,
+    AnalyzeResponse,
+    AnalyzeJobRequest,
+    AnalyzeJobStatus,
+    ChatRequest,
+    ExposureCurveRequest,
+    ExposureCurveResponse,
+)
 from app.config import settings
-from app.services.ai_service import analyze_image_with_gemini, analyze_image_bytes_with_gemini, call_deepseek_chat
-from app.services.spatial_calculator import (
-    get_slope_data, 
-    get_osm_data, 
-    get_weather_data,
-    filter_osm_by_radius,
-    calculate_social_vulnerability,
-    calculate_human_impact,
-    get_satellite_analysis,
-    get_geocoding_context
+from app.services.ai_service import call_deepseek_chat
+from app.services.spatial_calculator import filter_osm_by_radius, haversine_distance
+from app.services.deadline import AnalysisDeadline
+from app.services.analysis_jobs import FAILED, create_job, get_job, job_status, update_job
+from app.services.celery import run_analysis_job
+from app.services.http_client import start_http_client, close_http_client
+from app.services.osm_index import load_osm_index
+from app.services.reverse_geocoder import get_offline_geocoder, reverse_geocode_many
+from app.services.impact_pipeline import (
+    GEO_STAGES,
+    MACRO_OSM_RADIUS,
+    RESPONSE_SECTIONS,
+    analyze_image_upload,
+    analyze_url_request,
+    collect_geo_context,
+    exposure_curve,
+    impact_graph,
+    pipeline_inputs,
+    run_pipeline,
 )
-from app.impact_logic import calculate_dynamic_radius, calculate_global_impact
+from app.services.metrics import CONTENT_TYPE_LATEST, RESULT_CACHE_REQUESTS, render_metrics, track_analysis
+from app.services.result_cache import get_cached_result, image_digest, result_cache_key, store_result
+from app.services.weather_service import weather_service
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Map Action Impact Engine")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ouvre le client HTTP partagé (et charge l'index OSM et le géocodeur hors ligne) au démarrage,
+    libère les connexions à l'arrêt.
+    """
+    await start_http_client()
+    await asyncio.to_thread(load_osm_index)
+    await asyncio.to_thread(get_offline_geocoder)
+    yield
+    await close_http_client()
+
+app = FastAPI(title="Map Action Impact Engine", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,139 +75,10 @@ app.add_middleware(
 def read_root():
     return {"message": "Welcome to Map Action Impact Engine"}
 
-def _subtract_human_impact(total: Dict[str, int], direct: Dict[str, int]) -> Dict[str, int]:
-    """Retourne la population de l'anneau indirect sans double compter le rayon direct."""
-    keys = [
-        "total_population_exposed",
-        "adult_men_exposed",
-        "adult_women_exposed",
-        "children_exposed",
-        "maternities_count",
-        "nurseries_count",
-    ]
-    return {key: max(0, total.get(key, 0) - direct.get(key, 0)) for key in keys}
-
-def _subtract_structure_counts(total: Dict[str, int], direct: Dict[str, int]) -> Dict[str, int]:
-    """Retourne les structures de l'anneau indirect sans double compter le rayon direct."""
-    keys = set(total) | set(direct)
-    return {key: max(0, total.get(key, 0) - direct.get(key, 0)) for key in keys}
-
-async def _run_analysis(ai_data, latitude: float, longitude: float, incident_id: str = None) -> AnalyzeResponse:
-    """Logique d'analyse partagée entre les endpoints URL et Upload."""
-    
-    # 1. Phase 1 : Collecte du contexte Macro (Rayon fixe 5km pour OSM)
-    slope_result, osm_macro_result, sat_result, weather_result, geo_context = await asyncio.gather(
-        asyncio.to_thread(get_slope_data, latitude, longitude),
-        asyncio.to_thread(get_osm_data, latitude, longitude, 5000), # 5km macro scan
-        asyncio.to_thread(get_satellite_analysis, latitude, longitude),
-        asyncio.to_thread(get_weather_data, latitude, longitude),
-        asyncio.to_thread(get_geocoding_context, latitude, longitude)
-    )
-
-    spatial_data = {
-        "elevation": 0.0,
-        "slope_percent": slope_result,
-        "wind_speed": weather_result["wind_speed"],
-        "precipitation": weather_result["precipitation"],
-        "temperature_celsius": weather_result["temperature_celsius"]
-    }
-
-    # 2. Phase 2 : Calcul dynamique du rayon final (Analyse Croisée)
-    radius_data = calculate_dynamic_radius(
-        ai_data=ai_data,
-        spatial_data=spatial_data,
-        macro_osm_counts=osm_macro_result["counts"],
-        sat_data=sat_result
-    )
-    final_radius = radius_data["final_radius"]
-    radius_exp = radius_data.get("radius_explanation", "")
-
-    # 3. Phase 3 : Calcul des scores sociaux et humains
-    osm_micro_counts = filter_osm_by_radius(osm_macro_result, latitude, longitude, final_radius)
-    social_data = calculate_social_vulnerability(
-        osm_micro_counts,
-        land_use=sat_result.get("land_use", "Inconnu"),
-        radius_meters=final_radius,
-    )
-    social_score = social_data["score"]
-    is_probabilistic = social_data["is_probabilistic"]
-    estimated_buildings = social_data.get("estimated_buildings", 0)
-    human_impact_data = calculate_human_impact(osm_micro_counts, estimated_buildings=estimated_buildings)
-
-    # 4. Phase 4 : Calcul de la population indirectement concernée par vigilance sanitaire
-    indirect_vigilance_data = radius_data.get("indirect_vigilance")
-    indirect_human_impact_data = None
-    indirect_social_counts = None
-    is_indirect_probabilistic = False
-    indirect_radius = None
-    indirect_exp = None
-    if indirect_vigilance_data:
-        indirect_radius = indirect_vigilance_data["potential_radius"]
-        indirect_exp = indirect_vigilance_data["message"]
-        osm_indirect_counts = filter_osm_by_radius(osm_macro_result, latitude, longitude, indirect_radius)
-        social_indirect = calculate_social_vulnerability(
-            osm_indirect_counts,
-            land_use=sat_result.get("land_use", "Inconnu"),
-            radius_meters=indirect_radius,
-        )
-        is_indirect_probabilistic = social_indirect["is_probabilistic"]
-        human_indirect_total = calculate_human_impact(
-            osm_indirect_counts,
-            estimated_buildings=social_indirect.get("estimated_buildings"),
-        )
-        indirect_human_impact_data = _subtract_human_impact(human_indirect_total, human_impact_data)
-        indirect_social_counts = _subtract_structure_counts(osm_indirect_counts, osm_micro_counts)
-
-    # 5. Phase 5 : Calcul du risque potentiel (Si détecté)
-    potential_risk_data = radius_data.get("potential_risk")
-    if potential_risk_data:
-        pot_radius = potential_risk_data["potential_radius"]
-        osm_pot_counts = filter_osm_by_radius(osm_macro_result, latitude, longitude, pot_radius)
-        social_pot = calculate_social_vulnerability(
-            osm_pot_counts,
-            land_use=sat_result.get("land_use", "Inconnu"),
-            radius_meters=pot_radius,
-        )
-        human_pot = calculate_human_impact(osm_pot_counts, estimated_buildings=social_pot.get("estimated_buildings"))
-        
-        potential_risk_data["stats"] = {
-            "total_pop": human_pot["total_population_exposed"],
-            "infrastructures": sum(v for k,v in osm_pot_counts.items() if k != "residential_buildings")
-        }
-
-    # 6. Phase 6 : Calcul du score d'impact global et réponse
-    impact_data = calculate_global_impact(
-        ai_data=ai_data,
-        sat_data=sat_result,
-        spatial_data=spatial_data,
-        social_score=social_score
-    )
-
-    return AnalyzeResponse(
-        incident_id=incident_id,
-        latitude=latitude,
-        longitude=longitude,
-        ai_analysis=ai_data,
-        topography=SpatialData(**spatial_data),
-        satellite=SatelliteData(**sat_result),
-        social_data=osm_micro_counts,
-        indirect_social_data=indirect_social_counts,
-        social_vulnerability_score=social_score,
-        is_social_probabilistic=is_probabilistic,
-        is_indirect_social_probabilistic=is_indirect_probabilistic,
-        human_impact=HumanImpact(**human_impact_data),
-        indirect_human_impact=HumanImpact(**indirect_human_impact_data) if indirect_human_impact_data else None,
-        impact_radius_meters=final_radius,
-        indirect_vigilance_radius_meters=indirect_radius,
-        indirect_vigilance_explanation=indirect_exp,
-        radius_explanation=radius_exp,
-        global_impact_score=impact_data["impact_score"],
-        base_severity=settings.INCIDENT_TAXONOMY.get(ai_data.macro_category, {}).get(ai_data.sub_category, {}).get("base_severity", 5),
-        impact_tags=settings.INCIDENT_TAXONOMY.get(ai_data.macro_category, {}).get(ai_data.sub_category, {}).get("impact_tags", []),
-        geocoding=geo_context,
-        potential_risk=potential_risk_data,
-        recommendation=f"Intervention directe recommandée dans un rayon de {final_radius}m. Score de gravité: {impact_data['impact_score']}/10."
-    )
+@app.get("/metrics")
+def metrics():
+    """Expose les métriques Prometheus (durées par phase et par fournisseur, replis, analyses en cours)."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 @app.post("/analyze", response_model=AnalyzeResponse)
 async def analyze_incident(request: AnalyzeRequest):
@@ -179,32 +86,261 @@ async def analyze_incident(request: AnalyzeRequest):
     start_time = time.time()
     logger.info(f"Analyse via URL pour incident: {request.incident_id}")
 
-    ai_data = await asyncio.to_thread(analyze_image_with_gemini, request.image_url)
-    result = await _run_analysis(ai_data, request.latitude, request.longitude, request.incident_id)
+    with track_analysis("analyze"):
+        result = await analyze_url_request(request)
 
     logger.info(f"Analyse terminée en {time.time() - start_time:.2f}s")
     return result
 
+@app.post("/analyze/jobs", response_model=AnalyzeJobStatus, status_code=202)
+async def submit_analysis_job(request: AnalyzeJobRequest):
+    """
+    Endpoint pour soumettre une analyse asynchrone : la demande est enregistrée et mise en file,
+    l'identifiant de tâche est retourné immédiatement. Le résultat est consultable via
+    GET /analyze/jobs/{job_id} et, si `webhook_url` est fourni, envoyé par POST à la fin de l'analyse.
+    """
+    job = await asyncio.to_thread(create_job, request)
+    if job is None:
+        raise HTTPException(status_code=503, detail="File des tâches d'analyse indisponible.")
+    try:
+        run_analysis_job.delay(job["job_id"])
+    except Exception as e:
+        logger.error(f"Impossible de mettre en file la tâche {job['job_id']} : {e}")
+        await asyncio.to_thread(update_job, job, status=FAILED, error="Mise en file impossible.")
+        raise HTTPException(status_code=503, detail="File des tâches d'analyse indisponible.")
+    logger.info(f"Tâche d'analyse {job['job_id']} en file pour incident: {request.incident_id}")
+    return job_status(job)
+
+@app.get("/analyze/jobs/{job_id}", response_model=AnalyzeJobStatus)
+async def get_analysis_job(job_id: str):
+    """Endpoint pour consulter le statut et le résultat d'une tâche d'analyse asynchrone."""
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tâche d'analyse introuvable ou expirée.")
+    return job_status(job)
+
+@app.post("/analyze/exposure", response_model=ExposureCurveResponse)
+async def analyze_exposure_curve(request: ExposureCurveRequest):
+    """
+    Endpoint pour la courbe d'exposition : population et structures exposées pour chaque rayon
+    (par pas de `step_meters`) jusqu'au rayon Macro, pour le curseur de rayon d'intervention.
+    """
+    max_radius = request.max_radius_meters or MACRO_OSM_RADIUS
+    if max_radius > MACRO_OSM_RADIUS:
+        raise HTTPException(status_code=422, detail=f"Le rayon maximal ne peut dépasser le rayon Macro ({MACRO_OSM_RADIUS}m).")
+    if max_radius / request.step_meters > settings.EXPOSURE_MAX_POINTS:
+        raise HTTPException(status_code=422, detail=f"La courbe est limitée à {settings.EXPOSURE_MAX_POINTS} rayons : augmentez le pas.")
+    with track_analysis("exposure"):
+        return await exposure_curve(request.latitude, request.longitude, request.step_meters, max_radius)
+
 @app.post("/analyze/upload", response_model=AnalyzeResponse)
 async def analyze_incident_upload(
+    response: Response,
     image: UploadFile = File(...),
     latitude: float = Form(...),
     longitude: float = Form(...),
-    incident_id: Optional[str] = Form(None)
+    incident_id: Optional[str] = Form(None),
+    bypass_cache: bool = Form(False),
 ):
-    """Endpoint pour analyser un incident via upload direct d'image."""
+    """
+    Endpoint pour analyser un incident via upload direct d'image.
+    Une même image envoyée au même endroit (nouvelle tentative après coupure réseau) renvoie le
+    résultat en cache; `bypass_cache=true` force une nouvelle analyse. L'en-tête `X-Result-Cache`
+    indique HIT, MISS ou BYPASS.
+    """
     start_time = time.time()
     logger.info(f"Analyse via Upload pour ({latitude}, {longitude})")
 
     image_bytes = await image.read()
     mime_type = image.content_type or "image/jpeg"
 
-    ai_data = await asyncio.to_thread(analyze_image_bytes_with_gemini, image_bytes, mime_type)
-    result = await _run_analysis(ai_data, latitude, longitude, incident_id)
+    cache_key = result_cache_key(image_digest(image_bytes), latitude, longitude)
+    if bypass_cache:
+        RESULT_CACHE_REQUESTS.labels("bypass").inc()
+        response.headers["X-Result-Cache"] = "BYPASS"
+    else:
+        cached = await asyncio.to_thread(get_cached_result, cache_key, incident_id)
+        if cached is not None:
+            logger.info(f"Résultat servi depuis le cache pour ({latitude}, {longitude})")
+            response.headers["X-Result-Cache"] = "HIT"
+            return cached
+        response.headers["X-Result-Cache"] = "MISS"
+
+    with track_analysis("upload"):
+        result = await analyze_image_upload(image_bytes, mime_type, latitude, longitude, incident_id)
+    await asyncio.to_thread(store_result, cache_key, result)
 
     logger.info(f"Analyse terminée en {time.time() - start_time:.2f}s")
     return result
 
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _stage_payload(stage: str, value: Any) -> Any:
+    """Charge utile publiée pour une étape de collecte terminée."""
+    if stage == "classification":
+        return value.model_dump()
+    if stage == "osm":
+        return {"counts": value["counts"]}
+    return value
+
+async def _stream_analysis(request: AnalyzeRequest):
+    """
+    Analyse un incident en publiant un événement SSE par étape dès qu'elle est disponible :
+    classification, pente, OSM, satellite, météo, géocodage, puis rayon, impact humain et score dès que
+    leurs étapes sont terminées, et enfin le résultat complet.
+    """
+    start_time = time.time()
+    initial = pipeline_inputs(
+        request.latitude, request.longitude, request.incident_id, image_source={"url": request.image_url}
+    )
+    stages = impact_graph.iterate(initial, targets=("response",))
+    try:
+        with track_analysis("stream"):
+            result = None
+            values: Dict[str, Any] = {}
+            pending_sections = list(RESPONSE_SECTIONS)
+            async for stage, value in stages:
+                values[stage] = value
+                if stage == "response":
+                    result = value
+                elif stage == "classification" or stage in GEO_STAGES:
+                    logger.info(f"Flux : étape '{stage}' disponible après {time.time() - start_time:.2f}s")
+                    yield _sse_event(stage, _stage_payload(stage, value))
+                # Chaque section est publiée dès que ses étapes sont terminées, sans attendre la réponse finale
+                for section in list(pending_sections):
+                    name, inputs, build = section
+                    if not all(key in values for key in inputs):
+                        continue
+                    pending_sections.remove(section)
+                    logger.info(f"Flux : section '{name}' disponible après {time.time() - start_time:.2f}s")
+                    yield _sse_event(name, jsonable_encoder(build(*(values[key] for key in inputs))))
+
+            payload = result.model_dump(mode="json")
+            yield _sse_event("result", payload)
+            logger.info(f"Analyse (flux) terminée en {time.time() - start_time:.2f}s")
+    except Exception as e:
+        logger.error(f"Erreur pendant l'analyse en flux : {e}")
+        yield _sse_event("error", {"detail": str(e)})
+    finally:
+        await stages.aclose()
+
+@app.post("/analyze/stream")
+async def analyze_incident_stream(request: AnalyzeRequest):
+    """Endpoint pour analyser un incident via URL d'image avec publication progressive (Server-Sent Events)."""
+    logger.info(f"Analyse en flux pour incident: {request.incident_id}")
+    return StreamingResponse(_stream_analysis(request), media_type="text/event-stream")
+
+def _cluster_batch_requests(requests: List[AnalyzeRequest]) -> List[List[int]]:
+    """Regroupe les indices des incidents d'un lot par cellule de grille (incidents voisins)."""
+    cell = settings.BATCH_CLUSTER_CELL_DEGREES
+    clusters: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for index, item in enumerate(requests):
+        key = (math.floor(item.latitude / cell), math.floor(item.longitude / cell))
+        clusters[key].append(index)
+    return list(clusters.values())
+
+def _cluster_geometry(points: List[Tuple[float, float]]) -> Tuple[float, float, int]:
+    """Retourne le centre d'un groupe et le rayon OSM couvrant le scan macro de chacun de ses membres."""
+    center_lat = sum(lat for lat, _ in points) / len(points)
+    center_lon = sum(lon for _, lon in points) / len(points)
+    spread = max(haversine_distance(center_lat, center_lon, lat, lon) for lat, lon in points)
+    return center_lat, center_lon, MACRO_OSM_RADIUS + int(math.ceil(spread))
+
+def _member_geo_context(
+    shared: Dict[str, Any], latitude: float, longitude: float, geocoding: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Adapte le contexte partagé d'un groupe à un incident : décomptes macro recentrés sur son point
+    et, s'il a été résolu hors ligne, contexte administratif propre (sinon celui du centre du groupe).
+    """
+    shared_osm = shared["osm"]
+    macro_counts = filter_osm_by_radius(shared_osm, latitude, longitude, MACRO_OSM_RADIUS)
+    context = {**shared, "osm": {"counts": macro_counts, "elements": shared_osm.get("elements", [])}}
+    if geocoding is not None:
+        context["geocoding"] = geocoding
+        context["degraded"] = [name for name in shared.get("degraded", []) if name != "geocoding"]
+    return context
+
+async def _stream_batch_analysis(requests: List[AnalyzeRequest]):
+    """Analyse un lot d'incidents et produit une ligne NDJSON par incident dès qu'il est terminé."""
+    start_time = time.time()
+    analysis_semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+    context_semaphore = asyncio.Semaphore(settings.BATCH_CONTEXT_CONCURRENCY)
+    context_tasks: Dict[int, asyncio.Task] = {}
+    member_cluster: Dict[int, int] = {}
+
+    async def fetch_cluster_context(indices: List[int]) -> Dict[str, Any]:
+        center_lat, center_lon, osm_radius = _cluster_geometry(
+            [(requests[i].latitude, requests[i].longitude) for i in indices]
+        )
+        async with context_semaphore:
+            logger.info(f"Lot : contexte partagé pour {len(indices)} incident(s) autour de ({center_lat:.5f}, {center_lon:.5f}), rayon OSM {osm_radius}m")
+            # Contexte partagé par tout le groupe : éléments complets, refiltrés pour chaque membre
+            return await collect_geo_context(center_lat, center_lon, osm_radius, deadline=AnalysisDeadline(), osm_mode="full")
+
+    # Géocodage hors ligne de tous les incidents du lot en une seule requête vectorisée
+    local_geocoding = asyncio.create_task(
+        asyncio.to_thread(reverse_geocode_many, [(item.latitude, item.longitude) for item in requests])
+    )
+    clusters = _cluster_batch_requests(requests)
+    # Météo de tous les groupes demandée en une requête multi-points, sans attendre les collectes de contexte
+    weather_service.prefetch(
+        _cluster_geometry([(requests[i].latitude, requests[i].longitude) for i in indices])[:2] for indices in clusters
+    )
+    for cluster_id, indices in enumerate(clusters):
+        context_tasks[cluster_id] = asyncio.create_task(fetch_cluster_context(indices))
+        for index in indices:
+            member_cluster[index] = cluster_id
+
+    async def analyze_item(index: int) -> Dict[str, Any]:
+        item = requests[index]
+        try:
+            with ExitStack() as tracking:
+                async with analysis_semaphore:
+                    # Suivi et échéance démarrent une fois le créneau obtenu : l'attente dans la file
+                    # n'est ni comptée parmi les analyses en cours ni décomptée du budget
+                    tracking.enter_context(track_analysis("batch"))
+                    initial = pipeline_inputs(
+                        item.latitude, item.longitude, item.incident_id, image_source={"url": item.image_url}
+                    )
+                    classified = await impact_graph.run(initial, targets=("classification",))
+                shared_context = await context_tasks[member_cluster[index]]
+                geocoded = (await asyncio.shield(local_geocoding))[index]
+                geo_context = _member_geo_context(shared_context, item.latitude, item.longitude, geocoded)
+                result = await run_pipeline(pipeline_inputs(
+                    item.latitude, item.longitude, item.incident_id, deadline=initial["deadline"],
+                    classification=classified["classification"], **geo_context,
+                ))
+            return {"index": index, "incident_id": item.incident_id, "status": "ok", "result": result.model_dump(mode="json")}
+        except Exception as e:
+            logger.error(f"Erreur d'analyse du lot (index {index}) : {e}")
+            return {"index": index, "incident_id": item.incident_id, "status": "error", "detail": str(e)}
+
+    item_tasks = [asyncio.create_task(analyze_item(index)) for index in range(len(requests))]
+    try:
+        for next_done in asyncio.as_completed(item_tasks):
+            line = await next_done
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+    finally:
+        for task in item_tasks + list(context_tasks.values()) + [local_geocoding]:
+            task.cancel()
+        logger.info(f"Lot de {len(requests)} incident(s) ({len(clusters)} contexte(s) partagé(s)) terminé en {time.time() - start_time:.2f}s")
+
+@app.post("/analyze/batch")
+async def analyze_incident_batch(requests: List[AnalyzeRequest]):
+    """
+    Endpoint pour analyser un lot d'incidents via URL d'image.
+    Les incidents voisins partagent une seule collecte de contexte (Overpass, météo, GEE, Nominatim).
+    Les résultats sont renvoyés en NDJSON, dans l'ordre d'achèvement (champ `index` = position dans le lot).
+    """
+    if not requests:
+        raise HTTPException(status_code=422, detail="Le lot d'incidents est vide.")
+    if len(requests) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Le lot dépasse la limite de {settings.BATCH_MAX_ITEMS} incidents.")
+    logger.info(f"Analyse par lot de {len(requests)} incident(s)")
+    return StreamingResponse(_stream_batch_analysis(requests), media_type="application/x-ndjson")
+
 @app.post("/chat")
 async def chat_with_assistant(request: ChatRequest):
     """Endpoint de chat contextuel avec DeepSeek."""
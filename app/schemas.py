@@ -1,6 +1,8 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, HttpUrl, field_validator
 from typing import List, Dict, Any, Optional
 
+from app.services.webhook_policy import check_webhook_url
+
 class AnalyzeRequest(BaseModel):
     image_url: str = Field(..., description="URL of the image or base64 data to analyze")
     latitude: float = Field(..., description="Latitude of the incident")
@@ -13,6 +15,7 @@ class DeepSeekResponse(BaseModel):
     source_size_meters: float = Field(..., description="La taille physique directe visible de la source de l'incident en mètres")
     spread_vectors: List[str] = Field(..., description="Factors spreading the impact observed in the image")
     description: str = Field(..., description="Detailed explanation of the visual analysis")
+    is_default: bool = Field(False, exclude=True, description="Réponse par défaut après un échec du moteur visuel (non sérialisé)")
 
 class SpatialData(BaseModel):
     elevation: float
@@ -66,6 +69,48 @@ class AnalyzeResponse(BaseModel):
     geocoding: Optional[Dict[str, str]] = None
     recommendation: str
     potential_risk: Optional[Dict[str, Any]] = None
+    is_degraded: bool = False
+    degraded_providers: List[str] = Field(default_factory=list, description="Fournisseurs hors délai remplacés par des valeurs par défaut")
+
+class AnalyzeJobRequest(AnalyzeRequest):
+    webhook_url: Optional[HttpUrl] = Field(None, description="URL https publique notifiée (POST) avec le statut final de la tâche")
+
+    @field_validator("webhook_url")
+    @classmethod
+    def _check_webhook_url(cls, value: Optional[HttpUrl]) -> Optional[HttpUrl]:
+        if value is not None:
+            check_webhook_url(str(value))
+        return value
+
+class AnalyzeJobStatus(BaseModel):
+    job_id: str
+    status: str = Field(..., description="queued, running, completed ou failed")
+    incident_id: Optional[str] = None
+    created_at: str
+    updated_at: str
+    result: Optional[AnalyzeResponse] = None
+    error: Optional[str] = None
+
+class ExposureCurveRequest(BaseModel):
+    latitude: float = Field(..., description="Latitude of the incident")
+    longitude: float = Field(..., description="Longitude of the incident")
+    step_meters: float = Field(25.0, gt=0, description="Pas entre deux rayons de la courbe")
+    max_radius_meters: Optional[float] = Field(None, gt=0, description="Rayon maximal (rayon Macro par défaut)")
+
+class ExposurePoint(BaseModel):
+    radius_meters: float
+    social_data: Dict[str, int]
+    social_vulnerability_score: float
+    is_social_probabilistic: bool
+    human_impact: HumanImpact
+
+class ExposureCurveResponse(BaseModel):
+    latitude: float
+    longitude: float
+    land_use: str
+    points: List[ExposurePoint]
+    is_degraded: bool = False
+    degraded_providers: List[str] = Field(default_factory=list, description="Fournisseurs hors délai remplacés par des valeurs par défaut")
 
 class ChatRequest(BaseModel):
     messages: List[Dict[str, str]]
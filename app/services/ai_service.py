@@ -1,11 +1,13 @@
+import asyncio
 import json
 import logging
-import requests
+import httpx
 import base64
-import time
 import re
 from app.config import settings
 from app.schemas import DeepSeekResponse
+from app.services.http_client import http_request, http_stream
+from app.services.metrics import VISION_DEFAULT_RESPONSES
 
 logger = logging.getLogger(__name__)
 
@@ -42,10 +44,10 @@ Le JSON doit contenir les clés suivantes :
 """
 
 
-def _download_image_as_base64(image_url: str) -> str:
+async def _download_image_as_base64(image_url: str) -> str:
     """Télécharge une image depuis une URL et la convertit en base64."""
     headers = {"User-Agent": "MapActionImpactEngine/1.0"}
-    response = requests.get(image_url, headers=headers, timeout=15)
+    response = await http_request("GET", image_url, headers=headers, timeout=15)
     response.raise_for_status()
     return base64.b64encode(response.content).decode("utf-8")
 
@@ -60,7 +62,7 @@ def _detect_mime_type(image_url: str) -> str:
         return "image/gif"
     return "image/jpeg"
 
-def _call_gemini_api(image_base64: str, mime_type: str) -> DeepSeekResponse:
+async def _call_gemini_api(image_base64: str, mime_type: str) -> DeepSeekResponse:
     """
     Appel interne partagé vers l'API Gemini.
     Accepte une image en base64 et retourne un DeepSeekResponse validé.
@@ -93,7 +95,8 @@ def _call_gemini_api(image_base64: str, mime_type: str) -> DeepSeekResponse:
     try:
         last_http_error = None
         for attempt in range(1, max_attempts + 1):
-            response = requests.post(
+            response = await http_request(
+                "POST",
                 api_url,
                 headers={"Content-Type": "application/json"},
                 json=payload,
@@ -101,8 +104,9 @@ def _call_gemini_api(image_base64: str, mime_type: str) -> DeepSeekResponse:
             )
 
             if response.status_code in (429, 503):
-                last_http_error = requests.exceptions.HTTPError(
-                    f"{response.status_code} Server Error: {response.reason}",
+                last_http_error = httpx.HTTPStatusError(
+                    f"{response.status_code} Server Error: {response.reason_phrase}",
+                    request=response.request,
                     response=response,
                 )
                 if attempt < max_attempts:
@@ -114,7 +118,7 @@ def _call_gemini_api(image_base64: str, mime_type: str) -> DeepSeekResponse:
                         max_attempts,
                         delay,
                     )
-                    time.sleep(delay)
+                    await asyncio.sleep(delay)
                     continue
 
             response.raise_for_status()
@@ -122,6 +126,8 @@ def _call_gemini_api(image_base64: str, mime_type: str) -> DeepSeekResponse:
 
             content_str = result["candidates"][0]["content"]["parts"][0]["text"]
             parsed_data = json.loads(content_str)
+            # Le drapeau d'échec est réservé à la réponse par défaut, jamais lu depuis le modèle
+            parsed_data.pop("is_default", None)
 
             ai_response = DeepSeekResponse(**parsed_data)
             logger.info(f"Analyse Gemini réussie: {ai_response.macro_category} > {ai_response.sub_category}")
@@ -130,7 +136,7 @@ def _call_gemini_api(image_base64: str, mime_type: str) -> DeepSeekResponse:
         if last_http_error is not None:
             raise last_http_error
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         error_detail = ""
         if hasattr(e, 'response') and e.response is not None:
             error_detail = f" - Body: {_sanitize_error_text(e.response.text)}"
@@ -144,34 +150,42 @@ def _call_gemini_api(image_base64: str, mime_type: str) -> DeepSeekResponse:
         return _default_response("Une erreur technique est survenue pendant l'analyse visuelle.")
 
 
-def analyze_image_with_gemini(image_url: str) -> DeepSeekResponse:
+async def analyze_image_with_gemini(image_url: str) -> DeepSeekResponse:
     """Analyse une image à partir d'une URL."""
     try:
-        image_base64 = _download_image_as_base64(image_url)
+        image_base64 = await _download_image_as_base64(image_url)
         mime_type = _detect_mime_type(image_url)
     except Exception as e:
         logger.error(f"Impossible de telecharger l'image {image_url}: {_sanitize_error_text(str(e))}")
         return _default_response("Impossible de recuperer l'image fournie.")
-    return _call_gemini_api(image_base64, mime_type)
+    return await _call_gemini_api(image_base64, mime_type)
 
 
-def analyze_image_bytes_with_gemini(image_bytes: bytes, mime_type: str = "image/jpeg") -> DeepSeekResponse:
+async def analyze_image_bytes_with_gemini(image_bytes: bytes, mime_type: str = "image/jpeg") -> DeepSeekResponse:
     """Analyse une image à partir de bytes bruts (upload direct)."""
     image_base64 = base64.b64encode(image_bytes).decode("utf-8")
-    return _call_gemini_api(image_base64, mime_type)
+    return await _call_gemini_api(image_base64, mime_type)
 
 
+DEFAULT_DESCRIPTION_PREFIX = "L'analyse visuelle a échoué."
+
 def _default_response(error_msg: str) -> DeepSeekResponse:
     """Retourne une réponse par défaut en cas d'erreur pour ne pas bloquer le moteur."""
+    VISION_DEFAULT_RESPONSES.inc()
     return DeepSeekResponse(
         macro_category="Autre",
         sub_category="Incident non répertorié",
         source_size_meters=50.0,
         spread_vectors=["unknown"],
-        description=f"L'analyse visuelle a échoué. Détails: {error_msg}"
+        description=f"{DEFAULT_DESCRIPTION_PREFIX} Détails: {error_msg}",
+        is_default=True,
     )
 
-def call_deepseek_chat(messages: list, context_summary: str) -> str:
+def is_default_response(ai_data: DeepSeekResponse) -> bool:
+    """Indique si la classification est la réponse par défaut (échec du moteur visuel)."""
+    return ai_data.is_default
+
+async def call_deepseek_chat(messages: list, context_summary: str):
     """
     Appelle l'API DeepSeek pour une discussion contextuelle.
     Si la clé DeepSeek est manquante, utilise Gemini en fallback automatique.
@@ -215,28 +229,25 @@ Réponds toujours en Français."""
         if "/v1" not in full_url and "deepseek.com" in full_url:
              full_url = f"{base_url}/v1/chat/completions"
 
-        response = requests.post(
+        async with http_stream(
+            "POST",
             full_url,
             headers={
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {settings.DEEPSEEK_API_KEY}"
             },
             json=payload,
-            stream=True,
             timeout=90
-        )
-        response.raise_for_status()
+        ) as response:
+            response.raise_for_status()
 
-        # Lecture du flux SSE (Server-Sent Events)
-        for line in response.iter_lines():
-            if line:
-                decoded_line = line.decode('utf-8')
+            # Lecture du flux SSE (Server-Sent Events)
+            async for decoded_line in response.aiter_lines():
                 if decoded_line.startswith("data: "):
                     data_str = decoded_line[6:]
                     if data_str.strip() == "[DONE]":
                         break
                     try:
-                        import json
                         chunk = json.loads(data_str)
                         delta = chunk.get("choices", [{}])[0].get("delta", {})
                         content = delta.get("content")
@@ -0,0 +1,140 @@
+"""
+Tâches d'analyse asynchrones (/analyze/jobs).
+
+La demande est enregistrée dans Redis et confiée à la file Celery : l'appelant reçoit un
+identifiant immédiatement, sans garder de connexion ouverte pendant tout le pipeline. Un
+worker exécute ensuite l'analyse; le résultat est consultable par GET /analyze/jobs/{id} et,
+si une URL est fournie, poussé par webhook. L'acceptation des demandes ne dépend donc pas de
+la disponibilité des fournisseurs externes ni du débit d'analyse.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.schemas import AnalyzeJobRequest, AnalyzeJobStatus, AnalyzeRequest
+from app.services.http_client import close_http_client, http_request, start_http_client
+from app.services.impact_pipeline import analyze_url_request
+from app.services.redis_cache import cache_get, cache_set
+from app.services.webhook_policy import pinned_webhook_request, resolve_webhook_address
+
+logger = logging.getLogger(__name__)
+
+JOB_KEY_PREFIX = "analysis:job:v1"
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+def _job_key(job_id: str) -> str:
+    return f"{JOB_KEY_PREFIX}:{job_id}"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _save_job(job: Dict[str, Any]) -> bool:
+    payload = json.dumps(job, ensure_ascii=False).encode("utf-8")
+    return cache_set(_job_key(job["job_id"]), payload, settings.ANALYSIS_JOB_TTL_SECONDS)
+
+
+def create_job(request: AnalyzeJobRequest) -> Optional[Dict[str, Any]]:
+    """Enregistre une nouvelle tâche en file d'attente. Retourne None si Redis est indisponible."""
+    now = _now()
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "incident_id": request.incident_id,
+        "created_at": now,
+        "updated_at": now,
+        "request": request.model_dump(mode="json"),
+        "result": None,
+        "error": None,
+    }
+    return job if _save_job(job) else None
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    payload = cache_get(_job_key(job_id))
+    return json.loads(payload) if payload is not None else None
+
+
+def update_job(job: Dict[str, Any], **fields: Any) -> Dict[str, Any]:
+    job.update(fields, updated_at=_now())
+    if not _save_job(job):
+        logger.error(f"Impossible d'enregistrer l'état '{job['status']}' de la tâche {job['job_id']}")
+    return job
+
+
+def job_status(job: Dict[str, Any]) -> AnalyzeJobStatus:
+    return AnalyzeJobStatus(**{field: job.get(field) for field in AnalyzeJobStatus.model_fields})
+
+
+async def notify_webhook(job: Dict[str, Any]) -> bool:
+    """Envoie le statut final de la tâche au webhook du client (avec reprises exponentielles)."""
+    webhook_url = job["request"].get("webhook_url")
+    if not webhook_url:
+        return False
+    try:
+        # Résolu au moment de l'envoi : le nom d'hôte a pu être repointé vers une adresse interne depuis la soumission
+        address = await asyncio.to_thread(resolve_webhook_address, webhook_url)
+    except ValueError as e:
+        logger.error(f"Webhook de la tâche {job['job_id']} refusé : {e}")
+        return False
+    # Connexion à l'adresse validée : le client ne résout pas le nom une seconde fois
+    target_url, headers, extensions = pinned_webhook_request(webhook_url, address)
+    payload = job_status(job).model_dump(mode="json")
+    for attempt in range(settings.ANALYSIS_JOB_WEBHOOK_RETRIES):
+        try:
+            response = await http_request(
+                "POST", target_url, json=payload, headers=headers, extensions=extensions,
+                timeout=10, follow_redirects=False,
+            )
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            logger.warning(f"Webhook de la tâche {job['job_id']} en échec (tentative {attempt + 1}) : {e}")
+            if attempt < settings.ANALYSIS_JOB_WEBHOOK_RETRIES - 1:
+                await asyncio.sleep(2 ** attempt)
+    return False
+
+
+async def execute_job(job_id: str) -> Optional[str]:
+    """Exécute une tâche en file d'attente et retourne son statut final."""
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None:
+        logger.error(f"Tâche d'analyse introuvable ou expirée : {job_id}")
+        return None
+    if job["status"] in (COMPLETED, FAILED):
+        # Message livré une seconde fois (redémarrage du worker) : rien à refaire
+        return job["status"]
+
+    await asyncio.to_thread(update_job, job, status=RUNNING)
+    request = AnalyzeRequest(**{field: job["request"][field] for field in AnalyzeRequest.model_fields})
+    try:
+        result = await analyze_url_request(request)
+        await asyncio.to_thread(update_job, job, status=COMPLETED, result=result.model_dump(mode="json"))
+    except Exception as e:
+        logger.error(f"Échec de la tâche d'analyse {job_id} : {e}")
+        await asyncio.to_thread(update_job, job, status=FAILED, error=str(e))
+
+    await notify_webhook(job)
+    return job["status"]
+
+
+def run_job(job_id: str) -> Optional[str]:
+    """Point d'entrée synchrone des workers : exécute la tâche dans sa propre boucle d'événements."""
+    async def _run() -> Optional[str]:
+        await start_http_client()
+        try:
+            return await execute_job(job_id)
+        finally:
+            await close_http_client()
+
+    return asyncio.run(_run())
@@ -258,3 +258,21 @@ def analyze_incident_zone(lat, lon, incident_location, incident_type, start_date
     }
 
     return result
+
+@celery_app.task(name="impact.run_analysis_job", acks_late=True, reject_on_worker_lost=True)
+def run_analysis_job(job_id):
+    """
+    A Celery task that runs a queued impact analysis job (POST /analyze/jobs).
+    The task is acknowledged only once finished, so a job interrupted by a worker crash is redelivered.
+
+    Args:
+        job_id (str): Identifier of the job stored in Redis.
+
+    Returns:
+        str: The final status of the job ('completed' or 'failed'), or None if the job has expired.
+    """
+    # Local import: the impact pipeline imports app.services, which imports this module
+    from app.services.analysis_jobs import run_job
+
+    logger.info(f"Starting impact analysis job {job_id}.")
+    return run_job(job_id)
@@ -0,0 +1,105 @@
+"""
+Budget temporel de bout en bout d'une analyse d'impact.
+
+Chaque fournisseur externe (vision, OSM, satellite, pente, météo, géocodage) reçoit une part
+du budget total. À l'intérieur de cette part, son délai est ajusté d'après les latences
+observées (moyenne glissante + 4 écarts, comme un RTO TCP). Un fournisseur qui dépasse son
+délai ou échoue est abandonné : l'analyse continue avec sa valeur par défaut et il est signalé comme dégradé.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.services.metrics import record_fallback
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """Moyenne et écart moyens glissants (EWMA) des latences observées par fournisseur."""
+
+    def __init__(self, alpha: float = 0.2, min_samples: int = 5):
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def observe(self, provider: str, seconds: float) -> None:
+        stats = self._stats.get(provider)
+        if stats is None:
+            self._stats[provider] = {"mean": seconds, "dev": seconds / 2, "samples": 1}
+            return
+        error = seconds - stats["mean"]
+        stats["mean"] += self.alpha * error
+        stats["dev"] += self.alpha * (abs(error) - stats["dev"])
+        stats["samples"] += 1
+
+    def suggested_timeout(self, provider: str) -> Optional[float]:
+        """Délai suggéré (moyenne + 4 écarts) ou None tant que les observations sont insuffisantes."""
+        stats = self._stats.get(provider)
+        if stats is None or stats["samples"] < self.min_samples:
+            return None
+        return stats["mean"] + 4 * stats["dev"]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {provider: dict(stats) for provider, stats in self._stats.items()}
+
+
+provider_latency = LatencyTracker()
+
+
+class AnalysisDeadline:
+    """Échéance d'une analyse et liste des fournisseurs ayant répondu hors délai."""
+
+    def __init__(self, budget_seconds: Optional[float] = None):
+        self.budget_seconds = settings.ANALYSIS_DEADLINE_SECONDS if budget_seconds is None else budget_seconds
+        self.started_at = time.monotonic()
+        self.degraded: List[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.budget_seconds - (time.monotonic() - self.started_at))
+
+    def provider_timeout(self, provider: str) -> float:
+        """Délai accordé à un fournisseur : sa part du budget, resserrée par ses latences observées."""
+        budget_slice = self.budget_seconds * settings.PROVIDER_BUDGET_SHARES.get(provider, 1.0)
+        tuned = provider_latency.suggested_timeout(provider)
+        if tuned is not None:
+            budget_slice = min(budget_slice, max(tuned, settings.PROVIDER_MIN_TIMEOUT_SECONDS))
+        return min(budget_slice, self.remaining())
+
+    def mark_degraded(self, provider: str) -> None:
+        if provider not in self.degraded:
+            self.degraded.append(provider)
+
+    async def run(self, provider: str, awaitable: Awaitable[Any], default_factory: Callable[[], Any]) -> Any:
+        """
+        Attend un fournisseur dans son délai; au-delà, ou s'il lève une exception, retourne sa
+        valeur par défaut et le marque dégradé.
+        """
+        timeout = self.provider_timeout(provider)
+        if timeout <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            logger.warning(f"Budget épuisé avant l'appel '{provider}' : valeur par défaut utilisée.")
+            record_fallback(provider, "budget_exhausted")
+            self.mark_degraded(provider)
+            return default_factory()
+
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            # Observation censurée : la latence réelle est au moins égale au délai
+            provider_latency.observe(provider, timeout)
+            logger.warning(f"Fournisseur '{provider}' hors délai ({timeout:.1f}s) : valeur par défaut utilisée.")
+            record_fallback(provider, "timeout")
+            self.mark_degraded(provider)
+            return default_factory()
+        except Exception as e:
+            logger.error(f"Fournisseur '{provider}' en erreur : {e} ; valeur par défaut utilisée.")
+            record_fallback(provider, "error")
+            self.mark_degraded(provider)
+            return default_factory()
+        provider_latency.observe(provider, time.monotonic() - start)
+        return result
@@ -0,0 +1,148 @@
+"""
+Tuiles d'altitude SRTM locales (altitude et pente sans appel réseau).
+
+Les tuiles SRTM au format .hgt (1° × 1°, entiers 16 bits gros-boutistes, 3601 × 3601 pixels en
+SRTM1 ou 1201 × 1201 en SRTM3, nommées d'après leur coin sud-ouest : N12W009.hgt) sont déposées
+dans DEM_TILE_DIR par `scripts/fetch_dem_tiles.py`. Chaque tuile est projetée en mémoire
+(`np.memmap`) à sa première utilisation : une analyse ne lit que la petite fenêtre autour du
+point, soit quelques pages du fichier. L'altitude (interpolation bilinéaire) et la pente
+(`np.gradient` sur la fenêtre, en pourcentage) sont calculées ensemble, remplaçant l'appel
+Open-Meteo Elevation et la réduction GEE.
+"""
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_METERS = 6371000
+METERS_PER_DEGREE = math.pi / 180 * EARTH_RADIUS_METERS
+# Valeur des pixels sans donnée dans les fichiers SRTM
+HGT_VOID = -32768
+HGT_SIZES = {3601 * 3601 * 2: 3601, 1201 * 1201 * 2: 1201}
+
+TileKey = Tuple[int, int]
+
+
+def tile_name(lat_floor: int, lon_floor: int) -> str:
+    """Nom SRTM d'une tuile d'après son coin sud-ouest (ex: N12W009)."""
+    return f"{'N' if lat_floor >= 0 else 'S'}{abs(lat_floor):02d}{'E' if lon_floor >= 0 else 'W'}{abs(lon_floor):03d}"
+
+
+class DemTileStore:
+    """Tuiles SRTM d'un répertoire, projetées en mémoire à la demande (LRU des tuiles ouvertes)."""
+
+    def __init__(self, directory: str, max_open_tiles: int = 16, window: int = 1):
+        self.directory = directory
+        self.max_open_tiles = max_open_tiles
+        # Demi-largeur (pixels) de la fenêtre de calcul de la pente
+        self.window = max(1, window)
+        self._tiles: "OrderedDict[TileKey, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tile(self, key: TileKey) -> Optional[np.ndarray]:
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+        path = os.path.join(self.directory, f"{tile_name(*key)}.hgt")
+        tile = None
+        try:
+            size = HGT_SIZES.get(os.path.getsize(path))
+            if size is None:
+                logger.error(f"Tuile SRTM de taille inattendue : {path}")
+            else:
+                tile = np.memmap(path, dtype=">i2", mode="r", shape=(size, size))
+        except OSError:
+            # Tuile absente (hors de la zone téléchargée) : non mémorisée, elle peut être ajoutée à chaud
+            return None
+        if tile is None:
+            return None
+        with self._lock:
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_open_tiles:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tiles.clear()
+
+    def terrain(self, lat: float, lon: float) -> Optional[Dict[str, float]]:
+        """
+        Altitude (m) et pente (%) au point ; None si la tuile est absente ou sans donnée autour
+        du point (l'appelant se replie alors sur les fournisseurs en ligne).
+        """
+        key = (math.floor(lat), math.floor(lon))
+        tile = self._tile(key)
+        if tile is None:
+            return None
+        size = tile.shape[0]
+        step = 1.0 / (size - 1)
+        # Ligne 0 = bord nord de la tuile, colonne 0 = bord ouest
+        row = (key[0] + 1 - lat) / step
+        col = (lon - key[1]) / step
+        center_row = min(max(int(round(row)), self.window), size - 1 - self.window)
+        center_col = min(max(int(round(col)), self.window), size - 1 - self.window)
+
+        window = np.asarray(
+            tile[center_row - self.window:center_row + self.window + 1, center_col - self.window:center_col + self.window + 1],
+            dtype=np.float64,
+        )
+        window[window == HGT_VOID] = np.nan
+        if np.isnan(window).all():
+            return None
+        # Quelques vides isolés (relief escarpé, plans d'eau) : comblés par la moyenne de la fenêtre
+        window[np.isnan(window)] = np.nanmean(window)
+
+        dy = step * METERS_PER_DEGREE
+        dx = dy * math.cos(math.radians(lat))
+        grad_y, grad_x = np.gradient(window, dy, dx)
+        slope = 100.0 * math.hypot(grad_x[self.window, self.window], grad_y[self.window, self.window])
+
+        # Altitude : interpolation bilinéaire des quatre pixels entourant le point
+        local_row = min(max(row - (center_row - self.window), 0.0), 2 * self.window)
+        local_col = min(max(col - (center_col - self.window), 0.0), 2 * self.window)
+        r0, c0 = min(int(local_row), 2 * self.window - 1), min(int(local_col), 2 * self.window - 1)
+        fr, fc = local_row - r0, local_col - c0
+        elevation = (
+            window[r0, c0] * (1 - fr) * (1 - fc) + window[r0, c0 + 1] * (1 - fr) * fc
+            + window[r0 + 1, c0] * fr * (1 - fc) + window[r0 + 1, c0 + 1] * fr * fc
+        )
+        return {"elevation": round(float(elevation), 1), "slope_percent": round(slope, 2)}
+
+
+_store: Optional[DemTileStore] = None
+_store_lock = threading.Lock()
+
+
+def get_dem_store() -> Optional[DemTileStore]:
+    """Store des tuiles de DEM_TILE_DIR ; None si aucun répertoire n'est configuré."""
+    global _store
+    directory = settings.DEM_TILE_DIR
+    if not directory:
+        return None
+    with _store_lock:
+        if _store is None or _store.directory != directory:
+            _store = DemTileStore(directory, max_open_tiles=settings.DEM_MAX_OPEN_TILES)
+        return _store
+
+
+def local_terrain(lat: float, lon: float) -> Optional[Dict[str, float]]:
+    """Altitude et pente lues dans les tuiles locales ; None sans tuile couvrant le point."""
+    store = get_dem_store()
+    if store is None:
+        return None
+    try:
+        return store.terrain(lat, lon)
+    except Exception as e:
+        logger.error(f"Lecture des tuiles d'altitude impossible : {e}")
+        return None
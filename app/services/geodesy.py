@@ -0,0 +1,18 @@
+"""
+Distances au sol (haversine) vectorisées.
+
+Module sans dépendance interne : utilisé par `spatial_calculator` comme par les modules qu'il
+importe lui-même (décomptes H3, géocodeur hors ligne), sans import circulaire.
+"""
+import numpy as np
+
+EARTH_RADIUS_METERS = 6371000
+
+
+def haversine_distances(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Distances en mètres entre un point GPS et des tableaux de points (version vectorisée)."""
+    phi1, phi2 = np.radians(lat), np.radians(lats)
+    dphi = np.radians(lats - lat)
+    dlambda = np.radians(lons - lon)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
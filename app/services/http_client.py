@@ -0,0 +1,132 @@
+"""
+Client HTTP asynchrone partagé pour tous les appels sortants (Overpass, Open-Meteo, Nominatim,
+Gemini, DeepSeek, Supabase, images).
+
+Un seul `httpx.AsyncClient` par boucle d'événements conserve les connexions (keep-alive) et
+négocie HTTP/2 quand le paquet `h2` est installé : on évite un handshake TLS par appel et le
+passage par le pool de threads. Un sémaphore par hôte borne la concurrence envers chaque
+fournisseur et un intervalle minimal espace les requêtes des hôtes qui l'exigent (ex: Nominatim
+n'accepte qu'une requête à la fois, et au plus une par seconde).
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import settings
+from app.services.metrics import provider_for_url, track_provider_call
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "MapActionImpactEngine/1.0"
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+# Instant (horloge de la boucle) à partir duquel la prochaine requête vers l'hôte peut partir
+_host_next_slots: Dict[str, float] = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _create_client() -> httpx.AsyncClient:
+    http2 = settings.HTTP2_ENABLED and _http2_available()
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    logger.info(f"Client HTTP partagé initialisé (HTTP/2: {http2}, connexions max: {settings.HTTP_MAX_CONNECTIONS})")
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=limits,
+        timeout=httpx.Timeout(30.0),
+        headers={"User-Agent": USER_AGENT},
+        follow_redirects=True,
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Retourne le client partagé de la boucle courante.
+    Le pool de connexions est lié à sa boucle : une nouvelle boucle (worker Celery, tests)
+    obtient son propre client.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = _create_client()
+        _client_loop = loop
+        _host_semaphores.clear()
+        _host_next_slots.clear()
+    return _client
+
+
+async def start_http_client() -> None:
+    get_http_client()
+
+
+async def close_http_client() -> None:
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+    _host_semaphores.clear()
+    _host_next_slots.clear()
+
+
+def _host_semaphore(host: str) -> asyncio.Semaphore:
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        limit = settings.HTTP_PER_HOST_LIMITS.get(host, settings.HTTP_DEFAULT_PER_HOST_LIMIT)
+        semaphore = _host_semaphores[host] = asyncio.Semaphore(limit)
+    return semaphore
+
+
+async def _wait_host_interval(host: str) -> None:
+    """Réserve le prochain créneau de l'hôte et l'attend (HTTP_PER_HOST_MIN_INTERVALS)."""
+    interval = settings.HTTP_PER_HOST_MIN_INTERVALS.get(host)
+    if not interval:
+        return
+    now = asyncio.get_running_loop().time()
+    slot = max(now, _host_next_slots.get(host, now))
+    _host_next_slots[host] = slot + interval
+    if slot > now:
+        await asyncio.sleep(slot - now)
+
+
+@asynccontextmanager
+async def _host_slot(url: str) -> AsyncIterator[None]:
+    """Créneau d'envoi vers l'hôte de `url` : limite de concurrence puis intervalle minimal."""
+    host = urlsplit(url).hostname or ""
+    async with _host_semaphore(host):
+        await _wait_host_interval(host)
+        yield
+
+
+async def http_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Requête via le client partagé, dans la limite de concurrence et de fréquence de l'hôte cible."""
+    client = get_http_client()
+    async with _host_slot(url):
+        with track_provider_call(provider_for_url(url)):
+            return await client.request(method, url, **kwargs)
+
+
+@asynccontextmanager
+async def http_stream(method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+    """Réponse en flux via le client partagé; le créneau de l'hôte est tenu jusqu'à la fin de la lecture."""
+    client = get_http_client()
+    async with _host_slot(url):
+        with track_provider_call(provider_for_url(url)):
+            async with client.stream(method, url, **kwargs) as response:
+                yield response
@@ -0,0 +1,577 @@
+"""
+Pipeline d'analyse d'impact déclaré comme graphe d'étapes (voir `stage_graph`).
+
+Partagé par les endpoints URL, Upload, Flux, Lot et Tâches de `app.main` ainsi que par
+`app.apis.main_router` : une seule définition du pipeline au lieu de copies qui divergent.
+
+Étapes et dépendances :
+    classification, slope, osm, satellite, weather, geocoding  <- point et image uniquement
+    spatial            <- slope (altitude et pente), weather
+    radius             <- classification, spatial, osm, satellite
+    osm_detail         <- osm, radius (mode "adaptive" : éléments jusqu'au plus grand rayon utile)
+    radial_counts      <- osm_detail (décomptes cumulés par distance, un seul parcours des éléments)
+    population         <- radius (raster de population local, si configuré)
+    direct_impact      <- radius, radial_counts, population, satellite
+    indirect_vigilance <- radius, direct_impact, radial_counts, population, satellite
+    potential_risk     <- radius, radial_counts, population, satellite
+    global_score       <- classification, satellite, spatial, direct_impact
+    response           <- toutes les étapes précédentes
+
+Les cinq collectes de contexte et la classification ne dépendent que du point et de l'image :
+elles démarrent toutes ensemble, chacune bornée par sa part du budget de l'analyse.
+
+En mode de collecte OSM "full", l'étape osm récupère tous les éléments du rayon Macro et
+osm_detail la transmet telle quelle. En mode "adaptive" (OSM_FETCH_MODE), osm ne récupère que les
+décomptes Macro (utilisés par le rayon dynamique) et osm_detail les éléments jusqu'au plus grand
+des rayons direct, de vigilance et de risque potentiel, généralement quelques centaines de mètres.
+"""
+import asyncio
+import logging
+import math
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.impact_logic import calculate_dynamic_radius, calculate_global_impact
+from app.schemas import (
+    AnalyzeRequest,
+    AnalyzeResponse,
+    ExposureCurveResponse,
+    ExposurePoint,
+    HumanImpact,
+    SatelliteData,
+    SpatialData,
+)
+from app.services.ai_service import (
+    _default_response,
+    analyze_image_bytes_with_gemini,
+    analyze_image_with_gemini,
+    is_default_response,
+)
+from app.services.deadline import AnalysisDeadline
+from app.services.dem_tiles import local_terrain
+from app.services.metrics import track_provider_call
+from app.services.osm_index import osm_data_version
+from app.services.population_raster import RadialPopulation, read_radial_population
+from app.services.singleflight import coordinate_key, provider_flights
+from app.services.spatial_calculator import (
+    DEFAULT_GEOCODING,
+    DEFAULT_TERRAIN,
+    DEFAULT_WEATHER,
+    calculate_human_impact,
+    calculate_social_vulnerability,
+    default_osm_data,
+    default_satellite_data,
+    RadialCounts,
+    get_geocoding_context,
+    get_osm_data,
+    get_osm_macro_counts,
+    get_satellite_analysis,
+    get_slope_data,
+    get_weather_data,
+)
+from app.services.stage_graph import Stage, StageCache, StageGraph
+
+logger = logging.getLogger(__name__)
+
+MACRO_OSM_RADIUS = 5000
+
+GEO_STAGES = ("slope", "osm", "satellite", "weather", "geocoding")
+
+PIPELINE_INPUTS = (
+    "latitude", "longitude", "incident_id", "image_source", "deadline", "osm_radius", "osm_mode", "inherited_degraded",
+)
+
+# Le contexte administratif d'un point ne change pas : Nominatim n'est interrogé qu'une fois par lieu
+geocoding_cache = StageCache(ttl_seconds=settings.GEOCODING_CACHE_TTL_SECONDS, max_entries=4096)
+
+# Décomptes cumulés d'un point réutilisés à chaque déplacement du curseur de la courbe d'exposition
+exposure_cache = StageCache(ttl_seconds=settings.EXPOSURE_CACHE_TTL_SECONDS, max_entries=256)
+
+
+def _subtract_human_impact(total: Dict[str, int], direct: Dict[str, int]) -> Dict[str, int]:
+    """Retourne la population de l'anneau indirect sans double compter le rayon direct."""
+    keys = [
+        "total_population_exposed",
+        "adult_men_exposed",
+        "adult_women_exposed",
+        "children_exposed",
+        "maternities_count",
+        "nurseries_count",
+    ]
+    return {key: max(0, total.get(key, 0) - direct.get(key, 0)) for key in keys}
+
+
+def _subtract_structure_counts(total: Dict[str, int], direct: Dict[str, int]) -> Dict[str, int]:
+    """Retourne les structures de l'anneau indirect sans double compter le rayon direct."""
+    keys = set(total) | set(direct)
+    return {key: max(0, total.get(key, 0) - direct.get(key, 0)) for key in keys}
+
+
+def _taxonomy_entry(ai_data) -> Dict[str, Any]:
+    return settings.INCIDENT_TAXONOMY.get(ai_data.macro_category, {}).get(ai_data.sub_category, {})
+
+
+# --- Étapes de collecte (fournisseurs externes) ---
+
+async def _provider(name: str, deadline: AnalysisDeadline, key, call, default_factory) -> Any:
+    """
+    Appel fournisseur borné par le budget et partagé avec les analyses simultanées du même lieu.
+    Un repli du fournisseur sur erreur (valeur marquée `"degraded"`) signale l'analyse dégradée,
+    comme un dépassement de délai, pour qu'elle ne soit pas mise en cache.
+    """
+    value = await deadline.run(name, provider_flights.do(key, call), default_factory)
+    if isinstance(value, dict) and value.get("degraded"):
+        deadline.mark_degraded(name)
+        # Copie : la valeur est partagée avec les autres appelants du même vol
+        value = {field: item for field, item in value.items() if field != "degraded"}
+    return value
+
+
+async def _classification_stage(image_source: Dict[str, Any], deadline: AnalysisDeadline):
+    if "bytes" in image_source:
+        call = analyze_image_bytes_with_gemini(image_source["bytes"], image_source.get("mime_type", "image/jpeg"))
+    else:
+        call = analyze_image_with_gemini(image_source["url"])
+    classification = await deadline.run(
+        "classification",
+        call,
+        lambda: _default_response("Le moteur visuel n'a pas répondu dans le délai imparti."),
+    )
+    if is_default_response(classification):
+        # Moteur visuel en erreur : réponse par défaut, analyse dégradée
+        deadline.mark_degraded("classification")
+    return classification
+
+
+async def _slope_stage(latitude: float, longitude: float, deadline: AnalysisDeadline) -> Dict[str, float]:
+    """Altitude et pente (%) : tuiles SRTM locales si elles couvrent le point, sinon Open-Meteo et GEE."""
+    terrain = local_terrain(latitude, longitude)
+    if terrain is not None:
+        return terrain
+    return await _provider(
+        "slope", deadline, coordinate_key("slope", latitude, longitude),
+        lambda: get_slope_data(latitude, longitude), lambda: dict(DEFAULT_TERRAIN),
+    )
+
+
+async def _osm_stage(latitude: float, longitude: float, osm_radius: int, osm_mode: str, deadline: AnalysisDeadline) -> Dict[str, Any]:
+    if osm_mode == "adaptive":
+        return await _provider(
+            "osm", deadline, coordinate_key("osm_count", latitude, longitude, osm_radius),
+            lambda: get_osm_macro_counts(latitude, longitude, osm_radius), default_osm_data,
+        )
+    return await _provider(
+        "osm", deadline, coordinate_key("osm", latitude, longitude, osm_radius),
+        lambda: get_osm_data(latitude, longitude, osm_radius), default_osm_data,
+    )
+
+
+async def _satellite_stage(latitude: float, longitude: float, deadline: AnalysisDeadline) -> Dict[str, Any]:
+    # GEE n'a pas de client asynchrone : seul appel encore exécuté dans le pool de threads
+    return await _provider(
+        "satellite", deadline, coordinate_key("satellite", latitude, longitude),
+        lambda: asyncio.to_thread(get_satellite_analysis, latitude, longitude), default_satellite_data,
+    )
+
+
+async def _weather_stage(latitude: float, longitude: float, deadline: AnalysisDeadline) -> Dict[str, float]:
+    return await _provider(
+        "weather", deadline, coordinate_key("weather", latitude, longitude),
+        lambda: get_weather_data(latitude, longitude), lambda: dict(DEFAULT_WEATHER),
+    )
+
+
+async def _geocoding_stage(latitude: float, longitude: float, deadline: AnalysisDeadline) -> Dict[str, str]:
+    return await _provider(
+        "geocoding", deadline, coordinate_key("geocoding", latitude, longitude),
+        lambda: get_geocoding_context(latitude, longitude), lambda: dict(DEFAULT_GEOCODING),
+    )
+
+
+# --- Étapes de calcul ---
+
+def _spatial_stage(slope: Dict[str, float], weather: Dict[str, float]) -> Dict[str, float]:
+    return {
+        "elevation": slope["elevation"],
+        "slope_percent": slope["slope_percent"],
+        "wind_speed": weather["wind_speed"],
+        "precipitation": weather["precipitation"],
+        "temperature_celsius": weather["temperature_celsius"]
+    }
+
+
+def _radius_stage(classification, spatial: Dict[str, float], osm: Dict[str, Any], satellite: Dict[str, Any]) -> Dict[str, Any]:
+    """Calcul dynamique du rayon final (Analyse Croisée)."""
+    return calculate_dynamic_radius(
+        ai_data=classification,
+        spatial_data=spatial,
+        macro_osm_counts=osm["counts"],
+        sat_data=satellite
+    )
+
+
+def detail_radius(radius: Dict[str, Any]) -> int:
+    """Plus grand rayon pour lequel les éléments OSM sont nécessaires (direct, vigilance, risque potentiel)."""
+    radii = [radius["final_radius"]]
+    for key in ("indirect_vigilance", "potential_risk"):
+        if radius.get(key):
+            radii.append(radius[key]["potential_radius"])
+    return math.ceil(max(radii))
+
+
+async def _osm_detail_stage(osm, radius, latitude: float, longitude: float, deadline: AnalysisDeadline) -> Dict[str, Any]:
+    """Éléments OSM du disque utile : ceux de l'étape osm s'ils sont déjà complets (mode "full")."""
+    if osm.get("detail", True):
+        return osm
+    needed = detail_radius(radius)
+    return await _provider(
+        "osm_detail", deadline, coordinate_key("osm", latitude, longitude, needed),
+        lambda: get_osm_data(latitude, longitude, needed), default_osm_data,
+    )
+
+
+def _radial_counts_stage(osm_detail, latitude: float, longitude: float) -> RadialCounts:
+    """Décomptes OSM cumulés par distance : un seul parcours des éléments pour tous les rayons."""
+    return RadialCounts.from_osm(osm_detail, latitude, longitude)
+
+
+async def _population_stage(radius, latitude: float, longitude: float) -> Optional[RadialPopulation]:
+    """Population cumulée par distance lue dans le raster local ; None sans raster couvrant la zone."""
+    return await radial_population(latitude, longitude, detail_radius(radius), min_radius=radius["final_radius"])
+
+
+async def radial_population(
+    latitude: float, longitude: float, max_radius: float, min_radius: Optional[float] = None,
+) -> Optional[RadialPopulation]:
+    if not settings.POPULATION_RASTER_PATH:
+        return None
+    try:
+        with track_provider_call("population_raster"):
+            return await asyncio.to_thread(read_radial_population, latitude, longitude, max_radius, min_radius)
+    except Exception as e:
+        logger.error(f"Lecture du raster de population impossible : {e}")
+        return None
+
+
+def _population_within(population: Optional[RadialPopulation], radius: float) -> Optional[float]:
+    return population.within(radius) if population is not None else None
+
+
+def _direct_impact_stage(radius, radial_counts: RadialCounts, population: Optional[RadialPopulation], satellite) -> Dict[str, Any]:
+    """Scores sociaux et humains dans le rayon final."""
+    final_radius = radius["final_radius"]
+    counts = radial_counts.counts_within(final_radius)
+    exposed = _population_within(population, final_radius)
+    social = calculate_social_vulnerability(
+        counts,
+        land_use=satellite.get("land_use", "Inconnu"),
+        radius_meters=final_radius,
+        population=exposed,
+    )
+    human = calculate_human_impact(counts, estimated_buildings=social.get("estimated_buildings", 0), population=exposed)
+    return {"counts": counts, "social": social, "human": human}
+
+
+def _indirect_vigilance_stage(radius, direct_impact, radial_counts: RadialCounts, population: Optional[RadialPopulation], satellite) -> Optional[Dict[str, Any]]:
+    """Population indirectement concernée par vigilance sanitaire (anneau au-delà du rayon direct)."""
+    vigilance = radius.get("indirect_vigilance")
+    if not vigilance:
+        return None
+    indirect_radius = vigilance["potential_radius"]
+    counts = radial_counts.counts_within(indirect_radius)
+    exposed = _population_within(population, indirect_radius)
+    social = calculate_social_vulnerability(
+        counts,
+        land_use=satellite.get("land_use", "Inconnu"),
+        radius_meters=indirect_radius,
+        population=exposed,
+    )
+    human_total = calculate_human_impact(counts, estimated_buildings=social.get("estimated_buildings"), population=exposed)
+    return {
+        "radius": indirect_radius,
+        "explanation": vigilance["message"],
+        "is_probabilistic": social["is_probabilistic"],
+        "human": _subtract_human_impact(human_total, direct_impact["human"]),
+        "counts": _subtract_structure_counts(counts, direct_impact["counts"]),
+    }
+
+
+def _potential_risk_stage(radius, radial_counts: RadialCounts, population: Optional[RadialPopulation], satellite) -> Optional[Dict[str, Any]]:
+    """Risque potentiel de propagation (si détecté)."""
+    potential_risk = radius.get("potential_risk")
+    if not potential_risk:
+        return None
+    pot_radius = potential_risk["potential_radius"]
+    counts = radial_counts.counts_within(pot_radius)
+    exposed = _population_within(population, pot_radius)
+    social = calculate_social_vulnerability(
+        counts,
+        land_use=satellite.get("land_use", "Inconnu"),
+        radius_meters=pot_radius,
+        population=exposed,
+    )
+    human = calculate_human_impact(counts, estimated_buildings=social.get("estimated_buildings"), population=exposed)
+    return {
+        **potential_risk,
+        "stats": {
+            "total_pop": human["total_population_exposed"],
+            "infrastructures": sum(v for k, v in counts.items() if k != "residential_buildings")
+        },
+    }
+
+
+def _global_score_stage(classification, satellite, spatial, direct_impact) -> Dict[str, Any]:
+    return calculate_global_impact(
+        ai_data=classification,
+        sat_data=satellite,
+        spatial_data=spatial,
+        social_score=direct_impact["social"]["score"]
+    )
+
+
+def radius_section(radius) -> Dict[str, Any]:
+    """Champs de la réponse connus dès l'étape radius (rayons direct et de vigilance)."""
+    vigilance = radius.get("indirect_vigilance")
+    return {
+        "impact_radius_meters": radius["final_radius"],
+        "radius_explanation": radius.get("radius_explanation", ""),
+        "indirect_vigilance_radius_meters": vigilance["potential_radius"] if vigilance else None,
+        "indirect_vigilance_explanation": vigilance["message"] if vigilance else None,
+    }
+
+
+def human_impact_section(direct_impact, indirect_vigilance, potential_risk) -> Dict[str, Any]:
+    """Champs de la réponse connus dès les étapes d'impact (direct, vigilance, risque potentiel)."""
+    social = direct_impact["social"]
+    return {
+        "human_impact": HumanImpact(**direct_impact["human"]),
+        "indirect_human_impact": HumanImpact(**indirect_vigilance["human"]) if indirect_vigilance else None,
+        "social_data": direct_impact["counts"],
+        "indirect_social_data": indirect_vigilance["counts"] if indirect_vigilance else None,
+        "social_vulnerability_score": social["score"],
+        "is_social_probabilistic": social["is_probabilistic"],
+        "is_indirect_social_probabilistic": indirect_vigilance["is_probabilistic"] if indirect_vigilance else False,
+        "potential_risk": potential_risk,
+    }
+
+
+def score_section(classification, radius, global_score) -> Dict[str, Any]:
+    """Champs de la réponse connus dès l'étape global_score."""
+    taxonomy = _taxonomy_entry(classification)
+    return {
+        "global_impact_score": global_score["impact_score"],
+        "base_severity": taxonomy.get("base_severity", 5),
+        "impact_tags": taxonomy.get("impact_tags", []),
+        "recommendation": (
+            f"Intervention directe recommandée dans un rayon de {radius['final_radius']}m. "
+            f"Score de gravité: {global_score['impact_score']}/10."
+        ),
+    }
+
+
+# Sections de la réponse publiées par le flux dès que leurs étapes sont terminées : (nom, étapes, construction)
+RESPONSE_SECTIONS = (
+    ("radius", ("radius",), radius_section),
+    ("human_impact", ("direct_impact", "indirect_vigilance", "potential_risk"), human_impact_section),
+    ("score", ("classification", "radius", "global_score"), score_section),
+)
+
+
+def _response_stage(
+    incident_id, latitude, longitude, deadline, inherited_degraded,
+    classification, spatial, satellite, geocoding, radius, direct_impact, indirect_vigilance, potential_risk, global_score,
+) -> AnalyzeResponse:
+    degraded = list(deadline.degraded)
+    degraded += [name for name in inherited_degraded if name not in degraded]
+    return AnalyzeResponse(
+        incident_id=incident_id,
+        latitude=latitude,
+        longitude=longitude,
+        ai_analysis=classification,
+        topography=SpatialData(**spatial),
+        satellite=SatelliteData(**satellite),
+        geocoding=geocoding,
+        is_degraded=bool(degraded),
+        degraded_providers=degraded,
+        **radius_section(radius),
+        **human_impact_section(direct_impact, indirect_vigilance, potential_risk),
+        **score_section(classification, radius, global_score),
+    )
+
+
+impact_graph = StageGraph(
+    [
+        Stage("classification", _classification_stage, ("image_source", "deadline")),
+        Stage("slope", _slope_stage, ("latitude", "longitude", "deadline")),
+        Stage("osm", _osm_stage, ("latitude", "longitude", "osm_radius", "osm_mode", "deadline")),
+        Stage("satellite", _satellite_stage, ("latitude", "longitude", "deadline")),
+        Stage("weather", _weather_stage, ("latitude", "longitude", "deadline")),
+        Stage(
+            "geocoding", _geocoding_stage, ("latitude", "longitude", "deadline"),
+            cache=geocoding_cache,
+            cache_key=lambda latitude, longitude, deadline: coordinate_key("geocoding", latitude, longitude),
+            should_cache=lambda value: value != DEFAULT_GEOCODING,
+        ),
+        Stage("spatial", _spatial_stage, ("slope", "weather")),
+        Stage("radius", _radius_stage, ("classification", "spatial", "osm", "satellite")),
+        Stage("osm_detail", _osm_detail_stage, ("osm", "radius", "latitude", "longitude", "deadline")),
+        Stage("radial_counts", _radial_counts_stage, ("osm_detail", "latitude", "longitude")),
+        Stage("population", _population_stage, ("radius", "latitude", "longitude")),
+        Stage("direct_impact", _direct_impact_stage, ("radius", "radial_counts", "population", "satellite")),
+        Stage("indirect_vigilance", _indirect_vigilance_stage, ("radius", "direct_impact", "radial_counts", "population", "satellite")),
+        Stage("potential_risk", _potential_risk_stage, ("radius", "radial_counts", "population", "satellite")),
+        Stage("global_score", _global_score_stage, ("classification", "satellite", "spatial", "direct_impact")),
+        Stage(
+            "response",
+            _response_stage,
+            (
+                "incident_id", "latitude", "longitude", "deadline", "inherited_degraded",
+                "classification", "spatial", "satellite", "geocoding", "radius",
+                "direct_impact", "indirect_vigilance", "potential_risk", "global_score",
+            ),
+        ),
+    ],
+    initial_inputs=PIPELINE_INPUTS,
+)
+
+
+def pipeline_inputs(
+    latitude: float,
+    longitude: float,
+    incident_id: Optional[str] = None,
+    image_source: Optional[Dict[str, Any]] = None,
+    deadline: Optional[AnalysisDeadline] = None,
+    osm_radius: int = MACRO_OSM_RADIUS,
+    osm_mode: Optional[str] = None,
+    **precomputed: Any,
+) -> Dict[str, Any]:
+    """
+    Valeurs initiales du graphe. `precomputed` fournit des étapes déjà calculées (classification,
+    contexte partagé d'un lot) qui ne seront pas réexécutées; la clé `degraded` d'un contexte
+    partagé est reportée dans les fournisseurs dégradés du résultat.
+    """
+    inherited_degraded: List[str] = list(precomputed.pop("degraded", []))
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "incident_id": incident_id,
+        "image_source": image_source,
+        "deadline": deadline if deadline is not None else AnalysisDeadline(),
+        "osm_radius": osm_radius,
+        "osm_mode": osm_mode or settings.OSM_FETCH_MODE,
+        "inherited_degraded": inherited_degraded,
+        **precomputed,
+    }
+
+
+async def run_pipeline(initial: Dict[str, Any]) -> AnalyzeResponse:
+    values = await impact_graph.run(initial, targets=("response",))
+    return values["response"]
+
+
+async def collect_geo_context(
+    latitude: float,
+    longitude: float,
+    osm_radius: int = MACRO_OSM_RADIUS,
+    deadline: Optional[AnalysisDeadline] = None,
+    osm_mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Collecte du contexte Macro (pente, OSM, satellite, météo, géocodage) autour d'un point."""
+    initial = pipeline_inputs(latitude, longitude, deadline=deadline, osm_radius=osm_radius, osm_mode=osm_mode)
+    values = await impact_graph.run(initial, targets=GEO_STAGES)
+    context = {name: values[name] for name in GEO_STAGES}
+    context["degraded"] = [name for name in initial["deadline"].degraded if name in GEO_STAGES]
+    return context
+
+
+async def analyze_url_request(request: AnalyzeRequest, deadline: Optional[AnalysisDeadline] = None) -> AnalyzeResponse:
+    """Analyse complète d'un incident par URL d'image (endpoint /analyze et tâches asynchrones)."""
+    return await run_pipeline(pipeline_inputs(
+        request.latitude, request.longitude, request.incident_id,
+        image_source={"url": request.image_url}, deadline=deadline,
+    ))
+
+
+async def analyze_image_upload(
+    image_bytes: bytes,
+    mime_type: str,
+    latitude: float,
+    longitude: float,
+    incident_id: Optional[str] = None,
+    deadline: Optional[AnalysisDeadline] = None,
+) -> AnalyzeResponse:
+    """Analyse complète d'un incident à partir d'une image envoyée directement."""
+    return await run_pipeline(pipeline_inputs(
+        latitude, longitude, incident_id,
+        image_source={"bytes": image_bytes, "mime_type": mime_type}, deadline=deadline,
+    ))
+
+
+def exposure_radii(step: float, max_radius: float) -> List[float]:
+    """Rayons de la courbe d'exposition : multiples du pas, jusqu'au rayon maximal inclus."""
+    radii = [step * i for i in range(1, int(max_radius // step) + 1)]
+    if not radii or radii[-1] < max_radius:
+        radii.append(max_radius)
+    return radii
+
+
+def exposure_point(
+    radial_counts: RadialCounts,
+    land_use: str,
+    radius: float,
+    population: Optional[RadialPopulation] = None,
+) -> ExposurePoint:
+    """Vulnérabilité sociale et population exposée dans un rayon, à partir des décomptes cumulés."""
+    counts = radial_counts.counts_within(radius)
+    exposed = _population_within(population, radius)
+    social = calculate_social_vulnerability(counts, land_use=land_use, radius_meters=radius, population=exposed)
+    human = calculate_human_impact(counts, estimated_buildings=social.get("estimated_buildings"), population=exposed)
+    return ExposurePoint(
+        radius_meters=radius,
+        social_data=counts,
+        social_vulnerability_score=social["score"],
+        is_social_probabilistic=social["is_probabilistic"],
+        human_impact=HumanImpact(**human),
+    )
+
+
+async def exposure_curve(
+    latitude: float,
+    longitude: float,
+    step: float,
+    max_radius: float = MACRO_OSM_RADIUS,
+    deadline: Optional[AnalysisDeadline] = None,
+) -> ExposureCurveResponse:
+    """
+    Courbe d'exposition (population et structures) en fonction du rayon d'intervention.
+    Les éléments OSM Macro ne sont triés par distance qu'une fois par point : chaque rayon de la
+    courbe est ensuite une recherche dichotomique, et les appels suivants réutilisent le cache.
+    """
+    # La génération de l'index OSM local fait partie de la clé : une mise à jour invalide les courbes
+    key = ("exposure", osm_data_version(), latitude, longitude)
+    hit, context = exposure_cache.get(key)
+    if not hit:
+        # La courbe couvre tout le rayon Macro : les éléments complets sont nécessaires
+        initial = pipeline_inputs(latitude, longitude, deadline=deadline, osm_mode="full")
+        values = await impact_graph.run(initial, targets=("osm", "satellite"))
+        context = {
+            "radial_counts": RadialCounts.from_osm(values["osm"], latitude, longitude),
+            "land_use": values["satellite"].get("land_use", "Inconnu"),
+            # Comme les éléments OSM, la population couvre tout le rayon Macro (contexte mis en cache)
+            "population": await radial_population(latitude, longitude, MACRO_OSM_RADIUS),
+            "degraded": [name for name in initial["deadline"].degraded if name in ("osm", "satellite")],
+        }
+        if not context["degraded"]:
+            exposure_cache.set(key, context)
+
+    return ExposureCurveResponse(
+        latitude=latitude,
+        longitude=longitude,
+        land_use=context["land_use"],
+        points=[
+            exposure_point(context["radial_counts"], context["land_use"], radius, context["population"])
+            for radius in exposure_radii(step, max_radius)
+        ],
+        is_degraded=bool(context["degraded"]),
+        degraded_providers=context["degraded"],
+    )
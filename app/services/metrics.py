@@ -0,0 +1,139 @@
+"""
+Métriques Prometheus du Moteur d'Impact (exposées sur /metrics).
+
+- Durée de chaque phase du pipeline d'analyse (`impact_phase_duration_seconds`).
+- Durée et issue des appels à chaque fournisseur externe (`impact_provider_request_duration_seconds`).
+- Replis sur valeurs par défaut (`impact_provider_fallbacks_total`, `impact_vision_default_responses_total`).
+- Analyses et appels fournisseurs en cours (`impact_analyses_in_progress`, `impact_provider_requests_in_progress`).
+"""
+import time
+from contextlib import contextmanager
+from typing import Iterator
+from urllib.parse import urlsplit
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Les fournisseurs mettent de quelques millisecondes (cache) à plusieurs dizaines de secondes (Overpass, Gemini)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+PROVIDER_HOSTS = {
+    "overpass-api.de": "overpass",
+    "overpass.kumi.systems": "overpass",
+    "overpass.private.coffee": "overpass",
+    "api.open-meteo.com": "open_meteo",
+    "nominatim.openstreetmap.org": "nominatim",
+    "generativelanguage.googleapis.com": "gemini",
+    "api.deepseek.com": "deepseek",
+}
+
+ANALYSIS_REQUESTS = Counter(
+    "impact_analyses_total",
+    "Analyses d'impact terminées, par endpoint et par issue.",
+    ["endpoint", "outcome"],
+)
+ANALYSES_IN_PROGRESS = Gauge(
+    "impact_analyses_in_progress",
+    "Analyses d'impact en cours, par endpoint.",
+    ["endpoint"],
+)
+ANALYSIS_DURATION = Histogram(
+    "impact_analysis_duration_seconds",
+    "Durée totale d'une analyse d'impact, par endpoint.",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+PHASE_DURATION = Histogram(
+    "impact_phase_duration_seconds",
+    "Durée de chaque phase du pipeline d'analyse.",
+    ["phase"],
+    buckets=LATENCY_BUCKETS,
+)
+PROVIDER_DURATION = Histogram(
+    "impact_provider_request_duration_seconds",
+    "Durée des appels aux fournisseurs externes.",
+    ["provider", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+PROVIDER_IN_PROGRESS = Gauge(
+    "impact_provider_requests_in_progress",
+    "Appels aux fournisseurs externes en cours.",
+    ["provider"],
+)
+PROVIDER_FALLBACKS = Counter(
+    "impact_provider_fallbacks_total",
+    "Replis sur la valeur par défaut d'un fournisseur (erreur ou dépassement de délai).",
+    ["provider", "reason"],
+)
+SINGLEFLIGHT_COALESCED = Counter(
+    "impact_singleflight_coalesced_total",
+    "Appels fournisseurs évités car regroupés avec un appel identique en cours.",
+    ["provider"],
+)
+RESULT_CACHE_REQUESTS = Counter(
+    "impact_result_cache_requests_total",
+    "Consultations du cache des résultats d'analyse (hit, miss, bypass).",
+    ["outcome"],
+)
+VISION_DEFAULT_RESPONSES = Counter(
+    "impact_vision_default_responses_total",
+    "Classifications remplacées par la réponse par défaut du moteur visuel.",
+)
+
+
+def provider_for_url(url: str) -> str:
+    """Nom du fournisseur (label Prometheus) correspondant à l'hôte d'une URL sortante."""
+    host = urlsplit(url).hostname or ""
+    if host in PROVIDER_HOSTS:
+        return PROVIDER_HOSTS[host]
+    if host.endswith(".supabase.co"):
+        return "supabase"
+    return "other"
+
+
+@contextmanager
+def track_provider_call(provider: str) -> Iterator[None]:
+    """Mesure un appel fournisseur (durée, issue 'success'/'error') et le compte comme en cours."""
+    PROVIDER_IN_PROGRESS.labels(provider).inc()
+    start = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        PROVIDER_IN_PROGRESS.labels(provider).dec()
+        PROVIDER_DURATION.labels(provider, outcome).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def track_phase(phase: str) -> Iterator[None]:
+    """Mesure la durée d'une phase du pipeline d'analyse."""
+    with PHASE_DURATION.labels(phase).time():
+        yield
+
+
+@contextmanager
+def track_analysis(endpoint: str) -> Iterator[None]:
+    """Mesure une analyse complète : durée, issue et jauge des analyses en cours."""
+    ANALYSES_IN_PROGRESS.labels(endpoint).inc()
+    start = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        ANALYSES_IN_PROGRESS.labels(endpoint).dec()
+        ANALYSIS_DURATION.labels(endpoint).observe(time.perf_counter() - start)
+        ANALYSIS_REQUESTS.labels(endpoint, outcome).inc()
+
+
+def record_fallback(provider: str, reason: str) -> None:
+    PROVIDER_FALLBACKS.labels(provider, reason).inc()
+
+
+def render_metrics() -> bytes:
+    return generate_latest()
+
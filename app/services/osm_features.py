@@ -0,0 +1,314 @@
+"""
+Infrastructures OSM suivies par le Moteur d'Impact : filtres de la requête Overpass,
+classification des tags en masque de catégories (calculé une seule fois par élément)
+et représentation compacte en colonnes des éléments reçus (`OsmElements`).
+"""
+import struct
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Bits de classe (un élément peut en cumuler plusieurs, ex: bâtiment + école)
+HEALTH = 1 << 0          # amenity=hospital|clinic
+MATERNITY = 1 << 1       # amenity=maternity
+SCHOOL = 1 << 2          # amenity=school|college
+NURSERY = 1 << 3         # amenity=kindergarten|nursery|childcare
+MARKET = 1 << 4          # amenity=market|marketplace
+WATER_AMENITY = 1 << 5   # amenity=drinking_water|water_point
+WATER_WORKS = 1 << 6     # man_made=water_well|water_tap
+ROAD = 1 << 7            # highway=primary|secondary|bridge
+BUILDING = 1 << 8        # building=* (sauf "no")
+
+OSM_COUNT_KEYS = (
+    "health_centers",
+    "maternities",
+    "schools",
+    "nurseries",
+    "markets",
+    "water_points",
+    "main_roads_bridges",
+    "residential_buildings",
+)
+
+# Chaque règle ajoute 1 au décompte si l'élément porte l'un des bits.
+# Une maternité compte aussi en santé générale, une crèche en éducation,
+# et un point d'eau peut compter deux fois (amenity + man_made).
+COUNT_RULES: Tuple[Tuple[str, int], ...] = (
+    ("health_centers", HEALTH | MATERNITY),
+    ("maternities", MATERNITY),
+    ("schools", SCHOOL | NURSERY),
+    ("nurseries", NURSERY),
+    ("markets", MARKET),
+    ("water_points", WATER_AMENITY),
+    ("water_points", WATER_WORKS),
+    ("main_roads_bridges", ROAD),
+    ("residential_buildings", BUILDING),
+)
+
+_AMENITY_BITS = {
+    "hospital": HEALTH,
+    "clinic": HEALTH,
+    "maternity": MATERNITY,
+    "school": SCHOOL,
+    "college": SCHOOL,
+    "kindergarten": NURSERY,
+    "nursery": NURSERY,
+    "childcare": NURSERY,
+    "market": MARKET,
+    "marketplace": MARKET,
+    "drinking_water": WATER_AMENITY,
+    "water_point": WATER_AMENITY,
+}
+
+
+def empty_osm_counts() -> Dict[str, int]:
+    return {key: 0 for key in OSM_COUNT_KEYS}
+
+
+def classify_osm_tags(tags: Dict[str, str]) -> int:
+    """Retourne le masque de catégories d'un élément OSM à partir de ses tags."""
+    mask = _AMENITY_BITS.get(tags.get("amenity", ""), 0)
+    if tags.get("man_made", "") in ("water_well", "water_tap"):
+        mask |= WATER_WORKS
+    if tags.get("highway", "") in ("primary", "secondary", "bridge"):
+        mask |= ROAD
+    building = tags.get("building", "")
+    if building and building != "no":
+        mask |= BUILDING
+    return mask
+
+
+def add_mask_to_counts(counts: Dict[str, int], mask: int) -> None:
+    for key, bits in COUNT_RULES:
+        if mask & bits:
+            counts[key] += 1
+
+
+def counts_from_masks(masks: Iterable[int]) -> Dict[str, int]:
+    counts = empty_osm_counts()
+    for mask in masks:
+        add_mask_to_counts(counts, mask)
+    return counts
+
+
+def rule_hits(masks: np.ndarray) -> np.ndarray:
+    """
+    Contributions de chaque élément aux décomptes (une ligne par élément, une colonne par clé
+    de OSM_COUNT_KEYS), calculées sur le tableau des masques en une opération par règle.
+    """
+    hits = np.zeros((len(masks), len(OSM_COUNT_KEYS)), dtype=np.int64)
+    for key, bits in COUNT_RULES:
+        hits[:, OSM_COUNT_KEYS.index(key)] += (masks & bits) != 0
+    return hits
+
+
+def element_position(el: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    """Position d'un élément Overpass (nœud ou centre d'un way)."""
+    el_lat = el.get("lat") or (el.get("center", {}).get("lat"))
+    el_lon = el.get("lon") or (el.get("center", {}).get("lon"))
+    return el_lat, el_lon
+
+
+def element_mask(el: Dict[str, Any]) -> int:
+    """Masque d'un élément, déjà calculé (format compact) ou dérivé de ses tags (format Overpass brut)."""
+    if "mask" in el:
+        return el["mask"]
+    return classify_osm_tags(el.get("tags", {}))
+
+
+class OsmElements:
+    """
+    Éléments OSM au format colonnes : identifiants (int64), latitudes et longitudes (float32,
+    précision ~0.1 m) et masques de catégories (uint16). Les tags sont classés une seule fois, à la
+    réception : les tags bruts ne sont pas conservés et les filtres ne manipulent que ces tableaux.
+    """
+
+    __slots__ = ("ids", "lats", "lons", "masks")
+
+    # Format binaire (petit-boutiste) : nombre d'éléments puis chaque colonne, compressé par zlib
+    _HEADER = struct.Struct("<I")
+    _DTYPES = ("<i8", "<f4", "<f4", "<u2")
+
+    def __init__(self, ids: Iterable[int], lats: Iterable[float], lons: Iterable[float], masks: Iterable[int]):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.lats = np.asarray(lats, dtype=np.float32)
+        self.lons = np.asarray(lons, dtype=np.float32)
+        self.masks = np.asarray(masks, dtype=np.uint16)
+
+    @classmethod
+    def empty(cls) -> "OsmElements":
+        return cls([], [], [], [])
+
+    @classmethod
+    def from_overpass(cls, elements: Iterable[Dict[str, Any]]) -> "OsmElements":
+        """Convertit des éléments Overpass (bruts ou compacts); ignore ceux sans position ou non classés."""
+        builder = OsmElementsBuilder()
+        for el in elements:
+            builder.add(el)
+        return builder.build()
+
+    @classmethod
+    def concat(cls, parts: Iterable["OsmElements"]) -> "OsmElements":
+        parts = list(parts)
+        if not parts:
+            return cls.empty()
+        return cls(
+            np.concatenate([part.ids for part in parts]),
+            np.concatenate([part.lats for part in parts]),
+            np.concatenate([part.lons for part in parts]),
+            np.concatenate([part.masks for part in parts]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, selector) -> "OsmElements":
+        """Sous-ensemble (masque booléen ou indices)."""
+        return OsmElements(self.ids[selector], self.lats[selector], self.lons[selector], self.masks[selector])
+
+    def counts(self) -> Dict[str, int]:
+        return dict(zip(OSM_COUNT_KEYS, rule_hits(self.masks).sum(axis=0).tolist()))
+
+    def rows(self) -> List[Tuple[int, float, float, int]]:
+        """Lignes (id, lat, lon, masque) pour l'inspection ou l'affichage."""
+        return list(zip(self.ids.tolist(), self.lats.tolist(), self.lons.tolist(), self.masks.tolist()))
+
+    def to_bytes(self) -> bytes:
+        columns = (self.ids, self.lats, self.lons, self.masks)
+        body = b"".join(column.astype(dtype, copy=False).tobytes() for column, dtype in zip(columns, self._DTYPES))
+        return zlib.compress(self._HEADER.pack(len(self)) + body)
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "OsmElements":
+        raw = zlib.decompress(payload)
+        (count,) = cls._HEADER.unpack_from(raw)
+        offset = cls._HEADER.size
+        columns = []
+        for dtype in cls._DTYPES:
+            column = np.frombuffer(raw, dtype=dtype, count=count, offset=offset)
+            offset += column.nbytes
+            columns.append(column)
+        return cls(*columns)
+
+
+class OsmElementsBuilder:
+    """
+    Construction incrémentale d'un `OsmElements` : chaque élément est classé à son arrivée puis
+    réduit à ses colonnes (tableaux typés `array`), sans conserver le dictionnaire Overpass.
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.lats = array("f")
+        self.lons = array("f")
+        self.masks = array("H")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, el: Dict[str, Any]) -> bool:
+        """Ajoute un élément (brut ou compact) ; False s'il est ignoré (sans position ou non classé)."""
+        el_lat, el_lon = element_position(el)
+        if el_lat is None or el_lon is None:
+            return False
+        mask = element_mask(el)
+        if not mask:
+            return False
+        self.ids.append(el.get("id") or 0)
+        self.lats.append(el_lat)
+        self.lons.append(el_lon)
+        self.masks.append(mask)
+        return True
+
+    def build(self) -> OsmElements:
+        # Copie : le constructeur peut continuer à recevoir des éléments après coup
+        return OsmElements(
+            np.array(self.ids, dtype=np.int64),
+            np.array(self.lats, dtype=np.float32),
+            np.array(self.lons, dtype=np.float32),
+            np.array(self.masks, dtype=np.uint16),
+        )
+
+
+def element_arrays(elements) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Latitudes, longitudes (float64) et masques (uint16) des éléments positionnés."""
+    if not isinstance(elements, OsmElements):
+        elements = OsmElements.from_overpass(elements)
+    return elements.lats.astype(np.float64), elements.lons.astype(np.float64), elements.masks
+
+
+def compact_element(el: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Réduit un élément Overpass brut à {id, lat, lon, mask}; None s'il n'est pas exploitable."""
+    el_lat, el_lon = element_position(el)
+    if el_lat is None or el_lon is None:
+        return None
+    mask = classify_osm_tags(el.get("tags", {}))
+    if not mask:
+        return None
+    return {"id": el.get("id"), "lat": el_lat, "lon": el_lon, "mask": mask}
+
+
+def build_overpass_query(area: str) -> str:
+    """Construit la requête Overpass des infrastructures suivies pour un filtre de zone (around ou bbox)."""
+    return f"""
+    [out:json];
+    (
+      node["amenity"~"hospital|clinic|maternity"]{area};
+      way["amenity"~"hospital|clinic|maternity"]{area};
+
+      node["amenity"~"school|kindergarten|college|nursery|childcare"]{area};
+      way["amenity"~"school|kindergarten|college|nursery|childcare"]{area};
+
+      node["amenity"~"market|marketplace"]{area};
+      way["amenity"~"market|marketplace"]{area};
+
+      node["amenity"~"drinking_water|water_point"]{area};
+      node["man_made"~"water_well|water_tap"]{area};
+
+      way["highway"~"primary|secondary|bridge"]{area};
+
+      way["building"]{area};
+      node["building"]{area};
+    );
+    out center;
+    """
+
+
+def _node_and_way(tag_filter: str) -> Tuple[str, ...]:
+    return (f"node{tag_filter}", f"way{tag_filter}")
+
+
+# Filtres Overpass de chaque décompte (mêmes règles que classify_osm_tags), pour les requêtes "out count".
+# Seule différence : un point d'eau portant à la fois amenity et man_made n'y est compté qu'une fois.
+COUNT_QUERY_FILTERS: Dict[str, Tuple[str, ...]] = {
+    "health_centers": _node_and_way('["amenity"~"^(hospital|clinic|maternity)$"]'),
+    "maternities": _node_and_way('["amenity"="maternity"]'),
+    "schools": _node_and_way('["amenity"~"^(school|college|kindergarten|nursery|childcare)$"]'),
+    "nurseries": _node_and_way('["amenity"~"^(kindergarten|nursery|childcare)$"]'),
+    "markets": _node_and_way('["amenity"~"^(market|marketplace)$"]'),
+    "water_points": ('node["amenity"~"^(drinking_water|water_point)$"]', 'node["man_made"~"^(water_well|water_tap)$"]'),
+    "main_roads_bridges": ('way["highway"~"^(primary|secondary|bridge)$"]',),
+    "residential_buildings": _node_and_way('["building"]["building"!="no"]'),
+}
+
+
+def build_overpass_count_query(area: str) -> str:
+    """
+    Requête Overpass ne retournant que les décomptes (un résultat "count" par clé de
+    OSM_COUNT_KEYS, dans cet ordre) : quelques octets au lieu de tous les éléments avec leurs tags.
+    """
+    blocks = []
+    for key in OSM_COUNT_KEYS:
+        statements = " ".join(f"{selector}{area};" for selector in COUNT_QUERY_FILTERS[key])
+        blocks.append(f"({statements}); out count;")
+    return "[out:json];\n" + "\n".join(blocks)
+
+
+def counts_from_count_response(payload: Dict[str, Any]) -> Dict[str, int]:
+    """Décomptes d'une réponse à `build_overpass_count_query`."""
+    results = [el for el in payload.get("elements", []) if el.get("type") == "count"]
+    if len(results) != len(OSM_COUNT_KEYS):
+        raise ValueError(f"Réponse 'out count' inattendue : {len(results)} décomptes pour {len(OSM_COUNT_KEYS)} clés")
+    return {key: int(result.get("tags", {}).get("total", 0)) for key, result in zip(OSM_COUNT_KEYS, results)}
@@ -0,0 +1,534 @@
+"""
+Index spatial OSM hors ligne.
+
+Un extrait OSM régional (PBF ou GeoJSON, ex: Mali / Afrique de l'Ouest) est converti une fois,
+par `scripts/build_osm_index.py`, en points classés (`OsmElements`) enregistrés sur disque (.npz).
+Au chargement, un KD-tree (scipy) est construit sur les positions projetées sur la sphère unité :
+un disque de rayon r autour d'un point devient une boule de corde 2·sin(r / 2R), ce qui permet
+à `get_osm_data` de répondre localement, sans appel Overpass, pour toute zone couverte par l'extrait.
+Les décomptes seuls d'un grand disque (`counts_within`) passent par une pyramide de décomptes
+pré-agrégés par cellule H3 (`OsmCellCounts`), sans parcourir les éléments de l'intérieur du disque.
+
+L'index est tenu à jour par `scripts/update_osm_index.py`, qui applique les fichiers de
+changements OSM (.osc) sans reconstruction complète. Chaque mise à jour incrémente la génération
+de l'index (`osm_data_version`) : les caches construits à partir d'une génération précédente
+(résultats d'analyse, courbes d'exposition) ne sont plus consultés. Un processus en cours
+recharge l'index en arrière-plan dès que le fichier sur disque a changé.
+"""
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from app.config import settings
+from app.services.osm_cells import OsmCellCounts
+from app.services.osm_features import OsmElements, classify_osm_tags
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_METERS = 6371000
+INDEX_FORMAT_VERSION = 1
+
+# Emprise (sud, ouest, nord, est) en degrés
+BBox = Tuple[float, float, float, float]
+
+# Type OSM de chaque élément indexé (un nœud et un way peuvent partager le même identifiant)
+NODE = 0
+WAY = 1
+_KINDS = {"node": NODE, "way": WAY}
+
+
+def unit_vectors(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Positions sur la sphère unité (x, y, z) de tableaux de coordonnées en degrés."""
+    phi = np.radians(np.asarray(lats, dtype=np.float64))
+    lam = np.radians(np.asarray(lons, dtype=np.float64))
+    return np.column_stack((np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)))
+
+
+def chord_for_distance(meters: float) -> float:
+    """Corde (sphère unité) correspondant à une distance au sol."""
+    return 2 * math.sin(min(meters / (2 * EARTH_RADIUS_METERS), math.pi / 2))
+
+
+class OsmSpatialIndex:
+    """Points OSM classés d'un extrait régional, interrogeables par disque."""
+
+    def __init__(
+        self,
+        elements: OsmElements,
+        bbox: BBox,
+        kinds: Optional[np.ndarray] = None,
+        source: str = "",
+        built_at: float = 0.0,
+        generation: int = 0,
+    ):
+        self.elements = elements
+        self.kinds = np.zeros(len(elements), dtype=np.int8) if kinds is None else np.asarray(kinds, dtype=np.int8)
+        self.bbox = bbox
+        self.source = source
+        self.built_at = built_at
+        self.generation = generation
+        self._tree = cKDTree(unit_vectors(elements.lats, elements.lons)) if len(elements) else None
+        self._cell_counts: Optional[OsmCellCounts] = None
+        self._cell_counts_lock = threading.Lock()
+
+    @classmethod
+    def build(
+        cls,
+        elements: OsmElements,
+        kinds: Optional[np.ndarray] = None,
+        source: str = "",
+        bbox: Optional[BBox] = None,
+    ) -> "OsmSpatialIndex":
+        """Index d'un extrait ; sans `bbox` explicite, l'emprise est celle des éléments."""
+        if bbox is None and len(elements):
+            bbox = (
+                float(elements.lats.min()), float(elements.lons.min()),
+                float(elements.lats.max()), float(elements.lons.max()),
+            )
+        elif bbox is None:
+            bbox = (0.0, 0.0, 0.0, 0.0)
+        return cls(elements, bbox, kinds=kinds, source=source, built_at=time.time())
+
+    @property
+    def version(self) -> str:
+        """
+        Version des données de l'index. Une reconstruction complète repart de la génération 0 :
+        la date de construction distingue deux index de même génération (caches invalidés).
+        """
+        return f"index-{self.generation}@{self.built_at:.6f}"
+
+    def covers(self, lat: float, lon: float, radius: float) -> bool:
+        """Vrai si le disque (lat, lon, radius) est entièrement dans l'emprise de l'extrait."""
+        south, west, north, east = self.bbox
+        dlat = math.degrees(radius / EARTH_RADIUS_METERS)
+        dlon = dlat / max(math.cos(math.radians(lat)), 0.01)
+        return south <= lat - dlat and lat + dlat <= north and west <= lon - dlon and lon + dlon <= east
+
+    def candidates(self, lat: float, lon: float, radius: float) -> OsmElements:
+        """
+        Éléments de la boule de corde du disque (lat, lon, radius), avec une légère marge :
+        l'appelant applique ensuite le même filtre haversine que pour les tuiles.
+        """
+        if self._tree is None:
+            return OsmElements.empty()
+        chord = chord_for_distance(radius) * 1.000001 + 1e-12
+        found = self._tree.query_ball_point(unit_vectors([lat], [lon])[0], chord)
+        if not found:
+            return OsmElements.empty()
+        return self.elements[np.sort(np.asarray(found, dtype=np.int64))]
+
+    @property
+    def cell_counts(self) -> OsmCellCounts:
+        """Pyramide H3 des décomptes, construite au premier usage (l'index n'est jamais modifié en place)."""
+        with self._cell_counts_lock:
+            if self._cell_counts is None:
+                self._cell_counts = OsmCellCounts(self.elements, settings.OSM_CELL_RESOLUTIONS)
+            return self._cell_counts
+
+    def counts_within(self, lat: float, lon: float, radius: float) -> Dict[str, int]:
+        """Décomptes exacts du disque (lat, lon, radius), en O(cellules) plutôt qu'en O(éléments)."""
+        return self.cell_counts.counts_within(lat, lon, radius)
+
+    def keys(self) -> np.ndarray:
+        """Clé unique (identifiant, type) de chaque élément indexé."""
+        return self.elements.ids * 2 + self.kinds
+
+    def apply_changes(self, changes: Iterable["OsmChange"]) -> Tuple["OsmSpatialIndex", Dict[str, int]]:
+        """
+        Nouvel index (génération suivante) après application de changements OSM dans l'ordre.
+
+        Un way sans centre explicite est placé au centre de l'emprise de ses nœuds, cherchés parmi
+        les nœuds du fichier de changements (y compris non classés) puis parmi les nœuds indexés.
+        Un élément modifié dont la position reste inconnue garde sa position indexée ; un élément
+        créé sans position est ignoré (les ways dont aucun nœud n'est résolu sont comptés à part).
+        Les éléments hors de l'emprise de l'index sont écartés : un fichier de changements
+        planétaire ne fait pas grossir un index régional.
+        """
+        changes = list(changes)
+        keys = self.keys()
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        def indexed_position(key: int) -> Tuple[Optional[float], Optional[float]]:
+            slot = np.searchsorted(sorted_keys, key)
+            if slot < len(sorted_keys) and sorted_keys[slot] == key:
+                row = order[slot]
+                return float(self.elements.lats[row]), float(self.elements.lons[row])
+            return None, None
+
+        # Positions des nœuds portées par le fichier (les sommets d'un nouveau bâtiment n'ont pas de tags)
+        diff_nodes = {
+            change.osm_id: (change.lat, change.lon)
+            for change in changes
+            if change.kind == NODE and change.action != "delete" and change.lat is not None and change.lon is not None
+        }
+
+        def way_position(refs: Tuple[int, ...]) -> Tuple[Optional[float], Optional[float]]:
+            points = [diff_nodes.get(ref) or indexed_position(ref * 2 + NODE) for ref in refs]
+            points = [point for point in points if point[0] is not None]
+            if not points:
+                return None, None
+            lats, lons = zip(*points)
+            return (min(lats) + max(lats)) / 2, (min(lons) + max(lons)) / 2
+
+        south, west, north, east = self.bbox
+        stats = {"create": 0, "modify": 0, "delete": 0, "skipped": 0, "unresolved_ways": 0, "outside": 0}
+        # Dernier état connu de chaque élément touché : None = retiré de l'index
+        final: Dict[int, Optional[Tuple[int, int, float, float, int]]] = {}
+        for change in changes:
+            key = change.osm_id * 2 + change.kind
+            stats[change.action] += 1
+            if change.action == "delete":
+                final[key] = None
+                continue
+            mask = classify_osm_tags(change.tags)
+            lat, lon = change.lat, change.lon
+            if (lat is None or lon is None) and change.refs:
+                lat, lon = way_position(change.refs)
+            if lat is None or lon is None:
+                previous = final.get(key)
+                lat, lon = (previous[2], previous[3]) if previous else indexed_position(key)
+            if lat is None or lon is None:
+                stats["skipped"] += 1
+                if change.kind == WAY and mask:
+                    stats["unresolved_ways"] += 1
+                final[key] = None
+                continue
+            if not (south <= lat <= north and west <= lon <= east):
+                stats["outside"] += 1
+                final[key] = None
+                continue
+            final[key] = (change.osm_id, change.kind, lat, lon, mask) if mask else None
+
+        if stats["unresolved_ways"]:
+            logger.warning(
+                f"Index OSM : {stats['unresolved_ways']} way(s) classé(s) ignoré(s), nœuds absents du fichier "
+                "de changements et de l'index (diff non augmenté de leurs coordonnées)"
+            )
+        kept = ~np.isin(keys, np.fromiter(final.keys(), dtype=np.int64, count=len(final)))
+        added = [entry for entry in final.values() if entry is not None]
+        additions = OsmElements(
+            [entry[0] for entry in added], [entry[2] for entry in added],
+            [entry[3] for entry in added], [entry[4] for entry in added],
+        )
+        index = OsmSpatialIndex(
+            OsmElements.concat([self.elements[kept], additions]),
+            self.bbox,
+            kinds=np.concatenate([self.kinds[kept], np.asarray([entry[1] for entry in added], dtype=np.int8)]),
+            source=self.source,
+            built_at=time.time(),
+            generation=self.generation + 1,
+        )
+        return index, stats
+
+    def save(self, path: str) -> None:
+        """Écrit l'index de façon atomique (fichier temporaire puis renommage)."""
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as handle:
+            np.savez(
+                handle,
+                ids=self.elements.ids,
+                kinds=self.kinds,
+                lats=self.elements.lats,
+                lons=self.elements.lons,
+                masks=self.elements.masks,
+                bbox=np.asarray(self.bbox, dtype=np.float64),
+                meta=np.asarray(json.dumps({
+                    "version": INDEX_FORMAT_VERSION,
+                    "source": self.source,
+                    "built_at": self.built_at,
+                    "generation": self.generation,
+                })),
+            )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "OsmSpatialIndex":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != INDEX_FORMAT_VERSION:
+                raise ValueError(f"Version d'index OSM non supportée : {meta.get('version')}")
+            elements = OsmElements(data["ids"], data["lats"], data["lons"], data["masks"])
+            kinds = data["kinds"] if "kinds" in data.files else None
+            bbox = tuple(float(value) for value in data["bbox"])
+        return cls(
+            elements, bbox, kinds=kinds,
+            source=meta.get("source", ""),
+            built_at=meta.get("built_at", 0.0),
+            generation=meta.get("generation", 0),
+        )
+
+
+# --- Ingestion d'extraits OSM ---
+
+def _osm_id(value: Any) -> int:
+    """Identifiant numérique d'un élément ("node/123", "way/45", 67...)."""
+    match = re.search(r"(\d+)$", str(value or ""))
+    return int(match.group(1)) if match else 0
+
+
+def _geometry_center(geometry: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    """Centre (lat, lon) d'une géométrie GeoJSON : le point lui-même, sinon le centre de son emprise."""
+    if not geometry:
+        return None, None
+    if geometry.get("type") == "Point":
+        lon, lat = geometry["coordinates"][:2]
+        return lat, lon
+
+    def positions(coords: Any) -> Iterator[Tuple[float, float]]:
+        if coords and isinstance(coords[0], (int, float)):
+            yield coords[0], coords[1]
+        else:
+            for item in coords or []:
+                yield from positions(item)
+
+    points = list(positions(geometry.get("coordinates")))
+    if not points:
+        return None, None
+    lons, lats = zip(*points)
+    # Comme "out center" d'Overpass : centre de l'emprise du way
+    return (min(lats) + max(lats)) / 2, (min(lons) + max(lons)) / 2
+
+
+class _IndexRows:
+    """Accumulateur des colonnes d'un index en cours de construction."""
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self.kinds: List[int] = []
+        self.lats: List[float] = []
+        self.lons: List[float] = []
+        self.masks: List[int] = []
+
+    def add(self, kind: int, osm_id: int, lat: float, lon: float, mask: int) -> None:
+        self.ids.append(osm_id)
+        self.kinds.append(kind)
+        self.lats.append(lat)
+        self.lons.append(lon)
+        self.masks.append(mask)
+
+    def result(self) -> Tuple[OsmElements, np.ndarray]:
+        return OsmElements(self.ids, self.lats, self.lons, self.masks), np.asarray(self.kinds, dtype=np.int8)
+
+
+def elements_from_geojson(features: Iterable[Dict[str, Any]]) -> Tuple[OsmElements, np.ndarray]:
+    """Convertit des entités GeoJSON (tags à plat ou sous "tags") en points classés et leurs types."""
+    rows = _IndexRows()
+    for feature in features:
+        properties = feature.get("properties") or {}
+        tags = properties.get("tags") if isinstance(properties.get("tags"), dict) else properties
+        mask = classify_osm_tags(tags)
+        if not mask:
+            continue
+        geometry = feature.get("geometry")
+        lat, lon = _geometry_center(geometry)
+        if lat is None or lon is None:
+            continue
+        reference = feature.get("id") or properties.get("@id") or properties.get("osm_id")
+        kind_name = str(properties.get("@type") or properties.get("osm_type") or reference or "").split("/")[0]
+        kind = _KINDS.get(kind_name, NODE if geometry.get("type") == "Point" else WAY)
+        rows.add(kind, _osm_id(reference), lat, lon, mask)
+    return rows.result()
+
+
+def load_geojson(path: str) -> Tuple[OsmElements, np.ndarray]:
+    with open(path, "r", encoding="utf-8") as handle:
+        collection = json.load(handle)
+    return elements_from_geojson(collection.get("features", []))
+
+
+def load_pbf(path: str) -> Tuple[OsmElements, np.ndarray]:
+    """Lit un extrait .osm.pbf (nœuds et ways classés) ; nécessite la dépendance optionnelle `osmium`."""
+    try:
+        import osmium
+    except ImportError as e:
+        raise RuntimeError("La lecture des fichiers PBF nécessite le paquet 'osmium' (pip install osmium).") from e
+
+    rows = _IndexRows()
+
+    class Handler(osmium.SimpleHandler):
+        def node(self, node):
+            mask = classify_osm_tags({tag.k: tag.v for tag in node.tags})
+            if mask and node.location.valid():
+                rows.add(NODE, node.id, node.location.lat, node.location.lon, mask)
+
+        def way(self, way):
+            mask = classify_osm_tags({tag.k: tag.v for tag in way.tags})
+            if not mask:
+                return
+            points = [(n.lat, n.lon) for n in way.nodes if n.location.valid()]
+            if not points:
+                return
+            way_lats, way_lons = zip(*points)
+            rows.add(WAY, way.id, (min(way_lats) + max(way_lats)) / 2, (min(way_lons) + max(way_lons)) / 2, mask)
+
+    Handler().apply_file(path, locations=True)
+    return rows.result()
+
+
+def build_index(source_path: str, bbox: Optional[BBox] = None) -> OsmSpatialIndex:
+    """Construit l'index à partir d'un extrait .pbf ou .geojson/.json."""
+    if source_path.endswith(".pbf"):
+        elements, kinds = load_pbf(source_path)
+    else:
+        elements, kinds = load_geojson(source_path)
+    logger.info(f"Index OSM : {len(elements)} éléments classés extraits de {source_path}")
+    return OsmSpatialIndex.build(elements, kinds=kinds, source=source_path, bbox=bbox)
+
+
+# --- Fichiers de changements OSM (.osc) ---
+
+class OsmChange(NamedTuple):
+    action: str                 # create, modify ou delete
+    kind: int                   # NODE ou WAY
+    osm_id: int
+    lat: Optional[float]
+    lon: Optional[float]
+    tags: Dict[str, str]
+    refs: Tuple[int, ...] = ()  # nœuds d'un way (<nd ref>)
+
+
+def _way_center(way: ET.Element) -> Tuple[Optional[float], Optional[float]]:
+    """Centre d'un way d'un fichier de changements : <center>, <bounds> ou coordonnées des <nd> (diffs augmentés)."""
+    center = way.find("center")
+    if center is not None:
+        return float(center.get("lat")), float(center.get("lon"))
+    bounds = way.find("bounds")
+    if bounds is not None:
+        return (
+            (float(bounds.get("minlat")) + float(bounds.get("maxlat"))) / 2,
+            (float(bounds.get("minlon")) + float(bounds.get("maxlon"))) / 2,
+        )
+    points = [(float(nd.get("lat")), float(nd.get("lon"))) for nd in way.findall("nd") if nd.get("lat") is not None]
+    if not points:
+        return None, None
+    lats, lons = zip(*points)
+    return (min(lats) + max(lats)) / 2, (min(lons) + max(lons)) / 2
+
+
+def parse_osc(path: str) -> List[OsmChange]:
+    """Lit un fichier de changements OSM (.osc ou .osc.gz) ; les relations sont ignorées."""
+    opener = gzip.open if path.endswith(".gz") else open
+    changes: List[OsmChange] = []
+    action = None
+    with opener(path, "rb") as handle:
+        for event, element in ET.iterparse(handle, events=("start", "end")):
+            if event == "start":
+                if element.tag in ("create", "modify", "delete"):
+                    action = element.tag
+                continue
+            if element.tag in ("node", "way") and action is not None:
+                tags = {tag.get("k"): tag.get("v") for tag in element.findall("tag")}
+                refs: Tuple[int, ...] = ()
+                if element.tag == "node":
+                    lat = float(element.get("lat")) if element.get("lat") is not None else None
+                    lon = float(element.get("lon")) if element.get("lon") is not None else None
+                else:
+                    lat, lon = _way_center(element)
+                    refs = tuple(int(nd.get("ref")) for nd in element.findall("nd") if nd.get("ref") is not None)
+                changes.append(OsmChange(action, _KINDS[element.tag], int(element.get("id")), lat, lon, tags, refs))
+                element.clear()
+            elif element.tag in ("create", "modify", "delete"):
+                action = None
+    return changes
+
+
+# --- Index chargé par le processus ---
+
+_index: Optional[OsmSpatialIndex] = None
+# (chemin, date de modification) du fichier chargé : une mise à jour sur disque est rechargée
+_index_source: Optional[Tuple[str, Optional[float]]] = None
+_index_lock = threading.Lock()
+# Rechargement en cours après modification du fichier (un seul à la fois)
+_reload_thread: Optional[threading.Thread] = None
+
+
+def _load(path: str, modified: Optional[float]) -> None:
+    """Charge l'index et sa pyramide H3 (plusieurs secondes sur un grand extrait) puis le publie d'un bloc."""
+    global _index, _index_source
+    try:
+        index = OsmSpatialIndex.load(path)
+        # Pyramide H3 construite avec le chargement plutôt que pendant la première analyse
+        index.cell_counts
+        logger.info(
+            f"Index OSM hors ligne chargé : {len(index.elements)} éléments, "
+            f"génération {index.generation}, emprise {index.bbox}"
+        )
+    except Exception as e:
+        logger.error(f"Index OSM hors ligne indisponible ({path}) : {e}")
+        index = None
+    with _index_lock:
+        _index, _index_source = index, (path, modified)
+
+
+def load_osm_index() -> Optional[OsmSpatialIndex]:
+    """Charge (bloquant) l'index configuré par OSM_INDEX_PATH s'il a changé ; appelé au démarrage dans un thread."""
+    path = settings.OSM_INDEX_PATH
+    if not path:
+        return None
+    try:
+        modified = os.path.getmtime(path)
+    except OSError:
+        modified = None
+    if _index_source != (path, modified):
+        _load(path, modified)
+    return _index
+
+
+def get_osm_index() -> Optional[OsmSpatialIndex]:
+    """
+    Index configuré par OSM_INDEX_PATH ; None si absent ou illisible. Appelé depuis la boucle
+    d'événements : un fichier modifié sur disque est rechargé dans un thread et l'index précédent
+    reste servi jusqu'au remplacement. Seul un premier chargement (hors démarrage de l'API, ex:
+    worker) est fait sur place.
+    """
+    global _reload_thread
+    path = settings.OSM_INDEX_PATH
+    if not path:
+        return None
+    source = _index_source
+    if source is None or source[0] != path:
+        return load_osm_index()
+    try:
+        modified = os.path.getmtime(path)
+    except OSError:
+        modified = None
+    if source[1] != modified:
+        with _index_lock:
+            if _reload_thread is None or not _reload_thread.is_alive():
+                logger.info(f"Index OSM modifié sur disque : rechargement en arrière-plan ({path})")
+                _reload_thread = threading.Thread(target=_load, args=(path, modified), name="osm-index-reload", daemon=True)
+                _reload_thread.start()
+    return _index
+
+
+def wait_for_osm_index_reload(timeout: Optional[float] = None) -> None:
+    """Attend la fin d'un rechargement en arrière-plan (outils et tests)."""
+    thread = _reload_thread
+    if thread is not None:
+        thread.join(timeout)
+
+
+def osm_data_version() -> str:
+    """Version des données OSM servies (génération et date de construction de l'index local, ou source en ligne)."""
+    index = get_osm_index()
+    return index.version if index is not None else "online"
+
+
+def reset_osm_index() -> None:
+    """Oublie l'index chargé (rechargé au prochain appel)."""
+    global _index, _index_source
+    wait_for_osm_index_reload()
+    with _index_lock:
+        _index = None
+        _index_source = None
@@ -0,0 +1,190 @@
+"""
+Cache tuilé des infrastructures OSM.
+
+Les éléments Overpass sont récupérés par tuiles fixes (grille lat/lon de OSM_TILE_DEGREES),
+réduits au format colonnes `OsmElements` (id, lat, lon, masque de catégories) et stockés
+compressés dans Redis ainsi qu'en mémoire (LRU) avec un TTL. Le disque d'analyse d'une requête est ensuite assemblé à partir
+des tuiles en cache : les signalements répétés dans une même zone ne touchent plus Overpass.
+
+Les décomptes d'un disque (mode de collecte "adaptive") sont calculés sur les tuiles déjà en cache
+à l'aide de leur pyramide H3 (`OsmCellCounts`, construite une fois par tuile en mémoire) : seuls
+les éléments des cellules coupées par le cercle sont lus.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.osm_cells import OsmCellCounts
+from app.services.osm_features import OSM_COUNT_KEYS, OsmElements, build_overpass_query
+from app.services.overpass_pool import disc_bbox, fetch_bbox_elements
+from app.services.redis_cache import cache_get_many, cache_set
+
+logger = logging.getLogger(__name__)
+
+TILE_KEY_PREFIX = "osm:tile:v2"
+
+Tile = Tuple[int, int]
+
+
+def tiles_for_disc(lat: float, lon: float, radius: float, tile_degrees: float) -> List[Tile]:
+    """Liste les tuiles (iy, ix) qui intersectent l'emprise d'un disque de rayon `radius` mètres."""
+    south, west, north, east = disc_bbox(lat, lon, radius)
+    iy_min, iy_max = math.floor(south / tile_degrees), math.floor(north / tile_degrees)
+    ix_min, ix_max = math.floor(west / tile_degrees), math.floor(east / tile_degrees)
+    return [(iy, ix) for iy in range(iy_min, iy_max + 1) for ix in range(ix_min, ix_max + 1)]
+
+
+def encode_tile(elements: OsmElements) -> bytes:
+    return elements.to_bytes()
+
+
+def decode_tile(payload: bytes) -> OsmElements:
+    return OsmElements.from_bytes(payload)
+
+
+class OsmTileStore:
+    """Store de tuiles OSM à deux niveaux (mémoire du processus puis Redis)."""
+
+    def __init__(self, tile_degrees: float, ttl_seconds: int, max_memory_tiles: int):
+        self.tile_degrees = tile_degrees
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_tiles = max_memory_tiles
+        self._memory: "OrderedDict[Tile, Tuple[float, OsmElements]]" = OrderedDict()
+        # Pyramide H3 des tuiles en mémoire, associée aux éléments à partir desquels elle a été construite
+        self._cells: Dict[Tile, Tuple[OsmElements, OsmCellCounts]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, tile: Tile) -> str:
+        return f"{TILE_KEY_PREFIX}:{self.tile_degrees}:{tile[0]}:{tile[1]}"
+
+    def _get_memory(self, tile: Tile) -> Optional[OsmElements]:
+        with self._lock:
+            entry = self._memory.get(tile)
+            if entry is None:
+                return None
+            expires_at, elements = entry
+            if expires_at < time.monotonic():
+                del self._memory[tile]
+                self._cells.pop(tile, None)
+                return None
+            self._memory.move_to_end(tile)
+            return elements
+
+    def _put_memory(self, tile: Tile, elements: OsmElements) -> None:
+        with self._lock:
+            self._memory[tile] = (time.monotonic() + self.ttl_seconds, elements)
+            self._memory.move_to_end(tile)
+            while len(self._memory) > self.max_memory_tiles:
+                evicted, _ = self._memory.popitem(last=False)
+                self._cells.pop(evicted, None)
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._cells.clear()
+
+    def _cell_counts(self, tile: Tile, elements: OsmElements) -> OsmCellCounts:
+        """Pyramide H3 d'une tuile, conservée tant que la tuile reste en mémoire avec les mêmes éléments."""
+        with self._lock:
+            cached = self._cells.get(tile)
+        if cached is not None and cached[0] is elements:
+            return cached[1]
+        cells = OsmCellCounts(elements, settings.OSM_CELL_RESOLUTIONS)
+        with self._lock:
+            if tile in self._memory:
+                self._cells[tile] = (elements, cells)
+        return cells
+
+    def _count_tiles(self, tiles: Dict[Tile, OsmElements], lat: float, lon: float, radius: float) -> Dict[str, int]:
+        total = dict.fromkeys(OSM_COUNT_KEYS, 0)
+        for tile, elements in tiles.items():
+            for key, count in self._cell_counts(tile, elements).counts_within(lat, lon, radius).items():
+                total[key] += count
+        return total
+
+    async def cached_counts_within(self, lat: float, lon: float, radius: float) -> Optional[Dict[str, int]]:
+        """
+        Décomptes exacts du disque (lat, lon, radius) si toutes ses tuiles sont en cache (mémoire
+        ou Redis), None sinon : l'appelant se replie alors sur une requête Overpass de décompte,
+        plus légère que le téléchargement des tuiles manquantes.
+        """
+        tiles = tiles_for_disc(lat, lon, radius, self.tile_degrees)
+        found = await self._cached_tiles(tiles)
+        if len(found) < len(tiles):
+            return None
+        # Construction des pyramides et parcours des cellules : calcul NumPy/H3 hors de la boucle d'événements
+        return await asyncio.to_thread(self._count_tiles, found, lat, lon, radius)
+
+    async def _cached_tiles(self, tiles: List[Tile]) -> Dict[Tile, OsmElements]:
+        """Tuiles disponibles en mémoire, puis dans Redis (remontées en mémoire)."""
+        found: Dict[Tile, OsmElements] = {}
+        for tile in tiles:
+            elements = self._get_memory(tile)
+            if elements is not None:
+                found[tile] = elements
+
+        pending = [tile for tile in tiles if tile not in found]
+        if pending:
+            payloads = await asyncio.to_thread(cache_get_many, [self._key(tile) for tile in pending])
+            for tile, payload in zip(pending, payloads):
+                if payload is not None:
+                    elements = decode_tile(payload)
+                    found[tile] = elements
+                    self._put_memory(tile, elements)
+        return found
+
+    async def get_elements(self, lat: float, lon: float, radius: float) -> OsmElements:
+        """Retourne les éléments de toutes les tuiles couvrant le disque (lat, lon, radius)."""
+        tiles = tiles_for_disc(lat, lon, radius, self.tile_degrees)
+        found = await self._cached_tiles(tiles)
+        missing = [tile for tile in tiles if tile not in found]
+        if missing:
+            found.update(await self._fetch_tiles(missing))
+        logger.info(
+            f"Tuiles OSM : {len(tiles)} tuile(s) pour {radius}m, {len(tiles) - len(missing)} en cache, {len(missing)} récupérée(s) via Overpass"
+        )
+        return OsmElements.concat(found[tile] for tile in tiles)
+
+    async def _fetch_tiles(self, tiles: List[Tile]) -> Dict[Tile, OsmElements]:
+        """
+        Récupère via Overpass l'emprise englobant les tuiles manquantes (découpée en sous-requêtes
+        parallèles si elle est trop grande, voir `fetch_bbox_elements`).
+        Seule une réponse complète est mise en cache : une réponse tronquée ou portant une remarque
+        d'erreur d'Overpass lève une exception (sur chaque miroir puis ici) avant toute écriture,
+        faute de quoi des décomptes incomplets seraient servis pendant tout le TTL.
+        """
+        size = self.tile_degrees
+        south = min(iy for iy, _ in tiles) * size
+        north = (max(iy for iy, _ in tiles) + 1) * size
+        west = min(ix for _, ix in tiles) * size
+        east = (max(ix for _, ix in tiles) + 1) * size
+        elements = await fetch_bbox_elements((south, west, north, east), build_overpass_query)
+
+        # Tuile de chaque élément, calculée sur les coordonnées stockées (float32)
+        rows = np.floor(elements.lats.astype(np.float64) / size).astype(np.int64)
+        cols = np.floor(elements.lons.astype(np.float64) / size).astype(np.int64)
+        fetched: Dict[Tile, OsmElements] = {}
+        for tile in tiles:
+            fetched[tile] = elements[(rows == tile[0]) & (cols == tile[1])]
+            self._put_memory(tile, fetched[tile])
+        # Client Redis synchrone : les écritures passent par un thread, jamais par la boucle d'événements
+        await asyncio.to_thread(self._store_tiles, fetched)
+        return fetched
+
+    def _store_tiles(self, tiles: Dict[Tile, OsmElements]) -> None:
+        for tile, elements in tiles.items():
+            cache_set(self._key(tile), encode_tile(elements), self.ttl_seconds)
+
+
+osm_tile_store = OsmTileStore(
+    tile_degrees=settings.OSM_TILE_DEGREES,
+    ttl_seconds=settings.OSM_TILE_TTL_SECONDS,
+    max_memory_tiles=settings.OSM_TILE_MEMORY_MAX_TILES,
+)
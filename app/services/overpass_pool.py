@@ -0,0 +1,233 @@
+"""
+Pool de miroirs Overpass avec suivi de santé et bascule automatique.
+
+Les requêtes sont envoyées au miroir disponible le plus fiable puis le plus rapide
+(OVERPASS_API_URLS) ; un miroir qui répond 429, 5xx, hors délai ou avec un document tronqué est
+mis en quarantaine (durée doublée à chaque échec consécutif, bornée, `Retry-After` respecté) et la
+requête bascule sur le suivant. Si tous échouent, `OverpassUnavailableError` est levée : l'appelant
+signale alors des données dégradées au lieu de décomptes nuls.
+
+Les zones lourdes sont découpées en sous-emprises (`split_bbox`) interrogées en parallèle.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+
+from app.config import settings
+from app.services.http_client import http_request, http_stream
+from app.services.metrics import record_fallback
+from app.services.osm_features import OsmElements
+from app.services.overpass_stream import raise_for_remark, read_overpass_elements
+
+logger = logging.getLogger(__name__)
+
+BBox = Tuple[float, float, float, float]  # (sud, ouest, nord, est)
+METERS_PER_DEGREE_LAT = 111320.0
+
+_HEADERS = {"User-Agent": "MapActionImpactEngine/1.0"}
+# Erreurs d'un miroir qui justifient d'essayer le suivant (OverpassStreamError et JSON invalide sont des ValueError)
+_MIRROR_ERRORS = (httpx.HTTPError, ValueError)
+
+
+class OverpassUnavailableError(RuntimeError):
+    """Aucun miroir Overpass n'a pu répondre à la requête."""
+
+
+class OverpassEndpoint:
+    """État de santé d'un miroir : échecs consécutifs, quarantaine et latence lissée."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.failures = 0
+        self.cooldown_until = 0.0
+        self.latency: Optional[float] = None
+
+    def available(self, now: float) -> bool:
+        return self.cooldown_until <= now
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "failures": self.failures,
+            "cooldown_remaining": max(0.0, self.cooldown_until - time.monotonic()),
+            "latency": self.latency,
+        }
+
+
+class OverpassPool:
+    """Choix du miroir, bascule et quarantaine des miroirs défaillants."""
+
+    def __init__(self, urls: Sequence[str], cooldown_seconds: float, max_cooldown_seconds: float, timeout: float = 30):
+        if not urls:
+            raise ValueError("Au moins un miroir Overpass est requis")
+        self.endpoints = [OverpassEndpoint(url) for url in urls]
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def ordered(self) -> List[OverpassEndpoint]:
+        """
+        Miroirs à essayer, dans l'ordre : disponibles (moins d'échecs puis plus rapides, l'ordre de
+        configuration départageant), puis ceux en quarantaine dont elle se termine le plus tôt.
+        """
+        now = time.monotonic()
+        with self._lock:
+            ranked = list(enumerate(self.endpoints))
+        available = [(i, ep) for i, ep in ranked if ep.available(now)]
+        cooling = [(i, ep) for i, ep in ranked if not ep.available(now)]
+        available.sort(key=lambda item: (item[1].failures, item[1].latency if item[1].latency is not None else 0.0, item[0]))
+        cooling.sort(key=lambda item: item[1].cooldown_until)
+        return [ep for _, ep in available + cooling]
+
+    def mark_success(self, endpoint: OverpassEndpoint, elapsed: float) -> None:
+        with self._lock:
+            endpoint.failures = 0
+            endpoint.cooldown_until = 0.0
+            endpoint.latency = elapsed if endpoint.latency is None else 0.8 * endpoint.latency + 0.2 * elapsed
+
+    def mark_failure(self, endpoint: OverpassEndpoint, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            endpoint.failures += 1
+            cooldown = min(self.cooldown_seconds * 2 ** (endpoint.failures - 1), self.max_cooldown_seconds)
+            if retry_after is not None:
+                cooldown = min(max(cooldown, retry_after), self.max_cooldown_seconds)
+            endpoint.cooldown_until = time.monotonic() + cooldown
+        logger.warning(f"Miroir Overpass {endpoint.url} en quarantaine {cooldown:.0f}s ({endpoint.failures} échec(s) consécutif(s))")
+
+    def reset(self) -> None:
+        with self._lock:
+            for endpoint in self.endpoints:
+                endpoint.failures = 0
+                endpoint.cooldown_until = 0.0
+                endpoint.latency = None
+
+    def health(self) -> List[Dict[str, Any]]:
+        return [endpoint.snapshot() for endpoint in self.endpoints]
+
+    async def fetch_elements(self, query: str) -> OsmElements:
+        """Éléments classés d'une requête Overpass (réponse lue en flux), avec bascule entre miroirs."""
+        async def attempt(url: str) -> OsmElements:
+            async with http_stream("POST", url, data={"data": query}, headers=_HEADERS, timeout=self.timeout) as response:
+                response.raise_for_status()
+                return await read_overpass_elements(response.aiter_text())
+
+        return await self._with_failover(attempt)
+
+    async def fetch_json(self, query: str) -> Dict[str, Any]:
+        """Document JSON complet d'une requête Overpass légère (ex: "out count"), avec bascule entre miroirs."""
+        async def attempt(url: str) -> Dict[str, Any]:
+            response = await http_request("POST", url, data={"data": query}, headers=_HEADERS, timeout=self.timeout)
+            response.raise_for_status()
+            payload = response.json()
+            raise_for_remark(payload.get("remark"))
+            return payload
+
+        return await self._with_failover(attempt)
+
+    async def _with_failover(self, attempt):
+        errors = []
+        for endpoint in self.ordered():
+            start = time.monotonic()
+            try:
+                result = await attempt(endpoint.url)
+            except _MIRROR_ERRORS as e:
+                self.mark_failure(endpoint, _retry_after(e))
+                record_fallback("overpass", "failover")
+                errors.append(f"{endpoint.url}: {e}")
+                continue
+            self.mark_success(endpoint, time.monotonic() - start)
+            return result
+        raise OverpassUnavailableError("Tous les miroirs Overpass ont échoué : " + " ; ".join(errors))
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Délai `Retry-After` (secondes) d'une réponse 429/503, s'il est fourni."""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    value = error.response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def disc_bbox(lat: float, lon: float, radius: float) -> BBox:
+    """Emprise englobant un disque de rayon `radius` mètres."""
+    dlat = radius / METERS_PER_DEGREE_LAT
+    dlon = radius / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return (lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+
+
+def split_bbox(bbox: BBox, cell_meters: float) -> List[BBox]:
+    """Découpe une emprise en une grille de sous-emprises d'au plus ~`cell_meters` de côté."""
+    south, west, north, east = bbox
+    mid_lat = math.radians((south + north) / 2)
+    height = (north - south) * METERS_PER_DEGREE_LAT
+    width = (east - west) * METERS_PER_DEGREE_LAT * max(math.cos(mid_lat), 0.01)
+    rows = max(1, math.ceil(height / cell_meters))
+    cols = max(1, math.ceil(width / cell_meters))
+    lat_edges = [south + (north - south) * r / rows for r in range(rows)] + [north]
+    lon_edges = [west + (east - west) * c / cols for c in range(cols)] + [east]
+    return [
+        (lat_edges[r], lon_edges[c], lat_edges[r + 1], lon_edges[c + 1])
+        for r in range(rows)
+        for c in range(cols)
+    ]
+
+
+def bbox_filter(bbox: BBox) -> str:
+    """Filtre de zone Overpass d'une emprise."""
+    south, west, north, east = bbox
+    return f"({south:.6f},{west:.6f},{north:.6f},{east:.6f})"
+
+
+def keep_inside(elements: OsmElements, bbox: BBox, outer: BBox) -> OsmElements:
+    """
+    Éléments dont la position tombe dans `bbox` (bornes sud/ouest incluses, nord/est exclues ;
+    aucune borne sur les bords de l'emprise englobante `outer`, que l'arrondi float32 des
+    positions peut franchir). Un way à cheval sur deux sous-emprises est renvoyé par les deux
+    requêtes : il n'est conservé que dans celle qui contient son centre.
+    """
+    south, west, north, east = bbox
+    lats = elements.lats.astype(np.float64)
+    lons = elements.lons.astype(np.float64)
+    inside = ((lats >= south) | (south <= outer[0])) & ((lats < north) | (north >= outer[2]))
+    inside &= ((lons >= west) | (west <= outer[1])) & ((lons < east) | (east >= outer[3]))
+    return elements[inside]
+
+
+async def fetch_bbox_elements(bbox: BBox, query_builder, pool: Optional["OverpassPool"] = None) -> OsmElements:
+    """
+    Éléments d'une emprise, découpée en sous-emprises interrogées en parallèle si elle dépasse
+    OVERPASS_SPLIT_CELL_METERS de côté. L'échec d'une seule sous-requête fait échouer l'ensemble :
+    un résultat partiel sous-estimerait les décomptes sans le signaler.
+    """
+    pool = pool or overpass_pool
+    cells = split_bbox(bbox, settings.OVERPASS_SPLIT_CELL_METERS)
+    if len(cells) == 1:
+        return await pool.fetch_elements(query_builder(bbox_filter(bbox)))
+
+    logger.info(f"Requête Overpass découpée en {len(cells)} sous-emprises")
+    semaphore = asyncio.Semaphore(settings.OVERPASS_SPLIT_CONCURRENCY)
+
+    async def fetch(cell: BBox) -> OsmElements:
+        async with semaphore:
+            elements = await pool.fetch_elements(query_builder(bbox_filter(cell)))
+        return keep_inside(elements, cell, bbox)
+
+    parts = await asyncio.gather(*(fetch(cell) for cell in cells))
+    return OsmElements.concat(parts)
+
+
+overpass_pool = OverpassPool(
+    settings.OVERPASS_API_URLS,
+    cooldown_seconds=settings.OVERPASS_COOLDOWN_SECONDS,
+    max_cooldown_seconds=settings.OVERPASS_MAX_COOLDOWN_SECONDS,
+)
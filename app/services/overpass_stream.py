@@ -0,0 +1,121 @@
+"""
+Lecture incrémentale des réponses JSON d'Overpass.
+
+Une réponse Overpass en zone dense pèse plusieurs dizaines de Mo : `response.json()` la
+matérialise entièrement (texte puis dictionnaires de tous les éléments avec leurs tags) avant
+tout décompte. Ici, chaque élément du tableau "elements" est décodé dès que ses octets sont
+arrivés, classé puis réduit aux colonnes de `OsmElements` : la mémoire par requête reste bornée
+par la taille d'un élément et le classement se fait pendant le transfert.
+"""
+import json
+import logging
+from typing import Any, AsyncIterable, Dict, Iterator, Optional
+
+from app.services.osm_features import OsmElements, OsmElementsBuilder
+
+logger = logging.getLogger(__name__)
+
+# Taille maximale d'un élément encore incomplet dans le tampon (un way "out center" fait quelques Ko)
+MAX_PENDING_CHARS = 1 << 20
+
+_ELEMENTS_KEY = '"elements"'
+_WHITESPACE = " \t\n\r"
+
+
+class OverpassStreamError(ValueError):
+    """Réponse Overpass mal formée ou tronquée."""
+
+
+def raise_for_remark(remark: Optional[str]) -> None:
+    """
+    Une remarque d'erreur (délai ou mémoire dépassés côté serveur) signale des résultats
+    incomplets : la réponse est rejetée pour que le pool bascule de miroir ou découpe l'emprise.
+    """
+    if remark and "error" in remark:
+        raise OverpassStreamError(f"Remarque Overpass : {remark}")
+
+
+class OverpassElementParser:
+    """
+    Découpe le tableau "elements" d'un document Overpass reçu par morceaux.
+    `feed` retourne les éléments complets au fur et à mesure ; `close` vérifie que le tableau a
+    bien été terminé et expose la remarque éventuelle d'Overpass (délai ou mémoire dépassés).
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._state = "header"  # header -> elements -> trailer
+        self.remark: Optional[str] = None
+
+    def feed(self, chunk: str) -> Iterator[Dict[str, Any]]:
+        self._buffer += chunk
+        if self._state == "header":
+            start = self._buffer.find(_ELEMENTS_KEY)
+            if start < 0:
+                # Garde la fin du tampon au cas où la clé serait coupée entre deux morceaux
+                self._buffer = self._buffer[-len(_ELEMENTS_KEY):]
+                return
+            bracket = self._buffer.find("[", start + len(_ELEMENTS_KEY))
+            if bracket < 0:
+                return
+            self._buffer = self._buffer[bracket + 1:]
+            self._state = "elements"
+
+        if self._state == "elements":
+            yield from self._drain_elements()
+
+        if self._state == "trailer" and len(self._buffer) > MAX_PENDING_CHARS:
+            self._buffer = self._buffer[-MAX_PENDING_CHARS:]
+
+    def _drain_elements(self) -> Iterator[Dict[str, Any]]:
+        position = 0
+        buffer = self._buffer
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE + ",":
+                position += 1
+            if position >= len(buffer):
+                break
+            if buffer[position] == "]":
+                self._state = "trailer"
+                position += 1
+                break
+            try:
+                element, position = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Élément incomplet : attend les octets suivants
+                if len(buffer) - position > MAX_PENDING_CHARS:
+                    raise OverpassStreamError("Élément Overpass trop volumineux ou JSON invalide")
+                break
+            yield element
+        self._buffer = buffer[position:]
+
+    def close(self) -> None:
+        if self._state != "trailer":
+            raise OverpassStreamError("Réponse Overpass tronquée : tableau 'elements' incomplet")
+        trailer = self._buffer.strip().lstrip(",").rstrip().rstrip("}")
+        if trailer:
+            try:
+                self.remark = json.loads("{" + trailer + "}").get("remark")
+            except json.JSONDecodeError:
+                self.remark = None
+        if self.remark:
+            logger.warning(f"Remarque Overpass : {self.remark}")
+
+
+async def read_overpass_elements(chunks: AsyncIterable[str]) -> OsmElements:
+    """
+    Classe et accumule en colonnes les éléments d'une réponse Overpass reçue en flux de texte.
+    Lève `OverpassStreamError` si la réponse est tronquée ou porte une remarque d'erreur.
+    """
+    parser = OverpassElementParser()
+    builder = OsmElementsBuilder()
+    received = 0
+    async for chunk in chunks:
+        for element in parser.feed(chunk):
+            received += 1
+            builder.add(element)
+    parser.close()
+    raise_for_remark(parser.remark)
+    logger.info(f"Overpass (flux) : {received} éléments reçus, {len(builder)} conservés")
+    return builder.build()
@@ -0,0 +1,252 @@
+"""
+Raster de population maillé (optionnel) pour l'estimation de la population exposée.
+
+Un raster GeoTIFF / COG en coordonnées géographiques (ex: WorldPop ou GHS-POP, habitants par
+pixel) configuré par POPULATION_RASTER_PATH remplace l'estimation « bâtiments OSM × 6,5 » : la
+population d'un disque est la somme des pixels qu'il recouvre, sans aucun appel réseau.
+
+Seule la fenêtre englobant le disque est lue (lecture fenêtrée ; les GeoTIFF non compressés sont
+projetés en mémoire par GDAL plutôt que copiés). Chaque pixel est subdivisé en
+POPULATION_RASTER_SUBSAMPLES² sous-points portant une part égale de sa population : le masque du
+disque est calculé sur ces sous-points en une opération vectorisée, ce qui approche la fraction
+de chaque pixel de bord réellement couverte. Comme pour `RadialCounts`, les sous-points sont triés
+par distance et cumulés : la population de tout rayon plus petit s'obtient par dichotomie.
+
+Un raster remplacé sur disque est rouvert ; l'ancien n'est fermé qu'à la fin de sa dernière
+lecture en cours (compteur de lecteurs, voir `population_raster`).
+"""
+import logging
+import math
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window, WindowError
+
+from app.config import settings
+from app.services.geodesy import haversine_distances
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_METERS = 6371000
+METERS_PER_DEGREE = math.pi / 180 * EARTH_RADIUS_METERS
+# Nombre maximal de sous-points d'une fenêtre (borne la mémoire d'un grand rayon finement échantillonné)
+MAX_SAMPLES = 4_000_000
+
+
+class RadialPopulation:
+    """Population cumulée par distance croissante autour d'un point."""
+
+    def __init__(self, distances: np.ndarray, cumulative: np.ndarray):
+        self.distances = distances
+        # cumulative[i] = population des i sous-points les plus proches
+        self.cumulative = cumulative
+
+    @classmethod
+    def empty(cls) -> "RadialPopulation":
+        return cls(np.zeros(0, dtype=np.float64), np.zeros(1, dtype=np.float64))
+
+    def within(self, radius: float) -> float:
+        """Population à une distance <= radius."""
+        return float(self.cumulative[np.searchsorted(self.distances, radius, side="right")])
+
+
+class PopulationRaster:
+    """Raster de population ouvert une fois par processus, lu par fenêtres."""
+
+    def __init__(self, path: str, subsamples: int = 4):
+        with rasterio.Env(GTIFF_VIRTUAL_MEM_IO="IF_POSSIBLE"):
+            self._dataset = rasterio.open(path)
+        crs = self._dataset.crs
+        if crs is not None and not crs.is_geographic:
+            self._dataset.close()
+            raise ValueError(f"Le raster de population doit être en coordonnées géographiques (reçu : {crs})")
+        self.path = path
+        self.subsamples = max(1, subsamples)
+        self.bounds = self._dataset.bounds
+        # Un jeu de données rasterio ne se lit pas depuis plusieurs threads à la fois
+        self._lock = threading.Lock()
+        # Lecteurs en cours et remplacement par un raster plus récent : fermeture au dernier lecteur
+        self._state_lock = threading.Lock()
+        self._readers = 0
+        self._retired = False
+
+    def close(self) -> None:
+        with self._lock:
+            self._dataset.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._dataset.closed
+
+    def acquire(self) -> None:
+        with self._state_lock:
+            self._readers += 1
+
+    def release(self) -> None:
+        with self._state_lock:
+            self._readers -= 1
+            last_reader = self._retired and self._readers == 0
+        if last_reader:
+            self.close()
+
+    def retire(self) -> None:
+        """Raster remplacé : fermé immédiatement s'il n'a aucun lecteur, sinon par son dernier lecteur."""
+        with self._state_lock:
+            self._retired = True
+            idle = self._readers == 0
+        if idle:
+            self.close()
+
+    def _disc_bounds(self, lat: float, lon: float, radius: float) -> Tuple[float, float, float, float]:
+        dlat = math.degrees(radius / EARTH_RADIUS_METERS)
+        dlon = dlat / max(math.cos(math.radians(lat)), 0.01)
+        return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+    def covers(self, lat: float, lon: float, radius: float) -> bool:
+        """Vrai si le disque (lat, lon, radius) est entièrement dans l'emprise du raster."""
+        south, west, north, east = self._disc_bounds(lat, lon, radius)
+        bounds = self.bounds
+        return bounds.bottom <= south and north <= bounds.top and bounds.left <= west and east <= bounds.right
+
+    def _read_window(self, lat: float, lon: float, radius: float):
+        """Pixels (habitants, valeurs invalides à 0) de la fenêtre englobant le disque, et sa transformation affine."""
+        south, west, north, east = self._disc_bounds(lat, lon, radius)
+        dataset = self._dataset
+        # Pixels touchés par l'emprise du disque (bornes arrondies vers l'extérieur)
+        col_start, row_start = ~dataset.transform @ (west, north)
+        col_stop, row_stop = ~dataset.transform @ (east, south)
+        col_start, col_stop = sorted((col_start, col_stop))
+        row_start, row_stop = sorted((row_start, row_stop))
+        window = Window.from_slices(
+            (math.floor(row_start), math.ceil(row_stop)), (math.floor(col_start), math.ceil(col_stop)), boundless=True,
+        )
+        try:
+            window = window.intersection(Window(0, 0, dataset.width, dataset.height))
+        except WindowError:
+            return None, None
+        with self._lock, rasterio.Env(GTIFF_VIRTUAL_MEM_IO="IF_POSSIBLE"):
+            values = dataset.read(1, window=window, masked=True).filled(0)
+            transform = dataset.window_transform(window)
+        values = np.asarray(values, dtype=np.float64)
+        values[~np.isfinite(values) | (values < 0)] = 0.0
+        return values, transform
+
+    def _subsamples(self, lat: float, transform, shape: Tuple[int, int], min_radius: Optional[float]) -> int:
+        """
+        Sous-points par côté de pixel : au moins POPULATION_RASTER_SUBSAMPLES, et assez pour que
+        le plus petit rayon utile couvre plusieurs sous-pixels, dans la limite de MAX_SAMPLES.
+        """
+        subsamples = self.subsamples
+        if min_radius:
+            pixel_meters = max(
+                abs(transform.e) * METERS_PER_DEGREE,
+                abs(transform.a) * METERS_PER_DEGREE * math.cos(math.radians(lat)),
+            )
+            subsamples = max(subsamples, math.ceil(4 * pixel_meters / min_radius))
+        budget = math.isqrt(max(1, MAX_SAMPLES // max(1, shape[0] * shape[1])))
+        return max(1, min(subsamples, budget))
+
+    def radial_population(self, lat: float, lon: float, max_radius: float, min_radius: Optional[float] = None) -> RadialPopulation:
+        """
+        Population cumulée par distance jusqu'à `max_radius` autour de (lat, lon). `min_radius`
+        (plus petit rayon qui sera interrogé) affine le sous-échantillonnage des pixels.
+        """
+        values, transform = self._read_window(lat, lon, max_radius)
+        if values is None or not values.size:
+            return RadialPopulation.empty()
+
+        s = self._subsamples(lat, transform, values.shape, min_radius)
+        offsets = (np.arange(s) + 0.5) / s
+        rows, cols = values.shape
+        sample_lats = transform.f + (np.arange(rows)[:, None] + offsets).ravel() * transform.e
+        sample_lons = transform.c + (np.arange(cols)[:, None] + offsets).ravel() * transform.a
+        distances = haversine_distances(lat, lon, sample_lats[:, None], sample_lons[None, :])
+        weights = np.repeat(np.repeat(values / (s * s), s, axis=0), s, axis=1)
+
+        inside = (distances <= max_radius) & (weights > 0)
+        distances, weights = distances[inside], weights[inside]
+        order = np.argsort(distances, kind="stable")
+        cumulative = np.zeros(len(order) + 1, dtype=np.float64)
+        np.cumsum(weights[order], out=cumulative[1:])
+        return RadialPopulation(distances[order], cumulative)
+
+    def population_within(self, lat: float, lon: float, radius: float) -> float:
+        return self.radial_population(lat, lon, radius, min_radius=radius).within(radius)
+
+
+# --- Raster chargé par le processus ---
+
+_raster: Optional[PopulationRaster] = None
+# (chemin, date de modification) du fichier ouvert : un raster remplacé sur disque est rouvert
+_raster_source: Optional[Tuple[str, float]] = None
+_raster_lock = threading.Lock()
+
+
+def _current_raster() -> Optional[PopulationRaster]:
+    """Raster de POPULATION_RASTER_PATH, rouvert si le fichier a changé (appelé sous `_raster_lock`)."""
+    global _raster, _raster_source
+    path = settings.POPULATION_RASTER_PATH
+    if not path:
+        return None
+    try:
+        modified = os.path.getmtime(path)
+    except OSError:
+        modified = None
+    if _raster_source != (path, modified):
+        _raster_source = (path, modified)
+        if _raster is not None:
+            _raster.retire()
+        try:
+            _raster = PopulationRaster(path, subsamples=settings.POPULATION_RASTER_SUBSAMPLES)
+            logger.info(f"Raster de population ouvert : {path}, emprise {tuple(_raster.bounds)}")
+        except Exception as e:
+            logger.error(f"Raster de population indisponible ({path}) : {e}")
+            _raster = None
+    return _raster
+
+
+def get_population_raster() -> Optional[PopulationRaster]:
+    """
+    Raster configuré par POPULATION_RASTER_PATH ; None s'il est absent ou illisible.
+    Pour lire le raster, utiliser `population_raster` : il n'est alors pas fermé en cours de lecture.
+    """
+    with _raster_lock:
+        return _current_raster()
+
+
+@contextmanager
+def population_raster() -> Iterator[Optional[PopulationRaster]]:
+    """Raster courant, gardé ouvert jusqu'à la sortie du bloc même s'il est remplacé entre-temps."""
+    with _raster_lock:
+        raster = _current_raster()
+        if raster is not None:
+            raster.acquire()
+    try:
+        yield raster
+    finally:
+        if raster is not None:
+            raster.release()
+
+
+def read_radial_population(
+    lat: float, lon: float, max_radius: float, min_radius: Optional[float] = None,
+) -> Optional[RadialPopulation]:
+    """Population radiale autour du point (bloquant) ; None si aucun raster ne couvre le disque."""
+    with population_raster() as raster:
+        if raster is None or not raster.covers(lat, lon, max_radius):
+            return None
+        return raster.radial_population(lat, lon, max_radius, min_radius)
+
+
+def reset_population_raster() -> None:
+    """Ferme le raster ouvert, à la fin de ses lectures en cours (rouvert au prochain appel)."""
+    global _raster, _raster_source
+    with _raster_lock:
+        if _raster is not None:
+            _raster.retire()
+        _raster = None
+        _raster_source = None
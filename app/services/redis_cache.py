@@ -0,0 +1,100 @@
+"""
+Accès Redis partagé par les caches du Moteur d'Impact.
+Toutes les opérations sont tolérantes aux pannes : si Redis est absent ou indisponible,
+elles se comportent comme un cache vide et le moteur continue sans cache distribué.
+Le client est synchrone (jusqu'à 2 s d'attente par appel si Redis est lent) : depuis une
+coroutine, ces fonctions sont appelées via `asyncio.to_thread` pour ne pas bloquer la boucle d'événements.
+"""
+import logging
+import time
+from typing import List, Optional
+
+import redis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Après une erreur de connexion, on n'interroge plus Redis pendant ce délai
+_RETRY_DELAY_SECONDS = 30
+
+_client: Optional[redis.Redis] = None
+_disabled_until = 0.0
+
+
+def get_redis_client() -> Optional[redis.Redis]:
+    """Retourne le client Redis partagé, ou None si Redis n'est pas configuré ou en panne."""
+    global _client
+    if not settings.REDIS_URL or time.monotonic() < _disabled_until:
+        return None
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _client
+
+
+def _mark_unavailable(error: Exception) -> None:
+    global _disabled_until
+    _disabled_until = time.monotonic() + _RETRY_DELAY_SECONDS
+    logger.warning(f"Redis indisponible, cache distribué désactivé pendant {_RETRY_DELAY_SECONDS}s : {error}")
+
+
+def cache_get(key: str) -> Optional[bytes]:
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        return client.get(key)
+    except redis.RedisError as e:
+        _mark_unavailable(e)
+        return None
+
+
+def cache_get_many(keys: List[str]) -> List[Optional[bytes]]:
+    client = get_redis_client()
+    if client is None or not keys:
+        return [None] * len(keys)
+    try:
+        return client.mget(keys)
+    except redis.RedisError as e:
+        _mark_unavailable(e)
+        return [None] * len(keys)
+
+
+def cache_set(key: str, value: bytes, ttl_seconds: int) -> bool:
+    client = get_redis_client()
+    if client is None:
+        return False
+    try:
+        client.set(key, value, ex=ttl_seconds)
+        return True
+    except redis.RedisError as e:
+        _mark_unavailable(e)
+        return False
+
+
+def cache_set_bounded(key: str, value: bytes, ttl_seconds: int, index_key: str, max_entries: int) -> bool:
+    """
+    Écrit une entrée avec TTL et la référence dans un index trié par date d'écriture (ZSET).
+    Au-delà de `max_entries`, les entrées les plus anciennes sont supprimées.
+    """
+    client = get_redis_client()
+    if client is None:
+        return False
+    now = time.time()
+    try:
+        pipe = client.pipeline()
+        pipe.set(key, value, ex=ttl_seconds)
+        pipe.zadd(index_key, {key: now})
+        # Les entrées expirées par TTL quittent aussi l'index
+        pipe.zremrangebyscore(index_key, "-inf", now - ttl_seconds)
+        pipe.zcard(index_key)
+        size = pipe.execute()[-1]
+        if size > max_entries:
+            oldest = client.zrange(index_key, 0, size - max_entries - 1)
+            if oldest:
+                client.delete(*oldest)
+                client.zrem(index_key, *oldest)
+        return True
+    except redis.RedisError as e:
+        _mark_unavailable(e)
+        return False
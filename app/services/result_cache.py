@@ -0,0 +1,86 @@
+"""
+Cache idempotent des résultats d'analyse.
+
+Un client mobile qui renvoie la même image après une coupure réseau obtient immédiatement le
+résultat déjà calculé, sans relancer Gemini ni la collecte géographique. La clé combine le
+hash SHA-256 du contenu de l'image, la position arrondie, la version de la taxonomie et celle des
+données OSM : toute modification de la taxonomie ou des poids sociaux, ou toute mise à jour de
+l'index OSM local, invalide les résultats précédents.
+Les entrées sont bornées en durée (TTL) et en nombre (index ZSET) dans Redis.
+"""
+import hashlib
+import json
+import logging
+from typing import Optional
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.schemas import AnalyzeResponse
+from app.services.ai_service import is_default_response
+from app.services.metrics import RESULT_CACHE_REQUESTS
+from app.services.osm_index import osm_data_version
+from app.services.redis_cache import cache_get, cache_set_bounded
+
+logger = logging.getLogger(__name__)
+
+RESULT_KEY_PREFIX = "analysis:result:v1"
+RESULT_INDEX_KEY = f"{RESULT_KEY_PREFIX}:index"
+
+
+def _taxonomy_version() -> str:
+    payload = json.dumps(
+        {"taxonomy": settings.INCIDENT_TAXONOMY, "weights": settings.SOCIAL_WEIGHTS},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+TAXONOMY_VERSION = _taxonomy_version()
+
+
+def image_digest(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def result_cache_key(image_sha256: str, lat: float, lon: float) -> str:
+    decimals = settings.RESULT_CACHE_COORD_DECIMALS
+    return (
+        f"{RESULT_KEY_PREFIX}:{TAXONOMY_VERSION}:{osm_data_version()}:"
+        f"{image_sha256}:{round(lat, decimals)}:{round(lon, decimals)}"
+    )
+
+
+def get_cached_result(key: str, incident_id: Optional[str] = None) -> Optional[AnalyzeResponse]:
+    """Résultat en cache pour cette clé (rattaché à l'incident demandé), ou None."""
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    payload = cache_get(key)
+    if payload is None:
+        RESULT_CACHE_REQUESTS.labels("miss").inc()
+        return None
+    try:
+        result = AnalyzeResponse.model_validate_json(payload)
+    except ValidationError as e:
+        logger.warning(f"Résultat en cache illisible ({key}) : {e}")
+        RESULT_CACHE_REQUESTS.labels("miss").inc()
+        return None
+    RESULT_CACHE_REQUESTS.labels("hit").inc()
+    return result.model_copy(update={"incident_id": incident_id})
+
+
+def store_result(key: str, result: AnalyzeResponse) -> bool:
+    """
+    Met en cache un résultat complet. Les résultats dégradés (fournisseur hors délai, échec du
+    moteur visuel) ne sont pas conservés : une nouvelle tentative doit pouvoir obtenir l'analyse complète.
+    """
+    if not settings.RESULT_CACHE_ENABLED or result.is_degraded or is_default_response(result.ai_analysis):
+        return False
+    return cache_set_bounded(
+        key,
+        result.model_dump_json().encode("utf-8"),
+        settings.RESULT_CACHE_TTL_SECONDS,
+        RESULT_INDEX_KEY,
+        settings.RESULT_CACHE_MAX_ENTRIES,
+    )
@@ -0,0 +1,183 @@
+"""
+Géocodage inverse hors ligne sur les limites administratives.
+
+Un fichier GeoJSON (GEOCODER_BOUNDARIES_PATH, ex: export OSM des relations `boundary=administrative`
+et des nœuds `place=*` d'un pays) fournit :
+
+- les polygones administratifs, identifiés par leur `admin_level` OSM (GEOCODER_ADMIN_LEVELS :
+  pays, région, cercle, commune ; 2, 4, 6 et 8 au Mali) ;
+- les localités (points `place=city|town|village|hamlet`).
+
+Les polygones sont placés dans un `STRtree` : un lot de points est résolu en une requête
+vectorisée (point dans polygone), sans aucun appel réseau. Nominatim n'est plus interrogé que
+pour les points hors de l'emprise du fichier (un par seconde au plus selon sa politique d'usage).
+
+Le chargement du fichier et les recherches sont bloquants : le géocodeur est chargé au démarrage
+de l'API dans un thread, et les appelants asynchrones passent par `asyncio.to_thread`.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+from app.config import settings
+from app.services.geodesy import haversine_distances
+
+logger = logging.getLogger(__name__)
+
+LOCALITY_PLACES = ("city", "town", "village", "hamlet")
+# Niveaux administratifs, dans l'ordre de GEOCODER_ADMIN_LEVELS
+ADMIN_FIELDS = ("country", "region", "cercle", "commune")
+
+
+def _name(properties: Dict[str, Any]) -> Optional[str]:
+    return properties.get("name:fr") or properties.get("name")
+
+
+def _admin_level(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class OfflineGeocoder:
+    """Limites administratives et localités indexées par `STRtree`."""
+
+    def __init__(self, features: Iterable[Dict[str, Any]], admin_levels: Sequence[int] = (2, 4, 6, 8), locality_max_meters: float = 3000):
+        fields = {level: field for level, field in zip(admin_levels, ADMIN_FIELDS)}
+        self.locality_max_meters = locality_max_meters
+        polygons, polygon_fields, polygon_names = [], [], []
+        localities, locality_names = [], []
+        for feature in features:
+            properties = feature.get("properties") or {}
+            name = _name(properties)
+            if not name or not feature.get("geometry"):
+                continue
+            geometry = shape(feature["geometry"])
+            if geometry.geom_type in ("Polygon", "MultiPolygon"):
+                field = fields.get(_admin_level(properties.get("admin_level")))
+                if field is not None:
+                    polygons.append(geometry)
+                    polygon_fields.append(ADMIN_FIELDS.index(field))
+                    polygon_names.append(name)
+            elif geometry.geom_type == "Point" and properties.get("place") in LOCALITY_PLACES:
+                localities.append(geometry)
+                locality_names.append(name)
+
+        self._polygons = shapely.STRtree(polygons)
+        self._fields = np.asarray(polygon_fields, dtype=np.int64)
+        self._areas = shapely.area(np.asarray(polygons, dtype=object)) if polygons else np.zeros(0)
+        self._polygon_names = polygon_names
+        self._localities = shapely.STRtree(localities)
+        self._locality_points = np.asarray(
+            [(point.y, point.x) for point in localities], dtype=np.float64
+        ).reshape(-1, 2)
+        self._locality_names = locality_names
+        logger.info(f"Géocodeur hors ligne : {len(polygons)} limite(s) administrative(s), {len(localities)} localité(s)")
+
+    def reverse(self, lat: float, lon: float) -> Optional[Dict[str, str]]:
+        return self.reverse_many([lat], [lon])[0]
+
+    def reverse_many(self, lats: Sequence[float], lons: Sequence[float]) -> List[Optional[Dict[str, str]]]:
+        """
+        Contexte administratif (city, region, country, display_name) de chaque point ; None pour
+        les points hors de tout pays du fichier (l'appelant se replie alors sur Nominatim).
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        points = shapely.points(lons, lats)
+        found: List[Dict[str, str]] = [{} for _ in range(len(points))]
+
+        point_rows, polygon_rows = self._polygons.query(points, predicate="intersects")
+        # Pour chaque point et niveau, le plus petit polygone l'emporte (limites imbriquées ou chevauchantes)
+        order = np.lexsort((self._areas[polygon_rows], self._fields[polygon_rows], point_rows))
+        for point_row, polygon_row in zip(point_rows[order].tolist(), polygon_rows[order].tolist()):
+            found[point_row].setdefault(ADMIN_FIELDS[self._fields[polygon_row]], self._polygon_names[polygon_row])
+
+        localities = self._nearest_localities(points, lats, lons)
+        return [self._context(admin, locality) for admin, locality in zip(found, localities)]
+
+    def _nearest_localities(self, points: np.ndarray, lats: np.ndarray, lons: np.ndarray) -> List[Optional[str]]:
+        """Localité la plus proche de chaque point, si elle est à moins de GEOCODER_LOCALITY_MAX_METERS."""
+        names: List[Optional[str]] = [None] * len(points)
+        if not len(self._locality_names) or not len(points):
+            return names
+        point_rows, locality_rows = self._localities.query_nearest(points, all_matches=False)
+        nearest = self._locality_points[locality_rows]
+        distances = haversine_distances(lats[point_rows], lons[point_rows], nearest[:, 0], nearest[:, 1])
+        for point_row, locality_row, distance in zip(point_rows.tolist(), locality_rows.tolist(), distances.tolist()):
+            if distance <= self.locality_max_meters:
+                names[point_row] = self._locality_names[locality_row]
+        return names
+
+    @staticmethod
+    def _context(admin: Dict[str, str], locality: Optional[str]) -> Optional[Dict[str, str]]:
+        if "country" not in admin:
+            return None
+        parts = [locality] + [admin.get(field) for field in reversed(ADMIN_FIELDS)]
+        display = []
+        for part in parts:
+            if part and part not in display:
+                display.append(part)
+        return {
+            "city": locality or admin.get("commune") or "Zone non habitée",
+            "region": admin.get("region") or "Inconnue",
+            "country": admin["country"],
+            "display_name": ", ".join(display),
+        }
+
+
+def load_geocoder(path: str) -> OfflineGeocoder:
+    with open(path, encoding="utf-8") as handle:
+        collection = json.load(handle)
+    return OfflineGeocoder(
+        collection.get("features", []),
+        admin_levels=settings.GEOCODER_ADMIN_LEVELS,
+        locality_max_meters=settings.GEOCODER_LOCALITY_MAX_METERS,
+    )
+
+
+# --- Géocodeur chargé par le processus ---
+
+_geocoder: Optional[OfflineGeocoder] = None
+# (chemin, date de modification) du fichier chargé : un fichier remplacé sur disque est rechargé
+_geocoder_source: Optional[Tuple[str, Optional[float]]] = None
+_geocoder_lock = threading.Lock()
+
+
+def get_offline_geocoder() -> Optional[OfflineGeocoder]:
+    """
+    Géocodeur de GEOCODER_BOUNDARIES_PATH ; None s'il est absent ou illisible. Bloquant (lecture
+    du fichier s'il a changé) : à appeler au démarrage ou depuis un thread.
+    """
+    global _geocoder, _geocoder_source
+    path = settings.GEOCODER_BOUNDARIES_PATH
+    if not path:
+        return None
+    try:
+        modified = os.path.getmtime(path)
+    except OSError:
+        modified = None
+    with _geocoder_lock:
+        if _geocoder_source != (path, modified):
+            _geocoder_source = (path, modified)
+            try:
+                _geocoder = load_geocoder(path)
+            except Exception as e:
+                logger.error(f"Limites administratives indisponibles ({path}) : {e}")
+                _geocoder = None
+        return _geocoder
+
+
+def reverse_geocode_many(points: Sequence[Tuple[float, float]]) -> List[Optional[Dict[str, str]]]:
+    """Géocodage inverse hors ligne d'un lot de points (lat, lon) ; None pour les points non résolus."""
+    geocoder = get_offline_geocoder()
+    if geocoder is None or not points:
+        return [None] * len(points)
+    return geocoder.reverse_many([lat for lat, _ in points], [lon for _, lon in points])
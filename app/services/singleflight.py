@@ -0,0 +1,75 @@
+"""
+Regroupement des appels fournisseurs identiques en cours (single-flight).
+
+Lors d'un afflux de signalements au même endroit (ex: après une inondation), chaque analyse
+lancerait ses propres appels Overpass, GEE et Open-Meteo, tous identiques. Les appels sont
+identifiés par fournisseur et coordonnées normalisées : tant qu'un appel est en cours, les
+appelants suivants attendent son résultat au lieu d'en lancer un nouveau.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from app.config import settings
+from app.services.metrics import SINGLEFLIGHT_COALESCED
+
+logger = logging.getLogger(__name__)
+
+
+def coordinate_key(provider: str, lat: float, lon: float, *extra: Hashable) -> Tuple[Hashable, ...]:
+    """Clé d'un appel fournisseur : coordonnées arrondies à SINGLEFLIGHT_COORD_DECIMALS (4 ≈ 11 m)."""
+    decimals = settings.SINGLEFLIGHT_COORD_DECIMALS
+    return (provider, round(lat, decimals), round(lon, decimals), *extra)
+
+
+class SingleFlight:
+    """Partage le résultat d'un appel en cours entre tous les appelants de même clé."""
+
+    def __init__(self):
+        self._calls: Dict[Tuple[Hashable, ...], asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Tuple[Hashable, ...], factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Exécute `factory()` si aucun appel de même clé (voir `coordinate_key`) n'est en cours,
+        sinon attend celui-ci.
+        L'appel partagé est protégé (`shield`) : l'abandon d'un appelant (délai dépassé) n'annule
+        pas le résultat attendu par les autres. Il n'est annulé que si plus personne ne l'attend.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+        if task is not None and task.get_loop() is loop and not task.done():
+            SINGLEFLIGHT_COALESCED.labels(key[0]).inc()
+            logger.info(f"Appel regroupé avec un appel identique en cours : {key}")
+        else:
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            self._waiters[task] = 0
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        self._waiters[task] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._release(task)
+
+    def _release(self, task: asyncio.Task) -> None:
+        if task not in self._waiters:
+            return
+        self._waiters[task] -= 1
+        if self._waiters[task] == 0 and not task.done():
+            task.cancel()
+
+    def _forget(self, key: Tuple[Hashable, ...], task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        self._waiters.pop(task, None)
+        if not task.cancelled():
+            # Évite l'avertissement "exception never retrieved" si tous les appelants ont abandonné
+            task.exception()
+
+
+provider_flights = SingleFlight()
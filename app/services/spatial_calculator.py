@@ -1,9 +1,29 @@
+import asyncio
 import logging
-import requests
+import math
 import ee
+import numpy as np
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional
 from app.config import settings
+from app.services.osm_features import (
+    OSM_COUNT_KEYS,
+    OsmElements,
+    build_overpass_count_query,
+    build_overpass_query,
+    counts_from_count_response,
+    element_arrays,
+    empty_osm_counts,
+    rule_hits,
+)
+from app.services.geodesy import haversine_distances
+from app.services.osm_index import OsmSpatialIndex, get_osm_index
+from app.services.osm_tiles import osm_tile_store
+from app.services.http_client import http_request
+from app.services.overpass_pool import disc_bbox, fetch_bbox_elements, overpass_pool
+from app.services.reverse_geocoder import reverse_geocode_many
+from app.services.metrics import record_fallback, track_provider_call
+from app.services.weather_service import weather_service
 
 logger = logging.getLogger(__name__)
 
@@ -24,12 +44,38 @@ except Exception as e:
     logger.warning(f"Google Earth Engine non initialisé. Erreur: {e}")
     GEE_INITIALIZED = False
 
-def get_geocoding_context(lat: float, lon: float) -> Dict[str, str]:
-    """Récupère le contexte administratif (Ville, Région, Pays) via Nominatim (OpenStreetMap)."""
+DEFAULT_GEOCODING = {"city": "Inconnu", "region": "Inconnue", "country": "Inconnu", "display_name": "Lieu inconnu"}
+DEFAULT_WEATHER = {"temperature_celsius": 25.0, "precipitation": 0.0, "wind_speed": 10.0}
+DEFAULT_SLOPE = 0.0
+DEFAULT_TERRAIN = {"elevation": 0.0, "slope_percent": DEFAULT_SLOPE}
+
+def default_osm_data() -> Dict[str, Any]:
+    return {"counts": empty_osm_counts(), "elements": OsmElements.empty()}
+
+def degraded_value(value: Dict[str, Any]) -> Dict[str, Any]:
+    """Valeur de repli d'un fournisseur en erreur, marquée `"degraded"` : l'analyse qui l'utilise est signalée dégradée."""
+    return {**value, "degraded": True}
+
+def unavailable_osm_data() -> Dict[str, Any]:
+    """Données OSM par défaut marquées dégradées : Overpass injoignable, les décomptes nuls ne sont pas réels."""
+    return degraded_value(default_osm_data())
+
+def default_satellite_data() -> Dict[str, Any]:
+    return {"ndvi": None, "ndwi": None, "land_use": "Inconnu"}
+
+async def get_geocoding_context(lat: float, lon: float) -> Dict[str, str]:
+    """
+    Récupère le contexte administratif (Ville, Région, Pays) : limites administratives locales
+    (GEOCODER_BOUNDARIES_PATH) si elles couvrent le point, sinon Nominatim (OpenStreetMap).
+    """
+    # Recherche (et éventuel rechargement du fichier) hors de la boucle d'événements
+    context = (await asyncio.to_thread(reverse_geocode_many, [(lat, lon)]))[0]
+    if context is not None:
+        return context
     try:
         url = f"https://nominatim.openstreetmap.org/reverse?lat={lat}&lon={lon}&format=json&accept-language=fr"
         headers = {"User-Agent": "MapActionImpactEngine/1.0"}
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await http_request("GET", url, headers=headers, timeout=10)
         response.raise_for_status()
         data = response.json()
         address = data.get("address", {})
@@ -42,143 +88,136 @@ def get_geocoding_context(lat: float, lon: float) -> Dict[str, str]:
         }
     except Exception as e:
         logger.error(f"Erreur Géocodage : {e}")
-        return {"city": "Inconnu", "region": "Inconnue", "country": "Inconnu", "display_name": "Lieu inconnu"}
+        record_fallback("geocoding", "error")
+        return degraded_value(DEFAULT_GEOCODING)
+
+def _get_gee_slope(lat: float, lon: float) -> float:
+    """
+    Pente moyenne SRTM au point via GEE (appel bloquant `getInfo`), en pourcentage :
+    `ee.Terrain.slope` renvoie des degrés, convertis comme la pente des tuiles locales (tan × 100).
+    """
+    with track_provider_call("gee"):
+        point = ee.Geometry.Point(lon, lat)
+        dem = ee.Image("USGS/SRTMGL1_003")
+        slope_img = ee.Terrain.slope(dem)
+        slope_val = slope_img.reduceRegion(reducer=ee.Reducer.mean(), geometry=point, scale=30).get('slope').getInfo()
+    return math.tan(math.radians(float(slope_val))) * 100.0 if slope_val is not None else 0.0
 
-def get_slope_data(lat: float, lon: float) -> float:
+async def get_slope_data(lat: float, lon: float) -> Dict[str, float]:
     """
-    Récupère l'altitude et calcule une estimation de la pente (slope) via Open-Meteo Elevation API.
-    Note: Open-Meteo Elevation donne l'altitude. Pour la pente précise, il faudrait plusieurs points,
-    mais on va simuler ou récupérer l'élévation pour ce point.
+    Altitude (Open-Meteo Elevation) et pente en pourcentage (SRTM via GEE) du point.
+    Repli des tuiles d'altitude locales (voir `dem_tiles`) pour les points qu'elles ne couvrent pas.
     """
     try:
-        # Open-Meteo Elevation
         url = f"{settings.OPEN_METEO_ELEVATION_URL}?latitude={lat}&longitude={lon}"
-        response = requests.get(url, timeout=10)
+        response = await http_request("GET", url, timeout=10)
         response.raise_for_status()
-        data = response.json()
-        
-        if "elevation" in data and len(data["elevation"]) > 0:
-            elevation = data["elevation"][0]
-            # Pour calculer une vraie pente (slope) en %, il faut normalement un DEM (Digital Elevation Model) local.
-            # Ici, nous retournons une valeur simulée basée sur des heuristiques géographiques ou un appel météo si la pente y est exposée.
-            # Pour l'instant, on retourne 0.0 et on laisse une logique future affiner.
-            # Si on voulait une vraie pente, on interrogerait un DEM via GEE.
-            
-            # Utilisons GEE pour la pente si disponible, sinon on simule
-            if GEE_INITIALIZED:
-                point = ee.Geometry.Point(lon, lat)
-                dem = ee.Image("USGS/SRTMGL1_003")
-                slope_img = ee.Terrain.slope(dem)
-                slope_val = slope_img.reduceRegion(reducer=ee.Reducer.mean(), geometry=point, scale=30).get('slope').getInfo()
-                return float(slope_val) if slope_val is not None else 0.0
-
-            return 5.0 # Valeur de pente par défaut (5%) si GEE n'est pas dispo
-            
+        elevations = response.json().get("elevation") or []
+        elevation = float(elevations[0]) if elevations else DEFAULT_TERRAIN["elevation"]
+
+        if GEE_INITIALIZED:
+            slope = await asyncio.to_thread(_get_gee_slope, lat, lon)
+        else:
+            slope = 5.0 # Valeur de pente par défaut (5%) si GEE n'est pas dispo
+        return {"elevation": elevation, "slope_percent": slope}
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des données topographiques: {e}")
-        return 0.0
+        record_fallback("slope", "error")
+        return degraded_value(DEFAULT_TERRAIN)
 
-import math
-
-def get_weather_data(lat: float, lon: float) -> Dict[str, float]:
-    """Récupère les données météo actuelles via Open-Meteo."""
+async def get_weather_data(lat: float, lon: float) -> Dict[str, float]:
+    """
+    Récupère les données météo actuelles via Open-Meteo, mises en cache par cellule de grille et
+    tranche de temps et demandées en requêtes groupées (voir `weather_service`).
+    """
     try:
-        url = f"{settings.OPEN_METEO_FORECAST_URL}?latitude={lat}&longitude={lon}&current=temperature_2m,precipitation,wind_speed_10m"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        current = data.get("current", {})
-        return {
-            "temperature_celsius": float(current.get("temperature_2m", 25.0)),
-            "precipitation": float(current.get("precipitation", 0.0)),
-            "wind_speed": float(current.get("wind_speed_10m", 0.0))
-        }
+        return await weather_service.get(lat, lon)
     except Exception as e:
         logger.error(f"Erreur météo: {e}")
-        return {"temperature_celsius": 25.0, "precipitation": 0.0, "wind_speed": 10.0}
+        record_fallback("weather", "error")
+        return degraded_value(DEFAULT_WEATHER)
 
-def get_osm_data(lat: float, lon: float, radius: int) -> Dict[str, Any]:
+async def get_osm_data(lat: float, lon: float, radius: int) -> Dict[str, Any]:
     """
     Récupère les infrastructures sensibles dans un rayon donné via Overpass API.
-    Retourne les décomptes et les éléments bruts pour un filtrage ultérieur.
+    Retourne les décomptes et les éléments au format colonnes (`OsmElements`) pour un filtrage
+    ultérieur : la réponse est lue en flux, chaque élément étant classé dès sa réception, et le
+    document brut n'est jamais matérialisé.
+    Si l'index hors ligne (OSM_INDEX_PATH) couvre le disque, la réponse est locale, sans Overpass.
+    Sinon, si le cache tuilé est actif, le disque est assemblé depuis les tuiles OSM en cache.
+    Si aucun miroir Overpass ne répond, les décomptes nuls retournés sont marqués `"degraded"`.
     """
-    overpass_query = f"""
-    [out:json];
-    (
-      node["amenity"~"hospital|clinic|maternity"](around:{radius},{lat},{lon});
-      way["amenity"~"hospital|clinic|maternity"](around:{radius},{lat},{lon});
-      
-      node["amenity"~"school|kindergarten|college|nursery|childcare"](around:{radius},{lat},{lon});
-      way["amenity"~"school|kindergarten|college|nursery|childcare"](around:{radius},{lat},{lon});
-      
-      node["amenity"~"market|marketplace"](around:{radius},{lat},{lon});
-      way["amenity"~"market|marketplace"](around:{radius},{lat},{lon});
-      
-      node["amenity"~"drinking_water|water_point"](around:{radius},{lat},{lon});
-      node["man_made"~"water_well|water_tap"](around:{radius},{lat},{lon});
-      
-      way["highway"~"primary|secondary|bridge"](around:{radius},{lat},{lon});
-      
-      way["building"](around:{radius},{lat},{lon});
-      node["building"](around:{radius},{lat},{lon});
-    );
-    out center;
+    index = get_osm_index()
+    if index is not None and index.covers(lat, lon, radius):
+        return _get_osm_data_from_index(index, lat, lon, radius)
+
+    if settings.OSM_TILE_CACHE_ENABLED:
+        return await _get_osm_data_from_tiles(lat, lon, radius)
+
+    try:
+        if 2 * radius <= settings.OVERPASS_SPLIT_CELL_METERS:
+            elements = await overpass_pool.fetch_elements(build_overpass_query(f"(around:{radius},{lat},{lon})"))
+        else:
+            # Zone lourde : sous-emprises interrogées en parallèle, puis découpe au disque
+            elements = await fetch_bbox_elements(disc_bbox(lat, lon, radius), build_overpass_query)
+            lats, lons, _ = element_arrays(elements)
+            elements = elements[haversine_distances(lat, lon, lats, lons) <= radius]
+    except Exception as e:
+        logger.error(f"Erreur lors de la requête Overpass API: {e}")
+        record_fallback("osm", "error")
+        return unavailable_osm_data()
+
+    return {"counts": elements.counts(), "elements": elements}
+
+async def get_osm_macro_counts(lat: float, lon: float, radius: int) -> Dict[str, Any]:
     """
-    
-    counts = {
-        "health_centers": 0,
-        "maternities": 0,
-        "schools": 0,
-        "nurseries": 0,
-        "markets": 0,
-        "water_points": 0,
-        "main_roads_bridges": 0,
-        "residential_buildings": 0
-    }
-    
+    Décomptes OSM du disque Macro sans ses éléments (mode de collecte "adaptive").
+    La requête "out count" ne transfère que quelques octets ; le résultat porte `"detail": False`
+    pour que les éléments soient ensuite récupérés jusqu'au plus grand rayon réellement utile.
+    Si l'index hors ligne couvre le disque, les décomptes sont sommés sur ses cellules H3 ; de même
+    sur les pyramides H3 des tuiles OSM si toutes les tuiles du disque sont déjà en cache.
+    """
+    index = get_osm_index()
+    if index is not None and index.covers(lat, lon, radius):
+        with track_provider_call("osm_index"):
+            counts = index.counts_within(lat, lon, radius)
+        return {"counts": counts, "elements": OsmElements.empty(), "detail": False}
+
+    if settings.OSM_TILE_CACHE_ENABLED:
+        with track_provider_call("osm_tiles"):
+            counts = await osm_tile_store.cached_counts_within(lat, lon, radius)
+        if counts is not None:
+            return {"counts": counts, "elements": OsmElements.empty(), "detail": False}
+
+    query = build_overpass_count_query(f"(around:{radius},{lat},{lon})")
     try:
-        headers = {"User-Agent": "MapActionImpactEngine/1.0"}
-        response = requests.post(settings.OVERPASS_API_URL, data={"data": overpass_query}, headers=headers, timeout=30)
-        response.raise_for_status()
-        elements = response.json().get("elements", [])
-        
-        for el in elements:
-            tags = el.get("tags", {})
-            amenity = tags.get("amenity", "")
-            highway = tags.get("highway", "")
-            building = tags.get("building", "")
-            
-            if amenity in ["hospital", "clinic"]:
-                counts["health_centers"] += 1
-            elif amenity == "maternity":
-                counts["maternities"] += 1
-                counts["health_centers"] += 1  # Comptée aussi en santé générale
-            elif amenity in ["school", "college"]:
-                counts["schools"] += 1
-            elif amenity in ["kindergarten", "nursery", "childcare"]:
-                counts["nurseries"] += 1
-                counts["schools"] += 1  # Comptée aussi en éducation
-            elif amenity in ["market", "marketplace"]:
-                counts["markets"] += 1
-            elif amenity in ["drinking_water", "water_point"]:
-                counts["water_points"] += 1
-            
-            man_made = tags.get("man_made", "")
-            if man_made in ["water_well", "water_tap"]:
-                counts["water_points"] += 1
-                
-            if highway in ["primary", "secondary", "bridge"]:
-                counts["main_roads_bridges"] += 1
-                
-            # Tous les bâtiments (building=* y compris building=yes)
-            if building and building not in ["", "no"]:
-                counts["residential_buildings"] += 1
-                
+        counts = counts_from_count_response(await overpass_pool.fetch_json(query))
+    except Exception as e:
+        logger.error(f"Erreur lors de la requête Overpass API (décomptes): {e}")
+        record_fallback("osm", "error")
+        return {**unavailable_osm_data(), "detail": False}
+    return {"counts": counts, "elements": OsmElements.empty(), "detail": False}
+
+def _get_osm_data_from_index(index: OsmSpatialIndex, lat: float, lon: float, radius: int) -> Dict[str, Any]:
+    """Disque (lat, lon, radius) lu dans l'index OSM hors ligne."""
+    with track_provider_call("osm_index"):
+        elements = index.candidates(lat, lon, radius)
+        lats, lons, _ = element_arrays(elements)
+        disc = elements[haversine_distances(lat, lon, lats, lons) <= radius]
+    return {"counts": disc.counts(), "elements": disc}
+
+async def _get_osm_data_from_tiles(lat: float, lon: float, radius: int) -> Dict[str, Any]:
+    """Assemble le disque (lat, lon, radius) à partir des tuiles OSM en cache (Overpass seulement pour les tuiles manquantes)."""
+    try:
+        elements = await osm_tile_store.get_elements(lat, lon, radius)
     except Exception as e:
         logger.error(f"Erreur lors de la requête Overpass API: {e}")
-        elements = []
-        
-    return {"counts": counts, "elements": elements}
+        record_fallback("osm", "error")
+        return unavailable_osm_data()
+
+    lats, lons, _ = element_arrays(elements)
+    disc = elements[haversine_distances(lat, lon, lats, lons) <= radius]
+    return {"counts": disc.counts(), "elements": disc}
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calcule la distance en mètres entre deux points GPS."""
@@ -189,51 +228,53 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
     return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
+class RadialCounts:
+    """
+    Décomptes OSM cumulés par distance croissante autour d'un point.
+    Distances et contributions de chaque élément sont calculées sur des tableaux NumPy, triées
+    par distance, puis cumulées par catégorie : le décompte d'un rayon quelconque s'obtient
+    ensuite par recherche dichotomique, en O(log n), au lieu d'un nouveau parcours des éléments.
+    """
+
+    def __init__(self, distances: np.ndarray, cumulative: np.ndarray):
+        self.distances = distances
+        # cumulative[i] = décomptes des i éléments les plus proches (colonnes : OSM_COUNT_KEYS)
+        self.cumulative = cumulative
+
+    @classmethod
+    def from_arrays(cls, lats: np.ndarray, lons: np.ndarray, masks: np.ndarray, origin_lat: float, origin_lon: float) -> "RadialCounts":
+        distances = haversine_distances(origin_lat, origin_lon, lats, lons)
+        order = np.argsort(distances, kind="stable")
+        cumulative = np.zeros((len(order) + 1, len(OSM_COUNT_KEYS)), dtype=np.int64)
+        np.cumsum(rule_hits(masks[order]), axis=0, out=cumulative[1:])
+        return cls(distances[order], cumulative)
+
+    @classmethod
+    def from_osm(cls, osm_data: Dict[str, Any], origin_lat: float, origin_lon: float) -> "RadialCounts":
+        elements = osm_data.get("elements", [])
+        lats, lons, masks = element_arrays(elements)
+        logger.info(f"Décomptes radiaux : {len(lats)} éléments positionnés sur {len(elements)} reçus")
+        return cls.from_arrays(lats, lons, masks, origin_lat, origin_lon)
+
+    def counts_within(self, radius: float) -> Dict[str, int]:
+        """Décomptes des éléments à une distance <= radius."""
+        row = self.cumulative[np.searchsorted(self.distances, radius, side="right")]
+        return dict(zip(OSM_COUNT_KEYS, row.tolist()))
+
+
+def count_osm_by_radii(osm_data: Dict[str, Any], origin_lat: float, origin_lon: float, radii: Iterable[float]) -> List[Dict[str, int]]:
+    """Décomptes OSM pour plusieurs rayons en un seul parcours des éléments (un dictionnaire par rayon)."""
+    radial = RadialCounts.from_osm(osm_data, origin_lat, origin_lon)
+    return [radial.counts_within(radius) for radius in radii]
+
 def filter_osm_by_radius(osm_data: Dict[str, Any], origin_lat: float, origin_lon: float, final_radius: float) -> Dict[str, int]:
     """Filtre les éléments OSM pour ne garder que ceux strictement dans le rayon final."""
-    counts = {
-        "health_centers": 0, "maternities": 0, "schools": 0, "nurseries": 0,
-        "markets": 0, "water_points": 0, "main_roads_bridges": 0, "residential_buildings": 0
-    }
-    
-    elements = osm_data.get("elements", [])
-    logger.info(f"Filtrage Micro : {len(elements)} éléments macro reçus pour un rayon de {final_radius}m")
-    
-    for el in elements:
-        el_lat = el.get("lat") or (el.get("center", {}).get("lat"))
-        el_lon = el.get("lon") or (el.get("center", {}).get("lon"))
-        
-        if el_lat is None or el_lon is None:
-            continue
-            
-        dist = haversine_distance(origin_lat, origin_lon, el_lat, el_lon)
-        if dist <= final_radius:
-            tags = el.get("tags", {})
-            # Debug: logger.debug(f"Element in radius: {el.get('id')} type={el.get('type')} tags={tags}")
-            
-            amenity = tags.get("amenity", "")
-            highway = tags.get("highway", "")
-            building = tags.get("building", "")
-            man_made = tags.get("man_made", "")
-            
-            if amenity in ["hospital", "clinic"]: counts["health_centers"] += 1
-            elif amenity == "maternity":
-                counts["maternities"] += 1
-                counts["health_centers"] += 1
-            elif amenity in ["school", "college"]: counts["schools"] += 1
-            elif amenity in ["kindergarten", "nursery", "childcare"]:
-                counts["nurseries"] += 1
-                counts["schools"] += 1
-            elif amenity in ["market", "marketplace"]: counts["markets"] += 1
-            elif amenity in ["drinking_water", "water_point"]: counts["water_points"] += 1
-            if man_made in ["water_well", "water_tap"]: counts["water_points"] += 1
-            if highway in ["primary", "secondary", "bridge"]: counts["main_roads_bridges"] += 1
-            if building and building not in ["", "no"]: counts["residential_buildings"] += 1
-            
+    counts = count_osm_by_radii(osm_data, origin_lat, origin_lon, [final_radius])[0]
     logger.info(f"Résultats filtrés : {counts['residential_buildings']} bâtiments trouvés dans {final_radius}m")
     return counts
 
 URBAN_BUILDING_DENSITY_PER_KM2 = 1200
+PERSONS_PER_BUILDING = 6.5
 
 
 def estimate_urban_buildings_from_radius(radius_meters: float) -> int:
@@ -249,18 +290,28 @@ def calculate_social_vulnerability(
     osm_data: dict,
     land_use: str = "Inconnu",
     radius_meters: Optional[float] = None,
+    population: Optional[float] = None,
 ) -> Dict[str, Any]:
     """
     Calcule le score de vulnérabilité sociale sur 10.
     Utilise une approche probabiliste si les données OSM sont vides en zone dense ou urbaine.
+    `population` (raster de population, si configuré) remplace alors la densité urbaine forfaitaire.
     """
     raw_score = 0.0
     is_probabilistic = False
     
     buildings = osm_data.get('residential_buildings', 0)
     
+    # Correction : OSM pauvre (< 5 bâtiments) mais population mesurée par le raster
+    if buildings < 5 and population is not None:
+        estimated = int(round(population / PERSONS_PER_BUILDING))
+        if estimated > buildings:
+            buildings = estimated
+            osm_data['residential_buildings'] = buildings
+            is_probabilistic = True
+            logger.info("OSM pauvre. Estimation par raster de population : %s bâtiments.", buildings)
     # Correction : Si le satellite dit "Urbain" mais OSM est pauvre (< 5 bâtiments)
-    if buildings < 5 and land_use == "Urbain / Bâti":
+    elif buildings < 5 and land_use == "Urbain / Bâti":
         # On estime une densité urbaine à partir de la surface du rayon analysé.
         # Sans rayon fourni, on garde l'ancien équivalent 200m pour compatibilité.
         estimation_radius = radius_meters if radius_meters is not None else 200
@@ -321,12 +372,16 @@ def calculate_social_vulnerability(
         "estimated_buildings": buildings # On renvoie le nombre (éventuellement estimé)
     }
 
-def calculate_human_impact(osm_micro: dict, estimated_buildings: int = None) -> dict:
+def calculate_human_impact(osm_micro: dict, estimated_buildings: int = None, population: Optional[float] = None) -> dict:
     """
-    Estime la population exposée. Utilise les bâtiments estimés si fournis.
+    Estime la population exposée. Utilise la population du raster si fournie, sinon les
+    bâtiments (estimés si fournis).
     """
-    buildings = estimated_buildings if estimated_buildings is not None else osm_micro.get('residential_buildings', 0)
-    total_population = int(buildings * 6.5)
+    if population is not None:
+        total_population = int(round(population))
+    else:
+        buildings = estimated_buildings if estimated_buildings is not None else osm_micro.get('residential_buildings', 0)
+        total_population = int(buildings * PERSONS_PER_BUILDING)
     
     children = int(total_population * 0.47)
     adult_women = int(total_population * 0.27)
@@ -345,13 +400,9 @@ def calculate_human_impact(osm_micro: dict, estimated_buildings: int = None) ->
 def get_satellite_analysis(lat: float, lon: float) -> Dict[str, Any]:
     """
     Analyse satellite avec Google Earth Engine (NDVI, NDWI, Land Use).
-    Retourne des valeurs par défaut si GEE n'est pas initialisé ou en cas d'erreur.
+    Retourne des valeurs par défaut si GEE n'est pas initialisé, marquées `"degraded"` en cas d'erreur.
     """
-    result = {
-        "ndvi": None,
-        "ndwi": None,
-        "land_use": "Inconnu"
-    }
+    result = default_satellite_data()
     
     if not GEE_INITIALIZED:
         logger.warning("get_satellite_analysis appelé mais GEE_INITIALIZED est False. Retour des valeurs nulles.")
@@ -360,44 +411,47 @@ def get_satellite_analysis(lat: float, lon: float) -> Dict[str, Any]:
     logger.info("Début de l'analyse GEE...")
         
     try:
-        point = ee.Geometry.Point(lon, lat)
+        with track_provider_call("gee"):
+            point = ee.Geometry.Point(lon, lat)
         
-        # NDVI (Sentinel-2)
-        s2 = ee.ImageCollection("COPERNICUS/S2_SR_HARMONIZED") \
-            .filterBounds(point) \
-            .filterDate('2020-01-01', '2026-01-01') \
-            .sort('CLOUDY_PIXEL_PERCENTAGE') \
-            .first()
+            # NDVI (Sentinel-2)
+            s2 = ee.ImageCollection("COPERNICUS/S2_SR_HARMONIZED") \
+                .filterBounds(point) \
+                .filterDate('2020-01-01', '2026-01-01') \
+                .sort('CLOUDY_PIXEL_PERCENTAGE') \
+                .first()
             
-        if s2:
-            ndvi = s2.normalizedDifference(['B8', 'B4'])
-            ndwi = s2.normalizedDifference(['B3', 'B8'])
+            if s2:
+                ndvi = s2.normalizedDifference(['B8', 'B4'])
+                ndwi = s2.normalizedDifference(['B3', 'B8'])
             
-            ndvi_val = ndvi.reduceRegion(reducer=ee.Reducer.mean(), geometry=point, scale=10).get('nd').getInfo()
-            ndwi_val = ndwi.reduceRegion(reducer=ee.Reducer.mean(), geometry=point, scale=10).get('nd').getInfo()
+                ndvi_val = ndvi.reduceRegion(reducer=ee.Reducer.mean(), geometry=point, scale=10).get('nd').getInfo()
+                ndwi_val = ndwi.reduceRegion(reducer=ee.Reducer.mean(), geometry=point, scale=10).get('nd').getInfo()
             
-            result["ndvi"] = float(ndvi_val) if ndvi_val is not None else None
-            result["ndwi"] = float(ndwi_val) if ndwi_val is not None else None
+                result["ndvi"] = float(ndvi_val) if ndvi_val is not None else None
+                result["ndwi"] = float(ndwi_val) if ndwi_val is not None else None
 
-        # Land Cover (Copernicus Global Land Cover)
-        lc = ee.Image("COPERNICUS/Landcover/100m/Proba-V-C3/Global/2019")
-        lc_val = lc.select('discrete_classification').reduceRegion(reducer=ee.Reducer.first(), geometry=point, scale=100).get('discrete_classification').getInfo()
+            # Land Cover (Copernicus Global Land Cover)
+            lc = ee.Image("COPERNICUS/Landcover/100m/Proba-V-C3/Global/2019")
+            lc_val = lc.select('discrete_classification').reduceRegion(reducer=ee.Reducer.first(), geometry=point, scale=100).get('discrete_classification').getInfo()
         
-        # Mapping des classes en Français
-        lc_map = {
-            20: "Arbustes", 
-            30: "Végétation herbacée", 
-            40: "Terres agricoles / cultivées",
-            50: "Urbain / Bâti", 
-            60: "Végétation rare / Sols nus", 
-            80: "Plans d'eau permanents",
-            111: "Forêt dense (feuillage persistant)", 
-            112: "Forêt dense (feuillus)"
-        }
-        if lc_val in lc_map:
-            result["land_use"] = lc_map[lc_val]
+            # Mapping des classes en Français
+            lc_map = {
+                20: "Arbustes", 
+                30: "Végétation herbacée", 
+                40: "Terres agricoles / cultivées",
+                50: "Urbain / Bâti", 
+                60: "Végétation rare / Sols nus", 
+                80: "Plans d'eau permanents",
+                111: "Forêt dense (feuillage persistant)", 
+                112: "Forêt dense (feuillus)"
+            }
+            if lc_val in lc_map:
+                result["land_use"] = lc_map[lc_val]
             
     except Exception as e:
         logger.error(f"Erreur lors de l'analyse GEE: {e}")
+        record_fallback("satellite", "error")
+        return degraded_value(result)
         
     return result
@@ -0,0 +1,182 @@
+"""
+Exécuteur de graphe d'étapes (DAG) pour le pipeline d'analyse.
+
+Chaque étape déclare ses entrées (noms d'autres étapes ou de valeurs initiales) et produit une
+valeur sous son propre nom. Une étape démarre dès que toutes ses entrées sont disponibles : les
+étapes indépendantes s'exécutent donc en parallèle sans ordre écrit à la main. Chaque étape est
+chronométrée (métrique `impact_phase_duration_seconds`) et peut mettre son résultat en cache.
+Une valeur déjà fournie au lancement (contexte partagé d'un lot, par exemple) n'est pas recalculée.
+"""
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from app.services.metrics import track_phase
+
+logger = logging.getLogger(__name__)
+
+
+class StageCache:
+    """Cache mémoire LRU avec TTL pour le résultat d'une étape."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+@dataclass
+class Stage:
+    """
+    Étape du graphe : `func` reçoit ses entrées en arguments nommés et retourne la valeur de l'étape.
+    `func` peut être synchrone (calcul local) ou une coroutine (appel fournisseur).
+    Avec `cache` et `cache_key`, le résultat est réutilisé pour des entrées de même clé.
+    """
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    cache: Optional[StageCache] = None
+    cache_key: Optional[Callable[..., Hashable]] = None
+    should_cache: Callable[[Any], bool] = field(default=lambda value: True)
+
+    async def execute(self, values: Dict[str, Any]) -> Any:
+        kwargs = {name: values[name] for name in self.inputs}
+        key = None
+        if self.cache is not None and self.cache_key is not None:
+            key = self.cache_key(**kwargs)
+            hit, value = self.cache.get(key)
+            if hit:
+                return value
+
+        with track_phase(self.name):
+            value = self.func(**kwargs)
+            if inspect.isawaitable(value):
+                value = await value
+
+        if key is not None and self.should_cache(value):
+            self.cache.set(key, value)
+        return value
+
+
+class StageGraph:
+    """Graphe d'étapes validé à la construction (noms uniques, entrées connues, absence de cycle)."""
+
+    def __init__(self, stages: Iterable[Stage], initial_inputs: Iterable[str] = ()):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Étape déclarée deux fois : {stage.name}")
+            self.stages[stage.name] = stage
+        self.initial_inputs = set(initial_inputs)
+        for stage in self.stages.values():
+            unknown = [name for name in stage.inputs if name not in self.stages and name not in self.initial_inputs]
+            if unknown:
+                raise ValueError(f"Entrées inconnues pour l'étape '{stage.name}' : {unknown}")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, int] = {}
+
+        def visit(name: str, path: Tuple[str, ...]) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Cycle dans le graphe d'étapes : {' -> '.join(path + (name,))}")
+            state[name] = 1
+            for dependency in self.stages[name].inputs:
+                if dependency in self.stages:
+                    visit(dependency, path + (name,))
+            state[name] = 2
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, ())
+        return order
+
+    def required_stages(self, targets: Optional[Iterable[str]], provided: Set[str]) -> List[str]:
+        """Étapes à exécuter pour obtenir `targets` (toutes par défaut), hors valeurs déjà fournies."""
+        if targets is None:
+            wanted = set(self.stages)
+        else:
+            wanted = set()
+            pending = list(targets)
+            while pending:
+                name = pending.pop()
+                if name in wanted or name in provided or name not in self.stages:
+                    continue
+                wanted.add(name)
+                pending.extend(self.stages[name].inputs)
+        return [name for name in self.order if name in wanted and name not in provided]
+
+    async def iterate(
+        self,
+        initial: Dict[str, Any],
+        targets: Optional[Iterable[str]] = None,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Exécute le graphe et produit (étape, valeur) dans l'ordre d'achèvement.
+        Les étapes encore en cours sont annulées si l'appelant abandonne ou si une étape échoue.
+        """
+        values = dict(initial)
+        remaining = self.required_stages(targets, set(values))
+        missing = sorted({
+            name for stage in remaining for name in self.stages[stage].inputs
+            if name in self.initial_inputs and name not in values
+        })
+        if missing:
+            raise ValueError(f"Valeurs initiales manquantes : {missing}")
+
+        running: Dict[asyncio.Task, str] = {}
+        try:
+            while remaining or running:
+                for name in list(remaining):
+                    if all(dependency in values for dependency in self.stages[name].inputs):
+                        running[asyncio.create_task(self.stages[name].execute(values))] = name
+                        remaining.remove(name)
+                if not running:
+                    raise RuntimeError(f"Étapes bloquées (entrées indisponibles) : {remaining}")
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    values[name] = task.result()
+                    yield name, values[name]
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def run(self, initial: Dict[str, Any], targets: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Exécute le graphe et retourne toutes les valeurs (initiales et calculées)."""
+        values = dict(initial)
+        async for name, value in self.iterate(initial, targets):
+            values[name] = value
+        return values
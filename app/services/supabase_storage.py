@@ -4,12 +4,13 @@ Supabase Storage Service for uploading files to Supabase storage buckets.
 
 import os
 import logging
-import requests
 import uuid
 from datetime import datetime
 from typing import Optional
 from dotenv import load_dotenv
 
+from app.services.http_client import http_request
+
 load_dotenv()
 
 # Configure logging
@@ -22,7 +23,7 @@ SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 SUPABASE_BUCKET = os.getenv('SUPABASE_BUCKET', 'images')
 
 
-def upload_file_to_supabase(file_data: bytes, file_name: str, bucket: str = None, content_type: str = 'image/png') -> Optional[str]:
+async def upload_file_to_supabase(file_data: bytes, file_name: str, bucket: str = None, content_type: str = 'image/png') -> Optional[str]:
     """
     Upload a file to Supabase Storage and return a signed URL.
 
@@ -66,11 +67,11 @@ def upload_file_to_supabase(file_data: bytes, file_name: str, bucket: str = None
 
         # Upload the file
         logger.info(f"Uploading file to Supabase: {unique_file_name}")
-        response = requests.post(upload_url, data=file_data, headers=headers)
+        response = await http_request("POST", upload_url, content=file_data, headers=headers)
 
         if response.status_code in [200, 201]:
             # Create a signed URL instead of returning the public URL
-            signed_url = create_signed_url(unique_file_name, bucket, expires_in=3600*24*7)  # 7 days expiry
+            signed_url = await create_signed_url(unique_file_name, bucket, expires_in=3600*24*7)  # 7 days expiry
             if signed_url:
                 logger.info(f"File uploaded successfully with signed URL: {unique_file_name}")
                 return signed_url
@@ -86,7 +87,7 @@ def upload_file_to_supabase(file_data: bytes, file_name: str, bucket: str = None
         return None
 
 
-def upload_plot_to_supabase(plot_data, plot_type: str, incident_id: str = None) -> Optional[str]:
+async def upload_plot_to_supabase(plot_data, plot_type: str, incident_id: str = None) -> Optional[str]:
     """
     Upload a plot/chart to Supabase Storage with standardized naming.
 
@@ -127,7 +128,7 @@ def upload_plot_to_supabase(plot_data, plot_type: str, incident_id: str = None)
             file_name = f"{plot_type}_{timestamp}.png"
         
         # Upload the file
-        upload_result = upload_file_to_supabase(file_bytes, file_name, content_type='image/png')
+        upload_result = await upload_file_to_supabase(file_bytes, file_name, content_type='image/png')
         
         # If upload was successful and we have a file to delete, clean it up
         if upload_result and file_path_to_delete:
@@ -144,7 +145,7 @@ def upload_plot_to_supabase(plot_data, plot_type: str, incident_id: str = None)
         return None
 
 
-def create_signed_url(file_path: str, bucket: str = None, expires_in: int = 3600) -> Optional[str]:
+async def create_signed_url(file_path: str, bucket: str = None, expires_in: int = 3600) -> Optional[str]:
     """
     Create a signed URL for accessing a file in Supabase Storage.
 
@@ -181,7 +182,7 @@ def create_signed_url(file_path: str, bucket: str = None, expires_in: int = 3600
             'expiresIn': expires_in
         }
 
-        response = requests.post(signed_url_endpoint, json=payload, headers=headers)
+        response = await http_request("POST", signed_url_endpoint, json=payload, headers=headers)
 
         if response.status_code == 200:
             signed_data = response.json()
@@ -0,0 +1,159 @@
+"""
+Météo actuelle mise en cache par cellule de grille et tranche de temps, avec requêtes groupées.
+
+La météo varie peu à l'intérieur d'une cellule de WEATHER_CELL_DEGREES (0,1° ≈ 10 km) pendant
+WEATHER_BUCKET_SECONDS (15 min) : la valeur d'une cellule est celle de son centre, conservée en
+mémoire jusqu'à la fin de sa tranche de temps.
+
+Les cellules manquantes ne sont pas demandées une à une : elles sont mises en attente pendant
+WEATHER_BATCH_WINDOW_SECONDS puis récupérées en une seule requête Open-Meteo multi-points
+(latitudes et longitudes séparées par des virgules, au plus WEATHER_BATCH_MAX_LOCATIONS). Un lot
+ou un afflux de signalements coûte ainsi un appel météo au lieu d'un par incident.
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.services.http_client import http_request
+from app.services.stage_graph import StageCache
+
+logger = logging.getLogger(__name__)
+
+CURRENT_VARIABLES = "temperature_2m,precipitation,wind_speed_10m"
+
+CellKey = Tuple[int, int, int]  # (ligne, colonne, tranche de temps)
+
+
+def parse_current(payload: Dict) -> Dict[str, float]:
+    """Météo d'un point de la réponse Open-Meteo (valeurs par défaut pour les variables absentes)."""
+    current = payload.get("current", {})
+    return {
+        "temperature_celsius": float(current.get("temperature_2m", 25.0)),
+        "precipitation": float(current.get("precipitation", 0.0)),
+        "wind_speed": float(current.get("wind_speed_10m", 0.0)),
+    }
+
+
+class WeatherService:
+    """Cache (cellule, tranche de temps) et regroupement des cellules manquantes en requêtes multi-points."""
+
+    def __init__(self, cell_degrees: float, bucket_seconds: float, batch_window: float, max_batch: int, max_entries: int = 4096):
+        self.cell_degrees = cell_degrees
+        self.bucket_seconds = bucket_seconds
+        self.batch_window = batch_window
+        self.max_batch = max(1, max_batch)
+        self._cache = StageCache(ttl_seconds=bucket_seconds, max_entries=max_entries)
+        self._pending: Dict[CellKey, asyncio.Future] = {}
+        self._queue: List[CellKey] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._tasks: set = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def cell_key(self, lat: float, lon: float) -> CellKey:
+        size = self.cell_degrees
+        return math.floor(lat / size), math.floor(lon / size), math.floor(time.time() / self.bucket_seconds)
+
+    def cell_center(self, key: Hashable) -> Tuple[float, float]:
+        size = self.cell_degrees
+        return round((key[0] + 0.5) * size, 4), round((key[1] + 0.5) * size, 4)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    async def get(self, lat: float, lon: float) -> Dict[str, float]:
+        """Météo actuelle de la cellule du point (cache, sinon requête groupée avec les autres cellules en attente)."""
+        key = self.cell_key(lat, lon)
+        hit, weather = self._cache.get(key)
+        if hit:
+            return dict(weather)
+        future = self._enqueue(key)
+        # L'abandon d'un appelant (délai dépassé) n'annule pas la requête attendue par les autres
+        return dict(await asyncio.shield(future))
+
+    async def get_many(self, points: Iterable[Tuple[float, float]]) -> List[Dict[str, float]]:
+        """Météo de plusieurs points, les cellules manquantes étant demandées ensemble."""
+        points = list(points)
+        self.prefetch(points)
+        return list(await asyncio.gather(*(self.get(lat, lon) for lat, lon in points)))
+
+    def prefetch(self, points: Iterable[Tuple[float, float]]) -> None:
+        """Met en attente les cellules manquantes des points sans attendre la réponse (ex: début d'un lot)."""
+        for lat, lon in points:
+            key = self.cell_key(lat, lon)
+            if not self._cache.get(key)[0]:
+                self._enqueue(key)
+
+    def _enqueue(self, key: CellKey) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Nouvelle boucle d'événements (tests, worker) : les attentes de l'ancienne sont abandonnées
+            self._pending, self._queue, self._flush_task, self._loop = {}, [], None, loop
+        future = self._pending.get(key)
+        if future is not None:
+            return future
+        future = loop.create_future()
+        # Une cellule préchargée que personne n'attend ne doit pas produire d'avertissement
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._pending[key] = future
+        self._queue.append(key)
+        if len(self._queue) >= self.max_batch:
+            self._spawn(self._flush())
+        elif self._flush_task is None:
+            self._flush_task = self._spawn(self._flush_later())
+        return future
+
+    def _spawn(self, coroutine) -> asyncio.Task:
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.batch_window)
+        self._flush_task = None
+        await self._flush()
+
+    async def _flush(self) -> None:
+        keys, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+        if self._queue and self._flush_task is None:
+            self._flush_task = self._spawn(self._flush_later())
+        if not keys:
+            return
+        try:
+            results = await self._fetch([self.cell_center(key) for key in keys])
+        except Exception as e:
+            for key in keys:
+                future = self._pending.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+        for key, weather in zip(keys, results):
+            self._cache.set(key, weather)
+            future = self._pending.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(weather)
+
+    async def _fetch(self, centers: List[Tuple[float, float]]) -> List[Dict[str, float]]:
+        """Une requête Open-Meteo pour toutes les cellules (réponse : un objet par point, ou un seul objet)."""
+        latitudes = ",".join(str(lat) for lat, _ in centers)
+        longitudes = ",".join(str(lon) for _, lon in centers)
+        url = f"{settings.OPEN_METEO_FORECAST_URL}?latitude={latitudes}&longitude={longitudes}&current={CURRENT_VARIABLES}"
+        response = await http_request("GET", url, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        payloads = data if isinstance(data, list) else [data]
+        if len(payloads) != len(centers):
+            raise ValueError(f"Réponse Open-Meteo incomplète : {len(payloads)} point(s) pour {len(centers)} demandé(s)")
+        logger.info(f"Météo : {len(centers)} cellule(s) récupérée(s) en une requête")
+        return [parse_current(payload) for payload in payloads]
+
+
+weather_service = WeatherService(
+    cell_degrees=settings.WEATHER_CELL_DEGREES,
+    bucket_seconds=settings.WEATHER_BUCKET_SECONDS,
+    batch_window=settings.WEATHER_BATCH_WINDOW_SECONDS,
+    max_batch=settings.WEATHER_BATCH_MAX_LOCATIONS,
+)
@@ -0,0 +1,102 @@
+"""
+Contrôle des URL de webhook fournies par les clients (/analyze/jobs).
+
+Le worker envoie une requête POST à l'URL donnée par l'appelant : sans contrôle, une tâche
+pourrait viser le réseau interne (métadonnées cloud en 169.254.169.254, Redis, services
+d'administration). Une URL de webhook doit donc :
+
+- utiliser https ;
+- désigner un hôte public (ni adresse privée, de bouclage, lien-local, réservée ou multicast) ;
+- si ANALYSIS_JOB_WEBHOOK_ALLOWED_HOSTS est renseigné, appartenir à l'un de ces domaines.
+
+Les adresses littérales et `localhost` sont refusées dès la soumission. Le nom d'hôte est de
+nouveau résolu au moment de l'envoi : toutes ses adresses doivent être publiques, et la requête
+vise l'adresse validée (en-tête Host et SNI conservés) pour qu'une seconde résolution ne puisse
+pas la rediriger vers le réseau interne (DNS rebinding).
+"""
+import ipaddress
+import socket
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
+
+from app.config import settings
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+
+def _is_public(address: IPAddress) -> bool:
+    return address.is_global and not address.is_multicast
+
+
+def _ip_literal(host: str) -> Optional[IPAddress]:
+    try:
+        return ipaddress.ip_address(host)
+    except ValueError:
+        return None
+
+
+def _host_allowed(host: str) -> bool:
+    allowed = settings.ANALYSIS_JOB_WEBHOOK_ALLOWED_HOSTS
+    return not allowed or any(host == domain or host.endswith(f".{domain}") for domain in allowed)
+
+
+def _checked_addresses(url: str, resolve: bool) -> List[IPAddress]:
+    """Applique la politique et retourne les adresses validées (vide sans résolution d'un nom d'hôte)."""
+    parts = urlsplit(url)
+    if parts.scheme != "https":
+        raise ValueError("L'URL du webhook doit utiliser https.")
+    host = (parts.hostname or "").rstrip(".").lower()
+    if not host:
+        raise ValueError("L'URL du webhook n'a pas d'hôte.")
+    if not _host_allowed(host):
+        raise ValueError(f"Hôte de webhook non autorisé : {host}")
+    if host == "localhost" or host.endswith(".localhost"):
+        raise ValueError(f"Hôte de webhook non public : {host}")
+
+    literal = _ip_literal(host)
+    if literal is not None:
+        if not _is_public(literal):
+            raise ValueError(f"Adresse de webhook non publique : {host}")
+        return [literal]
+    if not resolve:
+        return []
+    try:
+        infos = socket.getaddrinfo(host, parts.port or 443, proto=socket.IPPROTO_TCP)
+    except OSError as e:
+        raise ValueError(f"Hôte de webhook introuvable : {host} ({e})")
+    addresses = []
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        if not _is_public(address):
+            raise ValueError(f"L'hôte de webhook {host} résout vers une adresse non publique : {address}")
+        addresses.append(address)
+    if not addresses:
+        raise ValueError(f"Hôte de webhook introuvable : {host}")
+    return addresses
+
+
+def check_webhook_url(url: str, resolve: bool = False) -> str:
+    """
+    Retourne l'URL si elle est acceptable comme webhook, lève ValueError sinon.
+    Avec `resolve`, le nom d'hôte est résolu et chacune de ses adresses doit être publique.
+    """
+    _checked_addresses(url, resolve)
+    return url
+
+
+def resolve_webhook_address(url: str) -> IPAddress:
+    """Résout l'hôte du webhook, vérifie toutes ses adresses et retourne celle à laquelle se connecter."""
+    return _checked_addresses(url, resolve=True)[0]
+
+
+def pinned_webhook_request(url: str, address: IPAddress) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    """
+    URL visant directement `address`, avec l'en-tête Host et le nom SNI d'origine : le certificat
+    TLS reste vérifié pour le nom d'hôte, sans nouvelle résolution DNS.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    ip = f"[{address}]" if address.version == 6 else str(address)
+    port = f":{parts.port}" if parts.port else ""
+    pinned = urlunsplit(parts._replace(netloc=f"{ip}{port}"))
+    return pinned, {"Host": f"{host}{port}"}, {"sni_hostname": host}
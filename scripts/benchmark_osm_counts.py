@@ -0,0 +1,137 @@
+"""
+Banc d'essai du décompte OSM par rayon sur une charge urbaine synthétique.
+
+Compare la boucle Python élément par élément (haversine `math` + masque) aux décomptes
+cumulés vectorisés (`RadialCounts`) pour les trois rayons d'une analyse (direct, vigilance,
+risque potentiel) et pour une courbe d'exposition complète (pas de 25 m jusqu'à 5 km), sur
+des éléments bruts, compacts et au format colonnes (`OsmElements`, celui de `get_osm_data`),
+puis les décomptes Macro (5 et 10 km) sommés sur la pyramide de cellules H3 de l'index hors ligne.
+
+    python scripts/benchmark_osm_counts.py --elements 50000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.osm_features import (  # noqa: E402
+    OsmElements,
+    add_mask_to_counts,
+    compact_element,
+    element_mask,
+    element_position,
+    empty_osm_counts,
+)
+from app.services.osm_cells import OsmCellCounts  # noqa: E402
+from app.services.spatial_calculator import RadialCounts, haversine_distance  # noqa: E402
+
+ORIGIN = (12.6392, -8.0029)  # Bamako
+
+TAGS = [
+    {"building": "yes"},
+    {"building": "house"},
+    {"building": "residential"},
+    {"amenity": "school", "building": "yes"},
+    {"amenity": "clinic"},
+    {"amenity": "maternity", "building": "yes"},
+    {"amenity": "kindergarten"},
+    {"amenity": "marketplace"},
+    {"amenity": "drinking_water", "man_made": "water_well"},
+    {"highway": "primary"},
+]
+# Une charge urbaine est très majoritairement composée de bâtiments
+WEIGHTS = [60, 20, 10, 2, 1, 1, 1, 1, 2, 2]
+
+
+def synthetic_elements(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    elements = []
+    for index in range(count):
+        lat = ORIGIN[0] + rng.uniform(-0.045, 0.045)
+        lon = ORIGIN[1] + rng.uniform(-0.045, 0.045)
+        tags = rng.choices(TAGS, WEIGHTS)[0]
+        if index % 2:
+            elements.append({"type": "way", "id": index, "center": {"lat": lat, "lon": lon}, "tags": tags})
+        else:
+            elements.append({"type": "node", "id": index, "lat": lat, "lon": lon, "tags": tags})
+    return elements
+
+
+def loop_counts(elements, radius):
+    """Référence : un parcours complet des éléments par rayon (implémentation historique)."""
+    counts = empty_osm_counts()
+    for el in elements:
+        el_lat, el_lon = element_position(el)
+        if el_lat is None or el_lon is None:
+            continue
+        if haversine_distance(ORIGIN[0], ORIGIN[1], el_lat, el_lon) <= radius:
+            add_mask_to_counts(counts, element_mask(el))
+    return counts
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw = synthetic_elements(args.elements)
+    compact = [el for el in map(compact_element, raw) if el is not None]
+    analysis_radii = [150, 600, 1500]
+    curve_radii = [25 * step for step in range(1, 201)]
+
+    print(f"{args.elements} éléments synthétiques ({len(compact)} exploitables)")
+    for label, elements in (("brut", raw), ("compact", compact)):
+        payload = {"elements": elements}
+        loop_time, loop_result = best_of(args.repeat, lambda: [loop_counts(elements, r) for r in analysis_radii])
+        radial_time, radial_result = best_of(
+            args.repeat,
+            lambda: [radial.counts_within(r) for radial in [RadialCounts.from_osm(payload, *ORIGIN)] for r in analysis_radii],
+        )
+        assert loop_result == radial_result, "les décomptes vectorisés divergent de la référence"
+        print(f"[{label}] 3 rayons      boucle : {loop_time * 1000:8.1f} ms | vectorisé : {radial_time * 1000:7.1f} ms | x{loop_time / radial_time:.1f}")
+
+        radial = RadialCounts.from_osm(payload, *ORIGIN)
+        curve_time, _ = best_of(args.repeat, lambda: [radial.counts_within(r) for r in curve_radii])
+        loop_curve_estimate = loop_time / len(analysis_radii) * len(curve_radii)
+        print(f"[{label}] courbe 200 rayons (éléments triés) : {curve_time * 1000:.2f} ms (boucle estimée : {loop_curve_estimate:.1f} s)")
+
+    columns = {"elements": OsmElements.from_overpass(raw)}
+    reference = [loop_counts(compact, r) for r in analysis_radii]
+    columns_time, columns_result = best_of(
+        args.repeat,
+        lambda: [radial.counts_within(r) for radial in [RadialCounts.from_osm(columns, *ORIGIN)] for r in analysis_radii],
+    )
+    assert columns_result == reference, "les décomptes au format colonnes divergent de la référence"
+    print(f"[colonnes] 3 rayons (éléments déjà convertis à la réception) : {columns_time * 1000:.1f} ms")
+
+    macro_radii = [5000, 10000]
+    build_start = time.perf_counter()
+    cells = OsmCellCounts(columns["elements"])
+    build_time = time.perf_counter() - build_start
+    scan_time, scan_result = best_of(
+        args.repeat,
+        lambda: [RadialCounts.from_osm(columns, *ORIGIN).counts_within(r) for r in macro_radii],
+    )
+    cells_time, cells_result = best_of(args.repeat, lambda: [cells.counts_within(*ORIGIN, r) for r in macro_radii])
+    assert cells_result == scan_result, "les décomptes par cellules H3 divergent des éléments"
+    print(
+        f"[cellules H3] 5 et 10 km : {cells_time * 1000:.1f} ms (éléments : {scan_time * 1000:.1f} ms), "
+        f"pyramide construite en {build_time:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Construit l'index OSM hors ligne à partir d'un extrait régional (PBF ou GeoJSON).
+
+    python scripts/build_osm_index.py mali-latest.osm.pbf data/osm_index.npz
+    python scripts/build_osm_index.py bamako.geojson data/osm_index.npz --bbox 12.4 -8.2 12.8 -7.8
+
+Le fichier produit est chargé par le Moteur d'Impact via OSM_INDEX_PATH : `get_osm_data` répond
+alors localement pour toute zone couverte, sans appel Overpass. La lecture des PBF nécessite
+le paquet optionnel `osmium`.
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.osm_index import build_index  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Extrait OSM (.osm.pbf, .geojson ou .json)")
+    parser.add_argument("output", help="Fichier d'index à écrire (.npz)")
+    parser.add_argument(
+        "--bbox", nargs=4, type=float, metavar=("SUD", "OUEST", "NORD", "EST"),
+        help="Emprise couverte par l'extrait (par défaut : emprise des éléments classés)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    start = time.perf_counter()
+    index = build_index(args.source, bbox=tuple(args.bbox) if args.bbox else None)
+    index.save(args.output)
+    print(f"{len(index.elements)} éléments indexés (emprise {index.bbox}) en {time.perf_counter() - start:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
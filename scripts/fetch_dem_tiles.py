@@ -0,0 +1,68 @@
+"""
+Télécharge les tuiles d'altitude SRTM (.hgt) couvrant une emprise dans DEM_TILE_DIR.
+
+    python scripts/fetch_dem_tiles.py 10 -12 25 4 data/dem
+    python scripts/fetch_dem_tiles.py 12.4 -8.2 12.8 -7.8 data/dem --url "https://miroir.example/{lat_dir}/{name}.hgt.gz"
+
+Les tuiles (1° × 1°) sont décompressées sur disque : le Moteur d'Impact les projette en mémoire
+et calcule altitude et pente localement, sans appel Open-Meteo ni GEE. Les tuiles déjà présentes
+sont conservées ; une tuile introuvable (océan) est ignorée.
+"""
+import argparse
+import gzip
+import logging
+import math
+import os
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.services.dem_tiles import tile_name  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("south", type=float)
+    parser.add_argument("west", type=float)
+    parser.add_argument("north", type=float)
+    parser.add_argument("east", type=float)
+    parser.add_argument("output", help="Répertoire des tuiles (DEM_TILE_DIR)")
+    parser.add_argument("--url", default=settings.DEM_TILE_URL, help="Modèle d'URL des tuiles compressées")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    os.makedirs(args.output, exist_ok=True)
+
+    downloaded = skipped = missing = 0
+    for lat in range(math.floor(args.south), math.ceil(args.north)):
+        for lon in range(math.floor(args.west), math.ceil(args.east)):
+            name = tile_name(lat, lon)
+            path = os.path.join(args.output, f"{name}.hgt")
+            if os.path.exists(path):
+                skipped += 1
+                continue
+            url = args.url.format(lat_dir=name[:3], name=name)
+            try:
+                with urllib.request.urlopen(url, timeout=60) as response:
+                    data = gzip.decompress(response.read()) if url.endswith(".gz") else response.read()
+            except urllib.error.HTTPError as e:
+                if e.code != 404:
+                    raise
+                missing += 1
+                continue
+            # Écriture atomique : un worker ne voit jamais une tuile à moitié écrite
+            with open(path + ".tmp", "wb") as handle:
+                handle.write(data)
+            os.replace(path + ".tmp", path)
+            downloaded += 1
+            logging.info(f"Tuile {name} téléchargée")
+
+    logging.info(f"{downloaded} tuile(s) téléchargée(s), {skipped} déjà présente(s), {missing} introuvable(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Applique des fichiers de changements OSM (.osc / .osc.gz) à l'index OSM hors ligne.
+
+    python scripts/update_osm_index.py data/osm_index.npz 004/123/456.osc.gz 004/123/457.osc.gz
+
+Les fichiers sont appliqués dans l'ordre donné ; chacun incrémente la génération de l'index,
+ce qui invalide les caches construits sur les données précédentes. L'index est réécrit de façon
+atomique : les processus du Moteur d'Impact le rechargent à leur prochaine requête OSM.
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.osm_index import OsmSpatialIndex, parse_osc  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("index", help="Index à mettre à jour (.npz construit par build_osm_index.py)")
+    parser.add_argument("changes", nargs="+", help="Fichiers de changements OSM, dans l'ordre de publication")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    start = time.perf_counter()
+    index = OsmSpatialIndex.load(args.index)
+    for path in args.changes:
+        index, stats = index.apply_changes(parse_osc(path))
+        print(f"{path} : {stats} -> génération {index.generation}, {len(index.elements)} éléments")
+    index.save(args.index)
+    print(f"Index mis à jour en {time.perf_counter() - start:.1f}s -> {args.index}")
+
+
+if __name__ == "__main__":
+    main()
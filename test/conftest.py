@@ -0,0 +1,52 @@
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.impact_pipeline import exposure_cache, geocoding_cache
+from app.services.overpass_pool import overpass_pool
+from app.services.weather_service import weather_service
+
+
+@pytest.fixture(autouse=True)
+def clear_stage_caches():
+    # Les caches d'étapes survivent aux tests : chaque test doit voir ses propres mocks appelés
+    for cache in (geocoding_cache, exposure_cache, weather_service):
+        cache.clear()
+    yield
+    for cache in (geocoding_cache, exposure_cache, weather_service):
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_overpass_pool():
+    # Un miroir mis en quarantaine par un test ne doit pas changer l'ordre d'essai des suivants
+    overpass_pool.reset()
+    yield
+    overpass_pool.reset()
+
+
+@pytest.fixture
+def overpass_stream():
+    """Fabrique un remplaçant de `http_stream` renvoyant une réponse Overpass en petits morceaux."""
+    def factory(payload, chunk_size=7):
+        text = json.dumps(payload)
+        calls = []
+
+        @asynccontextmanager
+        async def fake_stream(method, url, **kwargs):
+            calls.append(kwargs)
+
+            async def aiter_text():
+                for start in range(0, len(text), chunk_size):
+                    yield text[start:start + chunk_size]
+
+            response = MagicMock()
+            response.aiter_text = aiter_text
+            yield response
+
+        fake_stream.calls = calls
+        return fake_stream
+
+    return factory
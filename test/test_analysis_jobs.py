@@ -0,0 +1,195 @@
+import asyncio
+import socket
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas import DeepSeekResponse
+from app.services.analysis_jobs import execute_job
+
+client = TestClient(app)
+
+AI_DATA = DeepSeekResponse(
+    macro_category="Déchets & Insalubrité",
+    sub_category="Accumulation d'ordures",
+    source_size_meters=8.0,
+    spread_vectors=[],
+    description="Tas d'ordures",
+)
+
+PAYLOAD = {
+    "image_url": "http://example.com/a.jpg",
+    "latitude": 12.6392,
+    "longitude": -8.0029,
+    "incident_id": "a",
+    "webhook_url": "https://client.example.com/hook",
+}
+
+
+class FakeStore:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl_seconds):
+        self.data[key] = value
+        return True
+
+
+def _resolved(address):
+    return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (address, 443))]
+
+
+def _patch_store(store):
+    return [
+        patch("app.services.analysis_jobs.cache_get", side_effect=store.get),
+        patch("app.services.analysis_jobs.cache_set", side_effect=store.set),
+    ]
+
+
+@patch("app.main.run_analysis_job")
+def test_job_is_queued_and_returned_immediately(mock_task):
+    store = FakeStore()
+    patches = _patch_store(store)
+    for p in patches:
+        p.start()
+    try:
+        response = client.post("/analyze/jobs", json=PAYLOAD)
+        job_id = response.json()["job_id"]
+        status = client.get(f"/analyze/jobs/{job_id}")
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+    mock_task.delay.assert_called_once_with(job_id)
+    assert status.status_code == 200
+    assert status.json()["incident_id"] == "a"
+
+
+@patch("app.services.analysis_jobs.cache_set", return_value=False)
+def test_submission_fails_cleanly_without_job_store(mock_set):
+    response = client.post("/analyze/jobs", json=PAYLOAD)
+
+    assert response.status_code == 503
+
+
+@patch("app.services.analysis_jobs.cache_get", return_value=None)
+def test_unknown_job_returns_404(mock_get):
+    response = client.get("/analyze/jobs/inconnu")
+
+    assert response.status_code == 404
+
+
+@patch("app.services.impact_pipeline.get_geocoding_context", new_callable=AsyncMock, return_value={"city": "Bamako", "region": "Bamako", "country": "Mali", "display_name": "Bamako"})
+@patch("app.services.impact_pipeline.get_weather_data", new_callable=AsyncMock, return_value={"temperature_celsius": 30.0, "precipitation": 0.0, "wind_speed": 5.0})
+@patch("app.services.impact_pipeline.get_satellite_analysis", return_value={"ndvi": None, "ndwi": None, "land_use": "Inconnu"})
+@patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value={"counts": {}, "elements": []})
+@patch("app.services.impact_pipeline.get_slope_data", new_callable=AsyncMock, return_value={"elevation": 350.0, "slope_percent": 1.0})
+@patch("app.services.impact_pipeline.analyze_image_with_gemini", new_callable=AsyncMock, return_value=AI_DATA)
+@patch("app.main.run_analysis_job")
+def test_worker_completes_job_and_calls_webhook(mock_task, mock_gemini, mock_slope, mock_osm, mock_sat, mock_weather, mock_geo):
+    store = FakeStore()
+    patches = _patch_store(store) + [
+        patch("app.services.analysis_jobs.http_request", new_callable=AsyncMock, return_value=MagicMock()),
+        patch("app.services.webhook_policy.socket.getaddrinfo", return_value=_resolved("93.184.216.34")),
+    ]
+    mocks = [p.start() for p in patches]
+    mock_webhook = mocks[2]
+    try:
+        job_id = client.post("/analyze/jobs", json=PAYLOAD).json()["job_id"]
+        final_status = asyncio.run(execute_job(job_id))
+        # Une seconde livraison du même message ne relance pas l'analyse
+        asyncio.run(execute_job(job_id))
+        status = client.get(f"/analyze/jobs/{job_id}").json()
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert final_status == "completed"
+    assert status["status"] == "completed"
+    assert status["result"]["ai_analysis"]["sub_category"] == "Accumulation d'ordures"
+    assert mock_gemini.call_count == 1
+    mock_webhook.assert_called_once()
+    # Envoi épinglé sur l'adresse validée, nom d'hôte d'origine conservé (Host et SNI)
+    assert mock_webhook.call_args.args[:2] == ("POST", "https://93.184.216.34/hook")
+    assert mock_webhook.call_args.kwargs["headers"] == {"Host": "client.example.com"}
+    assert mock_webhook.call_args.kwargs["extensions"] == {"sni_hostname": "client.example.com"}
+    assert mock_webhook.call_args.kwargs["json"]["status"] == "completed"
+
+
+@pytest.mark.parametrize("webhook_url", [
+    "http://client.example.com/hook",
+    "https://127.0.0.1/hook",
+    "https://10.0.0.5/hook",
+    "https://192.168.1.20:8443/hook",
+    "https://169.254.169.254/latest/meta-data",
+    "https://[::1]/hook",
+    "https://localhost/hook",
+    "pas une url",
+])
+@patch("app.main.run_analysis_job")
+def test_unsafe_webhook_urls_are_rejected(mock_task, webhook_url):
+    response = client.post("/analyze/jobs", json={**PAYLOAD, "webhook_url": webhook_url})
+
+    assert response.status_code == 422
+    mock_task.delay.assert_not_called()
+
+
+@patch("app.main.run_analysis_job")
+def test_webhook_host_must_match_the_allow_list(mock_task):
+    store = FakeStore()
+    with patch("app.services.webhook_policy.settings.ANALYSIS_JOB_WEBHOOK_ALLOWED_HOSTS", ("example.com",)), \
+            patch("app.services.analysis_jobs.cache_set", side_effect=store.set):
+        allowed = client.post("/analyze/jobs", json=PAYLOAD)
+        refused = client.post("/analyze/jobs", json={**PAYLOAD, "webhook_url": "https://attacker.net/hook"})
+
+    assert allowed.status_code == 202
+    assert refused.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_webhook_resolving_to_a_private_address_is_not_called():
+    from app.services.analysis_jobs import notify_webhook
+
+    job = {"job_id": "j", "status": "completed", "created_at": "", "updated_at": "", "request": {"webhook_url": PAYLOAD["webhook_url"]}}
+    with patch("app.services.webhook_policy.socket.getaddrinfo", return_value=_resolved("10.1.2.3")), \
+            patch("app.services.analysis_jobs.http_request", new_callable=AsyncMock) as webhook:
+        delivered = await notify_webhook(job)
+
+    assert delivered is False
+    webhook.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_webhook_is_sent_to_the_validated_address_without_a_second_lookup():
+    from app.services.analysis_jobs import notify_webhook
+
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        return httpx.Response(200)
+
+    job = {"job_id": "j", "status": "completed", "created_at": "", "updated_at": "",
+           "request": {"webhook_url": "https://client.example.com:8443/hook?token=1"}}
+    transport_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    # Seconde résolution (rebinding) vers une adresse interne : elle ne doit jamais être consultée
+    resolutions = [_resolved("2606:2800:220:1::1"), _resolved("10.1.2.3")]
+    with patch("app.services.webhook_policy.socket.getaddrinfo", side_effect=resolutions) as lookup, \
+            patch("app.services.http_client.get_http_client", return_value=transport_client):
+        delivered = await notify_webhook(job)
+    await transport_client.aclose()
+
+    assert delivered is True
+    assert lookup.call_count == 1
+    request = sent[0]
+    assert str(request.url) == "https://[2606:2800:220:1::1]:8443/hook?token=1"
+    assert request.headers["host"] == "client.example.com:8443"
+    assert request.extensions["sni_hostname"] == "client.example.com"
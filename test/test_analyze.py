@@ -0,0 +1,186 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas import DeepSeekResponse
+
+client = TestClient(app)
+
+AI_DATA = DeepSeekResponse(
+    macro_category="Déchets & Insalubrité",
+    sub_category="Accumulation d'ordures",
+    source_size_meters=8.0,
+    spread_vectors=[],
+    description="Tas d'ordures",
+)
+
+GEO_PATCHES = {
+    "app.services.impact_pipeline.get_geocoding_context": {"city": "Bamako", "region": "Bamako", "country": "Mali", "display_name": "Bamako"},
+    "app.services.impact_pipeline.get_weather_data": {"temperature_celsius": 30.0, "precipitation": 0.0, "wind_speed": 5.0},
+    "app.services.impact_pipeline.get_satellite_analysis": {"ndvi": None, "ndwi": None, "land_use": "Inconnu"},
+    "app.services.impact_pipeline.get_slope_data": {"elevation": 350.0, "slope_percent": 1.0},
+}
+
+
+def _patch_geo():
+    patches = [patch(target, new_callable=AsyncMock, return_value=value) for target, value in GEO_PATCHES.items()]
+    # GEE reste synchrone (exécuté dans le pool de threads)
+    patches[2] = patch("app.services.impact_pipeline.get_satellite_analysis", return_value=GEO_PATCHES["app.services.impact_pipeline.get_satellite_analysis"])
+    return patches
+
+
+def test_geo_context_is_collected_while_vision_runs():
+    osm_started = asyncio.Event()
+
+    async def fake_osm(lat, lon, radius):
+        osm_started.set()
+        return {"counts": {"residential_buildings": 0}, "elements": []}
+
+    async def fake_vision(image_url):
+        # Ne rend la main que si la collecte OSM a démarré pendant l'appel vision
+        await asyncio.wait_for(osm_started.wait(), timeout=5)
+        return AI_DATA
+
+    patches = _patch_geo() + [
+        patch("app.services.impact_pipeline.get_osm_data", side_effect=fake_osm),
+        patch("app.services.impact_pipeline.analyze_image_with_gemini", side_effect=fake_vision),
+    ]
+    for p in patches:
+        p.start()
+    try:
+        response = client.post(
+            "/analyze",
+            json={"image_url": "http://example.com/a.jpg", "latitude": 12.6392, "longitude": -8.0029, "incident_id": "a"},
+        )
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ai_analysis"]["sub_category"] == "Accumulation d'ordures"
+    assert body["is_degraded"] is False
+
+
+def test_upload_retry_is_served_from_result_cache():
+    stored = {}
+
+    def fake_get(key, incident_id=None):
+        result = stored.get(key)
+        return result.model_copy(update={"incident_id": incident_id}) if result else None
+
+    def fake_store(key, result):
+        stored[key] = result
+        return True
+
+    patches = _patch_geo() + [
+        patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value={"counts": {"residential_buildings": 0}, "elements": []}),
+        patch("app.services.impact_pipeline.analyze_image_bytes_with_gemini", new_callable=AsyncMock, return_value=AI_DATA),
+        patch("app.main.get_cached_result", side_effect=fake_get),
+        patch("app.main.store_result", side_effect=fake_store),
+    ]
+    mocks = [p.start() for p in patches]
+    mock_gemini = mocks[5]
+    try:
+        form = {"latitude": "12.6392", "longitude": "-8.0029", "incident_id": "a"}
+        files = {"image": ("photo.jpg", b"same-image", "image/jpeg")}
+        first = client.post("/analyze/upload", data=form, files=files)
+        retry = client.post("/analyze/upload", data={**form, "incident_id": "b"}, files=files)
+        forced = client.post("/analyze/upload", data={**form, "bypass_cache": "true"}, files=files)
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert first.headers["X-Result-Cache"] == "MISS"
+    assert retry.headers["X-Result-Cache"] == "HIT"
+    assert retry.json()["incident_id"] == "b"
+    assert forced.headers["X-Result-Cache"] == "BYPASS"
+    assert mock_gemini.call_count == 2
+
+
+def test_adaptive_osm_mode_fetches_elements_only_up_to_the_needed_radius():
+    macro = {"counts": {"residential_buildings": 250}, "elements": [], "detail": False}
+    detail = {
+        "counts": {"residential_buildings": 1},
+        "elements": [{"type": "way", "id": 1, "center": {"lat": 12.6393, "lon": -8.0029}, "tags": {"building": "yes"}}],
+    }
+    patches = _patch_geo() + [
+        patch("app.services.impact_pipeline.settings.OSM_FETCH_MODE", "adaptive"),
+        patch("app.services.impact_pipeline.get_osm_macro_counts", new_callable=AsyncMock, return_value=macro),
+        patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value=detail),
+        patch("app.services.impact_pipeline.analyze_image_with_gemini", new_callable=AsyncMock, return_value=AI_DATA),
+    ]
+    mocks = [p.start() for p in patches]
+    try:
+        response = client.post(
+            "/analyze",
+            json={"image_url": "http://example.com/a.jpg", "latitude": 12.6392, "longitude": -8.0029, "incident_id": "a"},
+        )
+    finally:
+        for p in patches:
+            p.stop()
+    mock_counts, mock_detail = mocks[5], mocks[6]
+
+    assert response.status_code == 200
+    body = response.json()
+    mock_counts.assert_awaited_once_with(12.6392, -8.0029, 5000)
+    detail_radius = mock_detail.await_args.args[2]
+    assert body["impact_radius_meters"] <= detail_radius < 5000
+    assert body["social_data"]["residential_buildings"] == 1
+
+
+def test_unreachable_overpass_is_reported_as_degraded():
+    from app.services.spatial_calculator import unavailable_osm_data
+
+    patches = _patch_geo() + [
+        patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value=unavailable_osm_data()),
+        patch("app.services.impact_pipeline.analyze_image_with_gemini", new_callable=AsyncMock, return_value=AI_DATA),
+    ]
+    for p in patches:
+        p.start()
+    try:
+        response = client.post(
+            "/analyze",
+            json={"image_url": "http://example.com/a.jpg", "latitude": 12.6392, "longitude": -8.0029, "incident_id": "a"},
+        )
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert response.status_code == 200
+    body = response.json()
+    # Des décomptes nuls faute de réponse Overpass ne passent pas pour une zone vide
+    assert body["is_degraded"] is True
+    assert "osm" in body["degraded_providers"]
+
+
+def test_provider_error_fallbacks_are_reported_as_degraded():
+    from app.services.spatial_calculator import DEFAULT_GEOCODING, DEFAULT_WEATHER, degraded_value
+
+    patches = [
+        patch("app.services.impact_pipeline.get_slope_data", new_callable=AsyncMock, return_value={"elevation": 350.0, "slope_percent": 1.0}),
+        patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value={"counts": {"residential_buildings": 0}, "elements": []}),
+        patch("app.services.impact_pipeline.get_weather_data", new_callable=AsyncMock, return_value=degraded_value(DEFAULT_WEATHER)),
+        patch("app.services.impact_pipeline.get_geocoding_context", new_callable=AsyncMock, return_value=degraded_value(DEFAULT_GEOCODING)),
+        patch("app.services.impact_pipeline.get_satellite_analysis", side_effect=RuntimeError("GEE")),
+        patch("app.services.impact_pipeline.analyze_image_with_gemini", new_callable=AsyncMock, return_value=AI_DATA),
+    ]
+    for p in patches:
+        p.start()
+    try:
+        response = client.post(
+            "/analyze",
+            json={"image_url": "http://example.com/a.jpg", "latitude": 12.6392, "longitude": -8.0029, "incident_id": "a"},
+        )
+    finally:
+        for p in patches:
+            p.stop()
+
+    assert response.status_code == 200
+    body = response.json()
+    # Une erreur fournisseur (repli marqué ou exception) compte comme un dépassement de délai
+    assert body["is_degraded"] is True
+    assert set(body["degraded_providers"]) == {"weather", "geocoding", "satellite"}
+    assert body["geocoding"] == DEFAULT_GEOCODING
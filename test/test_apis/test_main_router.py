@@ -34,7 +34,7 @@ def test_construct_image_url():
     assert construct_image_url(another_mock_path) == expected_url_2
 
 @pytest.mark.asyncio
-@patch('app.apis.main_router.requests.get')
+@patch('app.apis.main_router.http_request', new_callable=AsyncMock)
 async def test_fetch_image_success(mock_get):
     # Import the function here to avoid circular imports
     from app.apis.main_router import fetch_image
@@ -46,17 +46,17 @@ async def test_fetch_image_success(mock_get):
 
     result = await fetch_image("http://example.com/image.jpg")
     assert result == b"image_content"
-    mock_get.assert_called_once_with("http://example.com/image.jpg")
+    mock_get.assert_called_once_with("GET", "http://example.com/image.jpg")
 
 @pytest.mark.asyncio
-@patch('app.apis.main_router.requests.get')
+@patch('app.apis.main_router.http_request', new_callable=AsyncMock)
 @patch('app.apis.main_router.logger')
 async def test_fetch_image_failure(mock_logger, mock_get):
     # Import the function here to avoid circular imports
     from app.apis.main_router import fetch_image
-    import requests
+    import httpx
     
-    mock_get.side_effect = requests.RequestException("Network error")
+    mock_get.side_effect = httpx.ConnectError("Network error")
 
     with pytest.raises(HTTPException) as exc_info:
         await fetch_image("http://example.com/image.jpg")
@@ -0,0 +1,162 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app, _cluster_batch_requests, _cluster_geometry, MACRO_OSM_RADIUS
+from app.schemas import AnalyzeRequest, DeepSeekResponse
+from app.services.metrics import ANALYSES_IN_PROGRESS
+
+client = TestClient(app)
+
+AI_DATA = DeepSeekResponse(
+    macro_category="Déchets & Insalubrité",
+    sub_category="Accumulation d'ordures",
+    source_size_meters=8.0,
+    spread_vectors=[],
+    description="Tas d'ordures",
+)
+
+OSM_DATA = {
+    "counts": {"residential_buildings": 1},
+    "elements": [{"type": "way", "id": 1, "center": {"lat": 12.6392, "lon": -8.0029}, "tags": {"building": "yes"}}],
+}
+
+
+def _request(lat, lon, incident_id):
+    return {"image_url": f"http://example.com/{incident_id}.jpg", "latitude": lat, "longitude": lon, "incident_id": incident_id}
+
+
+def test_nearby_incidents_are_clustered_together():
+    requests = [
+        AnalyzeRequest(**_request(12.6392, -8.0029, "a")),
+        AnalyzeRequest(**_request(12.6395, -8.0021, "b")),
+        AnalyzeRequest(**_request(14.4936, -4.1897, "c")),
+    ]
+
+    clusters = _cluster_batch_requests(requests)
+
+    assert sorted(clusters) == [[0, 1], [2]]
+
+
+def test_cluster_geometry_covers_every_member_macro_scan():
+    center_lat, center_lon, radius = _cluster_geometry([(12.6392, -8.0029), (12.6392, -8.0011)])
+
+    assert center_lat == 12.6392
+    assert center_lon == (-8.0029 - 8.0011) / 2
+    assert radius > MACRO_OSM_RADIUS
+
+
+@patch("app.main.weather_service")
+@patch("app.services.impact_pipeline.get_geocoding_context", new_callable=AsyncMock, return_value={"city": "Bamako", "region": "Bamako", "country": "Mali", "display_name": "Bamako"})
+@patch("app.services.impact_pipeline.get_weather_data", new_callable=AsyncMock, return_value={"temperature_celsius": 30.0, "precipitation": 0.0, "wind_speed": 5.0})
+@patch("app.services.impact_pipeline.get_satellite_analysis", return_value={"ndvi": None, "ndwi": None, "land_use": "Inconnu"})
+@patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value=OSM_DATA)
+@patch("app.services.impact_pipeline.get_slope_data", new_callable=AsyncMock, return_value={"elevation": 350.0, "slope_percent": 1.0})
+@patch("app.services.impact_pipeline.analyze_image_with_gemini", new_callable=AsyncMock, return_value=AI_DATA)
+def test_batch_streams_ndjson_and_shares_context(mock_gemini, mock_slope, mock_osm, mock_sat, mock_weather, mock_geo, mock_weather_service):
+    payload = [
+        _request(12.6392, -8.0029, "a"),
+        _request(12.6395, -8.0021, "b"),
+        _request(14.4936, -4.1897, "c"),
+    ]
+
+    response = client.post("/analyze/batch", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    assert all(line["status"] == "ok" for line in lines)
+    assert mock_gemini.call_count == 3
+    # Deux groupes d'incidents voisins : un seul appel par fournisseur et par groupe
+    assert mock_osm.call_count == 2
+    assert mock_weather.call_count == 2
+    assert mock_geo.call_count == 2
+    # Météo des deux groupes préchargée en une seule requête groupée
+    (prefetched,), _ = mock_weather_service.prefetch.call_args
+    assert len(list(prefetched)) == 2
+
+
+@patch("app.main.weather_service")
+@patch("app.services.impact_pipeline.get_geocoding_context", new_callable=AsyncMock, return_value={"city": "Bamako", "region": "Bamako", "country": "Mali", "display_name": "Bamako"})
+@patch("app.services.impact_pipeline.get_weather_data", new_callable=AsyncMock, return_value={"temperature_celsius": 30.0, "precipitation": 0.0, "wind_speed": 5.0})
+@patch("app.services.impact_pipeline.get_satellite_analysis", return_value={"ndvi": None, "ndwi": None, "land_use": "Inconnu"})
+@patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value=OSM_DATA)
+@patch("app.services.impact_pipeline.get_slope_data", new_callable=AsyncMock, return_value={"elevation": 350.0, "slope_percent": 1.0})
+def test_queued_items_do_not_spend_their_budget_waiting(*mocks):
+    async def classify(image_url):
+        # Le premier incident est lent (mais dans son délai), les suivants attendent leur tour
+        await asyncio.sleep(0.5 if image_url.endswith("/a.jpg") else 0.3)
+        return AI_DATA
+
+    payload = [_request(12.6392, -8.0029, incident_id) for incident_id in ("a", "b", "c")]
+    with patch("app.services.impact_pipeline.analyze_image_with_gemini", side_effect=classify), \
+            patch("app.main.settings.BATCH_MAX_CONCURRENCY", 1), \
+            patch("app.services.deadline.settings.ANALYSIS_DEADLINE_SECONDS", 1.0), \
+            patch("app.services.deadline.provider_latency.suggested_timeout", return_value=None):
+        response = client.post("/analyze/batch", json=payload)
+
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    assert all(line["status"] == "ok" for line in lines)
+    assert [line["result"]["degraded_providers"] for line in sorted(lines, key=lambda line: line["index"])] == [[], [], []]
+
+
+@patch("app.main.weather_service")
+@patch("app.services.impact_pipeline.get_geocoding_context", new_callable=AsyncMock, return_value={"city": "Bamako", "region": "Bamako", "country": "Mali", "display_name": "Bamako"})
+@patch("app.services.impact_pipeline.get_weather_data", new_callable=AsyncMock, return_value={"temperature_celsius": 30.0, "precipitation": 0.0, "wind_speed": 5.0})
+@patch("app.services.impact_pipeline.get_satellite_analysis", return_value={"ndvi": None, "ndwi": None, "land_use": "Inconnu"})
+@patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value=OSM_DATA)
+@patch("app.services.impact_pipeline.get_slope_data", new_callable=AsyncMock, return_value={"elevation": 350.0, "slope_percent": 1.0})
+def test_queued_items_are_not_counted_in_progress(*mocks):
+    in_progress = []
+
+    async def classify(image_url):
+        in_progress.append(ANALYSES_IN_PROGRESS.labels("batch")._value.get())
+        await asyncio.sleep(0.05)
+        return AI_DATA
+
+    payload = [_request(12.6392, -8.0029, incident_id) for incident_id in ("a", "b", "c")]
+    with patch("app.services.impact_pipeline.analyze_image_with_gemini", side_effect=classify), \
+            patch("app.main.settings.BATCH_MAX_CONCURRENCY", 1):
+        response = client.post("/analyze/batch", json=payload)
+
+    assert all(json.loads(line)["status"] == "ok" for line in response.text.splitlines() if line)
+    # Un seul créneau : les incidents encore en file n'apparaissent pas dans la jauge
+    assert in_progress[0] == 1
+    assert all(count <= position + 1 for position, count in enumerate(in_progress))
+    assert ANALYSES_IN_PROGRESS.labels("batch")._value.get() == 0
+
+
+@patch("app.main.weather_service")
+@patch("app.services.impact_pipeline.get_geocoding_context", new_callable=AsyncMock, return_value={"city": "Centre", "region": "Bamako", "country": "Mali", "display_name": "Centre"})
+@patch("app.services.impact_pipeline.get_weather_data", new_callable=AsyncMock, return_value={"temperature_celsius": 30.0, "precipitation": 0.0, "wind_speed": 5.0})
+@patch("app.services.impact_pipeline.get_satellite_analysis", return_value={"ndvi": None, "ndwi": None, "land_use": "Inconnu"})
+@patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value=OSM_DATA)
+@patch("app.services.impact_pipeline.get_slope_data", new_callable=AsyncMock, return_value={"elevation": 350.0, "slope_percent": 1.0})
+@patch("app.services.impact_pipeline.analyze_image_with_gemini", new_callable=AsyncMock, return_value=AI_DATA)
+def test_batch_geocodes_every_item_in_one_offline_lookup(*mocks):
+    local = {"city": "Bamako", "region": "Bamako", "country": "Mali", "display_name": "Bamako, Commune III, Mali"}
+    payload = [
+        _request(12.6392, -8.0029, "a"),
+        _request(12.6395, -8.0021, "b"),
+        _request(14.4936, -4.1897, "c"),
+    ]
+
+    # Seul le troisième incident est hors de l'emprise des limites administratives locales
+    with patch("app.main.reverse_geocode_many", return_value=[local, local, None]) as bulk:
+        response = client.post("/analyze/batch", json=payload)
+
+    bulk.assert_called_once_with([(12.6392, -8.0029), (12.6395, -8.0021), (14.4936, -4.1897)])
+    results = {line["index"]: line["result"] for line in map(json.loads, response.text.splitlines())}
+    assert results[0]["geocoding"] == local
+    assert results[1]["geocoding"] == local
+    # Point non résolu hors ligne : contexte administratif du groupe
+    assert results[2]["geocoding"]["city"] == "Centre"
+
+
+def test_batch_rejects_empty_payload():
+    response = client.post("/analyze/batch", json=[])
+
+    assert response.status_code == 422
@@ -0,0 +1,51 @@
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+OSM_DATA = {
+    "counts": {"residential_buildings": 3},
+    "elements": [
+        {"type": "way", "id": 1, "center": {"lat": 12.6393, "lon": -8.0029}, "tags": {"building": "yes"}},
+        {"type": "way", "id": 2, "center": {"lat": 12.6398, "lon": -8.0029}, "tags": {"building": "house"}},
+        {"type": "node", "id": 3, "lat": 12.6420, "lon": -8.0029, "tags": {"amenity": "school"}},
+        {"type": "way", "id": 4, "center": {"lat": 12.6500, "lon": -8.0029}, "tags": {"building": "yes"}},
+    ],
+}
+
+
+@patch("app.services.impact_pipeline.get_satellite_analysis", return_value={"ndvi": None, "ndwi": None, "land_use": "Inconnu"})
+@patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value=OSM_DATA)
+def test_exposure_curve_grows_with_radius_and_reuses_cached_elements(mock_osm, mock_sat):
+    payload = {"latitude": 12.6392, "longitude": -8.0029, "step_meters": 25, "max_radius_meters": 1500}
+
+    response = client.post("/analyze/exposure", json=payload)
+
+    assert response.status_code == 200
+    points = response.json()["points"]
+    assert len(points) == 60
+    assert points[0]["radius_meters"] == 25
+    assert points[-1]["radius_meters"] == 1500
+    assert points[0]["social_data"]["residential_buildings"] == 1
+    assert points[3]["social_data"]["residential_buildings"] == 2
+    assert points[-1]["social_data"]["residential_buildings"] == 3
+    assert points[-1]["social_data"]["schools"] == 1
+    populations = [point["human_impact"]["total_population_exposed"] for point in points]
+    assert populations == sorted(populations)
+
+    # Déplacement du curseur : la courbe est recalculée sans nouvel appel aux fournisseurs
+    response = client.post("/analyze/exposure", json={**payload, "step_meters": 100})
+
+    assert response.status_code == 200
+    assert len(response.json()["points"]) == 15
+    assert mock_osm.call_count == 1
+    assert mock_sat.call_count == 1
+
+
+def test_exposure_curve_rejects_radius_beyond_macro_scan():
+    response = client.post("/analyze/exposure", json={"latitude": 12.6392, "longitude": -8.0029, "max_radius_meters": 20000})
+
+    assert response.status_code == 422
@@ -0,0 +1,46 @@
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas import DeepSeekResponse
+from app.services.metrics import provider_for_url
+
+client = TestClient(app)
+
+AI_DATA = DeepSeekResponse(
+    macro_category="Déchets & Insalubrité",
+    sub_category="Accumulation d'ordures",
+    source_size_meters=8.0,
+    spread_vectors=[],
+    description="Tas d'ordures",
+)
+
+
+def test_provider_for_url_maps_known_hosts():
+    assert provider_for_url("http://overpass-api.de/api/interpreter") == "overpass"
+    assert provider_for_url("https://api.open-meteo.com/v1/forecast?latitude=1") == "open_meteo"
+    assert provider_for_url("https://nominatim.openstreetmap.org/reverse") == "nominatim"
+    assert provider_for_url("https://abcd.supabase.co/storage/v1/object/images/x.png") == "supabase"
+    assert provider_for_url("https://example.com/image.jpg") == "other"
+
+
+@patch("app.services.impact_pipeline.get_geocoding_context", new_callable=AsyncMock, return_value={"city": "Bamako", "region": "Bamako", "country": "Mali", "display_name": "Bamako"})
+@patch("app.services.impact_pipeline.get_weather_data", new_callable=AsyncMock, return_value={"temperature_celsius": 30.0, "precipitation": 0.0, "wind_speed": 5.0})
+@patch("app.services.impact_pipeline.get_satellite_analysis", return_value={"ndvi": None, "ndwi": None, "land_use": "Inconnu"})
+@patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value={"counts": {}, "elements": []})
+@patch("app.services.impact_pipeline.get_slope_data", new_callable=AsyncMock, return_value={"elevation": 350.0, "slope_percent": 1.0})
+@patch("app.services.impact_pipeline.analyze_image_with_gemini", new_callable=AsyncMock, return_value=AI_DATA)
+def test_metrics_endpoint_exposes_phase_histograms(mock_gemini, mock_slope, mock_osm, mock_sat, mock_weather, mock_geo):
+    response = client.post("/analyze", json={"image_url": "http://example.com/a.jpg", "latitude": 12.6392, "longitude": -8.0029})
+    assert response.status_code == 200
+
+    metrics = client.get("/metrics")
+
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    body = metrics.text
+    for phase in ("classification", "osm", "weather", "radius", "direct_impact", "global_score", "response"):
+        assert f'impact_phase_duration_seconds_count{{phase="{phase}"}}' in body
+    assert 'impact_analyses_total{endpoint="analyze",outcome="success"}' in body
+    assert 'impact_analyses_in_progress{endpoint="analyze"} 0.0' in body
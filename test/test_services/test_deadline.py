@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.services.deadline import AnalysisDeadline, LatencyTracker
+
+
+def test_latency_tracker_needs_enough_samples():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.observe("weather", 0.5)
+    tracker.observe("weather", 0.5)
+
+    assert tracker.suggested_timeout("weather") is None
+
+    tracker.observe("weather", 0.5)
+    assert tracker.suggested_timeout("weather") == pytest.approx(0.5 + 4 * 0.25 * 0.8 ** 2)
+
+
+def test_provider_timeout_is_capped_by_share_and_remaining_budget():
+    deadline = AnalysisDeadline(budget_seconds=10)
+
+    assert deadline.provider_timeout("weather") <= 10 * 0.2
+    assert deadline.provider_timeout("unknown-provider") <= 10
+
+
+@pytest.mark.asyncio
+async def test_run_returns_default_and_flags_slow_provider():
+    deadline = AnalysisDeadline(budget_seconds=0.05)
+
+    async def slow():
+        await asyncio.sleep(1)
+        return "late"
+
+    result = await deadline.run("osm", slow(), lambda: "default")
+
+    assert result == "default"
+    assert deadline.degraded == ["osm"]
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result_within_budget():
+    deadline = AnalysisDeadline(budget_seconds=5)
+
+    async def fast():
+        return "ok"
+
+    assert await deadline.run("weather", fast(), lambda: "default") == "ok"
+    assert deadline.degraded == []
+
+
+@pytest.mark.asyncio
+async def test_run_returns_default_and_flags_failing_provider():
+    deadline = AnalysisDeadline(budget_seconds=5)
+
+    async def failing():
+        raise ConnectionError("refused")
+
+    assert await deadline.run("satellite", failing(), lambda: "default") == "default"
+    assert deadline.degraded == ["satellite"]
@@ -0,0 +1,100 @@
+import math
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services.dem_tiles import HGT_VOID, METERS_PER_DEGREE, DemTileStore, tile_name
+
+SIZE = 1201
+STEP_METERS = METERS_PER_DEGREE / (SIZE - 1)
+
+
+def _write_tile(directory, name, elevations):
+    elevations.astype(">i2").tofile(directory / f"{name}.hgt")
+
+
+def _north_facing_plane():
+    """Plan montant de 1 m par pixel vers le nord, 300 m au bord sud (ligne 0 = bord nord)."""
+    rows = np.arange(SIZE)[:, None]
+    return np.broadcast_to(300 + (SIZE - 1 - rows), (SIZE, SIZE)).copy()
+
+
+def test_tile_name_follows_srtm_convention():
+    assert tile_name(12, -9) == "N12W009"
+    assert tile_name(-1, 105) == "S01E105"
+
+
+def test_terrain_gives_elevation_and_slope_of_a_plane(tmp_path):
+    _write_tile(tmp_path, "N12W009", _north_facing_plane())
+    store = DemTileStore(str(tmp_path))
+
+    terrain = store.terrain(12.5, -8.5)
+
+    assert terrain["elevation"] == pytest.approx(300 + (SIZE - 1) / 2, abs=0.5)
+    assert terrain["slope_percent"] == pytest.approx(100 / STEP_METERS, rel=1e-3)
+
+
+def test_east_west_slope_accounts_for_latitude(tmp_path):
+    cols = np.arange(SIZE)[None, :]
+    _write_tile(tmp_path, "N60E010", np.broadcast_to(500 + cols, (SIZE, SIZE)).copy())
+    store = DemTileStore(str(tmp_path))
+
+    terrain = store.terrain(60.5, 10.5)
+
+    # Un pixel est deux fois plus étroit à 60° de latitude : la pente double
+    assert terrain["slope_percent"] == pytest.approx(100 / (STEP_METERS * math.cos(math.radians(60.5))), rel=1e-3)
+
+
+def test_missing_tile_or_voids_fall_back_to_remote_providers(tmp_path):
+    _write_tile(tmp_path, "N12W009", np.full((SIZE, SIZE), HGT_VOID))
+    store = DemTileStore(str(tmp_path))
+
+    assert store.terrain(12.5, -8.5) is None
+    assert store.terrain(40.0, 2.0) is None
+
+
+def test_open_tiles_are_bounded(tmp_path):
+    for lat in range(3):
+        _write_tile(tmp_path, tile_name(lat, 0), _north_facing_plane())
+    store = DemTileStore(str(tmp_path), max_open_tiles=2)
+
+    for lat in range(3):
+        assert store.terrain(lat + 0.5, 0.5) is not None
+
+    assert list(store._tiles) == [(1, 0), (2, 0)]
+
+
+@pytest.mark.asyncio
+async def test_slope_stage_uses_local_tiles_without_network(tmp_path):
+    from app.services.deadline import AnalysisDeadline
+    from app.services.impact_pipeline import _slope_stage
+
+    _write_tile(tmp_path, "N12W009", _north_facing_plane())
+    with patch("app.services.dem_tiles.settings.DEM_TILE_DIR", str(tmp_path)), \
+            patch("app.services.impact_pipeline.get_slope_data") as remote:
+        terrain = await _slope_stage(12.5, -8.5, AnalysisDeadline(10))
+
+    remote.assert_not_called()
+    assert terrain["elevation"] > 0
+    assert terrain["slope_percent"] > 0
+
+
+@pytest.mark.asyncio
+async def test_remote_fallback_returns_elevation_and_slope_in_percent():
+    from app.services.deadline import AnalysisDeadline
+    from app.services.impact_pipeline import _slope_stage
+
+    response = MagicMock()
+    response.json.return_value = {"elevation": [350.0]}
+    ee = MagicMock()
+    # ee.Terrain.slope renvoie des degrés : 45° = 100 %
+    ee.Terrain.slope.return_value.reduceRegion.return_value.get.return_value.getInfo.return_value = 45.0
+
+    with patch("app.services.spatial_calculator.http_request", AsyncMock(return_value=response)), \
+            patch("app.services.spatial_calculator.GEE_INITIALIZED", True), \
+            patch("app.services.spatial_calculator.ee", ee):
+        terrain = await _slope_stage(48.85, 2.35, AnalysisDeadline(10))
+
+    assert terrain["elevation"] == 350.0
+    assert terrain["slope_percent"] == pytest.approx(100.0)
@@ -0,0 +1,34 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.http_client import close_http_client, http_request
+
+NOMINATIM = "https://nominatim.openstreetmap.org/reverse?lat=12.6&lon=-8.0&format=json"
+
+
+@pytest.mark.asyncio
+async def test_nominatim_requests_are_spaced_by_the_minimum_interval():
+    loop = asyncio.get_running_loop()
+    sent = {}
+
+    async def request(method, url, **kwargs):
+        sent.setdefault(url.split("/")[2], []).append(loop.time())
+        return MagicMock()
+
+    client = MagicMock()
+    client.request.side_effect = request
+    with patch("app.services.http_client.get_http_client", return_value=client), \
+            patch.dict("app.services.http_client.settings.HTTP_PER_HOST_MIN_INTERVALS", {"nominatim.openstreetmap.org": 0.1}):
+        await asyncio.gather(
+            *(http_request("GET", NOMINATIM) for _ in range(3)),
+            *(http_request("GET", "https://api.open-meteo.com/v1/forecast") for _ in range(3)),
+        )
+        await close_http_client()
+
+    nominatim = sent["nominatim.openstreetmap.org"]
+    assert [later - earlier >= 0.095 for earlier, later in zip(nominatim, nominatim[1:])] == [True, True]
+    # Les autres hôtes ne sont pas espacés
+    open_meteo = sent["api.open-meteo.com"]
+    assert open_meteo[-1] - open_meteo[0] < 0.05
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from app.services.geodesy import haversine_distances
+from app.services.osm_cells import OsmCellCounts
+from app.services.osm_features import OSM_COUNT_KEYS, OsmElements, rule_hits
+
+ORIGIN = (12.6392, -8.0029)
+
+
+@pytest.fixture(scope="module")
+def elements():
+    rng = np.random.default_rng(7)
+    count = 20000
+    return OsmElements(
+        np.arange(count),
+        ORIGIN[0] + rng.uniform(-0.12, 0.12, count),
+        ORIGIN[1] + rng.uniform(-0.12, 0.12, count),
+        rng.choice([1, 2, 4, 8, 16, 32, 64, 128, 256, 384], count),
+    )
+
+
+def _exact_counts(elements, lat, lon, radius):
+    near = haversine_distances(lat, lon, elements.lats.astype(np.float64), elements.lons.astype(np.float64)) <= radius
+    return dict(zip(OSM_COUNT_KEYS, rule_hits(elements.masks)[near].sum(axis=0).tolist()))
+
+
+@pytest.mark.parametrize("radius", [0, 150, 900, 2500, 5000, 10000])
+def test_cell_pyramid_counts_match_element_scan(elements, radius):
+    cells = OsmCellCounts(elements, resolutions=(7, 9))
+
+    for lat, lon in [ORIGIN, (12.6551, -7.9802), (12.6120, -8.0317)]:
+        assert cells.counts_within(lat, lon, radius) == _exact_counts(elements, lat, lon, radius)
+
+
+def test_cell_pyramid_aggregates_each_resolution(elements):
+    cells = OsmCellCounts(elements, resolutions=(9, 7, 8))
+
+    assert cells.resolutions == [7, 8, 9]
+    assert cells.cell_count(7) < cells.cell_count(8) < cells.cell_count(9)
+    assert cells.counts_within(*ORIGIN, 5000) == _exact_counts(elements, *ORIGIN, 5000)
@@ -0,0 +1,252 @@
+import json
+import os
+import threading
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.osm_features import MATERNITY, SCHOOL, BUILDING
+from app.services.osm_index import (
+    NODE,
+    WAY,
+    OsmSpatialIndex,
+    build_index,
+    elements_from_geojson,
+    get_osm_index,
+    osm_data_version,
+    parse_osc,
+    reset_osm_index,
+    wait_for_osm_index_reload,
+)
+from app.services.spatial_calculator import filter_osm_by_radius, get_osm_data
+
+FEATURES = [
+    {"type": "Feature", "id": "node/1", "geometry": {"type": "Point", "coordinates": [-8.0029, 12.6392]}, "properties": {"amenity": "maternity"}},
+    {
+        "type": "Feature",
+        "id": "way/2",
+        "geometry": {"type": "Polygon", "coordinates": [[[-8.0040, 12.6400], [-8.0030, 12.6400], [-8.0030, 12.6410], [-8.0040, 12.6410], [-8.0040, 12.6400]]]},
+        "properties": {"tags": {"amenity": "school", "building": "yes"}},
+    },
+    {"type": "Feature", "id": "node/3", "geometry": {"type": "Point", "coordinates": [-8.0500, 12.7000]}, "properties": {"building": "house"}},
+    {"type": "Feature", "id": "node/4", "geometry": {"type": "Point", "coordinates": [-8.0029, 12.6393]}, "properties": {"shop": "bakery"}},
+]
+
+
+@pytest.fixture(autouse=True)
+def forget_loaded_index():
+    reset_osm_index()
+    yield
+    reset_osm_index()
+
+
+def test_geojson_features_are_classified_and_centered():
+    elements, kinds = elements_from_geojson(FEATURES)
+
+    assert elements.ids.tolist() == [1, 2, 3]
+    assert kinds.tolist() == [NODE, WAY, NODE]
+    assert elements.masks.tolist() == [MATERNITY, SCHOOL | BUILDING, BUILDING]
+    # Centre de l'emprise du way, comme "out center" d'Overpass
+    assert elements.lats[1] == pytest.approx(12.6405, abs=1e-6)
+    assert elements.lons[1] == pytest.approx(-8.0035, abs=1e-6)
+
+
+def test_index_roundtrip_answers_disc_queries(tmp_path):
+    source = tmp_path / "bamako.geojson"
+    source.write_text(json.dumps({"type": "FeatureCollection", "features": FEATURES}))
+    path = str(tmp_path / "osm_index.npz")
+    build_index(str(source), bbox=(12.5, -8.2, 12.8, -7.8)).save(path)
+
+    index = OsmSpatialIndex.load(path)
+
+    assert index.bbox == (12.5, -8.2, 12.8, -7.8)
+    assert index.covers(12.6392, -8.0029, 5000)
+    assert not index.covers(12.6392, -8.0029, 50000)
+    assert sorted(index.candidates(12.6392, -8.0029, 500).ids.tolist()) == [1, 2]
+    assert sorted(index.candidates(12.6392, -8.0029, 10000).ids.tolist()) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_get_osm_data_answers_from_index_without_overpass(tmp_path):
+    path = str(tmp_path / "osm_index.npz")
+    elements, kinds = elements_from_geojson(FEATURES)
+    OsmSpatialIndex.build(elements, kinds=kinds, bbox=(12.5, -8.2, 12.8, -7.8)).save(path)
+
+    with patch("app.services.osm_index.settings.OSM_INDEX_PATH", path), \
+            patch("app.services.overpass_pool.http_request", new_callable=AsyncMock) as mock_request, \
+            patch("app.services.overpass_pool.http_stream") as mock_stream:
+        assert get_osm_index() is not None
+        osm_data = await get_osm_data(12.6392, -8.0029, 1000)
+
+    mock_request.assert_not_called()
+    mock_stream.assert_not_called()
+    assert osm_data["counts"]["maternities"] == 1
+    assert osm_data["counts"]["schools"] == 1
+    assert osm_data["counts"]["residential_buildings"] == 1
+    assert filter_osm_by_radius(osm_data, 12.6392, -8.0029, 1000) == osm_data["counts"]
+
+
+OSC = """<?xml version="1.0" encoding="UTF-8"?>
+<osmChange version="0.6">
+  <create>
+    <node id="10" lat="12.6395" lon="-8.0030"><tag k="amenity" v="clinic"/></node>
+    <way id="11">
+      <nd ref="100" lat="12.6380" lon="-8.0020"/><nd ref="101" lat="12.6382" lon="-8.0022"/>
+      <tag k="building" v="yes"/>
+    </way>
+  </create>
+  <modify>
+    <way id="2"><nd ref="200"/><tag k="amenity" v="kindergarten"/></way>
+  </modify>
+  <delete>
+    <node id="1"/>
+  </delete>
+</osmChange>
+"""
+
+
+def test_change_files_update_index_and_bump_generation(tmp_path):
+    osc = tmp_path / "000123.osc"
+    osc.write_text(OSC)
+    elements, kinds = elements_from_geojson(FEATURES)
+    index = OsmSpatialIndex.build(elements, kinds=kinds, bbox=(12.5, -8.2, 12.8, -7.8))
+
+    changes = parse_osc(str(osc))
+    updated, stats = index.apply_changes(changes)
+
+    assert [(change.action, change.kind, change.osm_id) for change in changes] == [
+        ("create", NODE, 10), ("create", WAY, 11), ("modify", WAY, 2), ("delete", NODE, 1),
+    ]
+    assert stats == {"create": 2, "modify": 1, "delete": 1, "skipped": 0, "unresolved_ways": 0, "outside": 0}
+    assert updated.generation == index.generation + 1
+    rows = {(kind, row[0]): row for kind, row in zip(updated.kinds.tolist(), updated.elements.rows())}
+    assert set(rows) == {(WAY, 2), (NODE, 3), (NODE, 10), (WAY, 11)}
+    # Le way modifié sans coordonnées garde sa position indexée, avec ses nouveaux tags
+    assert rows[(WAY, 2)][1] == pytest.approx(12.6405, abs=1e-6)
+    assert updated.candidates(12.6392, -8.0029, 500).counts()["nurseries"] == 1
+
+
+PLAIN_OSC = """<?xml version="1.0" encoding="UTF-8"?>
+<osmChange version="0.6">
+  <create>
+    <node id="500" lat="12.6300" lon="-8.0100"/>
+    <node id="501" lat="12.6310" lon="-8.0110"/>
+    <way id="20"><nd ref="500"/><nd ref="501"/><tag k="building" v="yes"/></way>
+    <way id="21"><nd ref="1"/><tag k="amenity" v="school"/></way>
+    <way id="22"><nd ref="999"/><tag k="building" v="yes"/></way>
+    <node id="30" lat="48.8566" lon="2.3522"><tag k="amenity" v="hospital"/></node>
+  </create>
+</osmChange>
+"""
+
+
+def test_plain_diff_ways_are_resolved_and_outside_elements_dropped(tmp_path):
+    osc = tmp_path / "000124.osc"
+    osc.write_text(PLAIN_OSC)
+    elements, kinds = elements_from_geojson(FEATURES)
+    index = OsmSpatialIndex.build(elements, kinds=kinds, bbox=(12.5, -8.2, 12.8, -7.8))
+
+    updated, stats = index.apply_changes(parse_osc(str(osc)))
+
+    rows = {(kind, row[0]): row for kind, row in zip(updated.kinds.tolist(), updated.elements.rows())}
+    # Way 20 : nœuds créés dans le même fichier ; way 21 : nœud déjà indexé
+    assert rows[(WAY, 20)][1] == pytest.approx(12.6305, abs=1e-5)
+    assert rows[(WAY, 21)][1] == pytest.approx(12.6392, abs=1e-5)
+    # Way 22 sans nœud connu et hôpital parisien hors de l'emprise : écartés et comptés
+    assert (WAY, 22) not in rows and (NODE, 30) not in rows
+    assert stats["unresolved_ways"] == 1
+    assert stats["outside"] == 1
+    assert len(updated.elements) == len(index.elements) + 2
+
+
+def test_index_update_changes_osm_data_version(tmp_path):
+    path = str(tmp_path / "osm_index.npz")
+    elements, kinds = elements_from_geojson(FEATURES)
+    index = OsmSpatialIndex.build(elements, kinds=kinds, bbox=(12.5, -8.2, 12.8, -7.8))
+    index.save(path)
+
+    with patch("app.services.osm_index.settings.OSM_INDEX_PATH", path):
+        before = osm_data_version()
+        updated, _ = index.apply_changes([])
+        updated.save(path)
+        # Fichier réécrit par l'outil de mise à jour : le processus recharge la nouvelle génération
+        os.utime(path, (1, 1))
+        during = osm_data_version()
+        wait_for_osm_index_reload()
+        after = osm_data_version()
+
+    assert before == index.version
+    assert before.startswith("index-0@")
+    # Rechargement en arrière-plan : l'ancienne génération reste servie jusqu'au remplacement
+    assert during in (index.version, updated.version)
+    assert after == updated.version
+    assert after.startswith("index-1@")
+
+
+def test_full_rebuild_changes_osm_data_version(tmp_path):
+    path = str(tmp_path / "osm_index.npz")
+    elements, kinds = elements_from_geojson(FEATURES)
+    OsmSpatialIndex.build(elements, kinds=kinds, bbox=(12.5, -8.2, 12.8, -7.8)).save(path)
+
+    with patch("app.services.osm_index.settings.OSM_INDEX_PATH", path):
+        before = osm_data_version()
+        # Reconstruction complète (scripts/build_osm_index.py) : la génération repart de 0
+        rebuilt = OsmSpatialIndex.build(elements, kinds=kinds, bbox=(12.5, -8.2, 12.8, -7.8))
+        rebuilt.save(path)
+        os.utime(path, (1, 1))
+        osm_data_version()
+        wait_for_osm_index_reload()
+        after = osm_data_version()
+
+    assert rebuilt.generation == 0
+    assert after == rebuilt.version
+    assert after != before
+
+
+def test_reload_does_not_block_callers(tmp_path):
+    path = str(tmp_path / "osm_index.npz")
+    elements, kinds = elements_from_geojson(FEATURES)
+    index = OsmSpatialIndex.build(elements, kinds=kinds, bbox=(12.5, -8.2, 12.8, -7.8))
+    index.save(path)
+    release = threading.Event()
+    load = OsmSpatialIndex.load
+
+    def slow_load(source):
+        release.wait(5)
+        return load(source)
+
+    with patch("app.services.osm_index.settings.OSM_INDEX_PATH", path):
+        assert get_osm_index().generation == 0
+        index.apply_changes([])[0].save(path)
+        os.utime(path, (1, 1))
+        with patch("app.services.osm_index.OsmSpatialIndex.load", side_effect=slow_load):
+            started = time.monotonic()
+            served = get_osm_index()
+            elapsed = time.monotonic() - started
+            release.set()
+            wait_for_osm_index_reload()
+        reloaded = get_osm_index()
+
+    assert elapsed < 1
+    assert served.generation == 0
+    assert reloaded.generation == 1
+
+
+@pytest.mark.asyncio
+async def test_macro_counts_are_summed_from_index_cells(tmp_path):
+    from app.services.spatial_calculator import get_osm_macro_counts
+
+    path = str(tmp_path / "osm_index.npz")
+    elements, kinds = elements_from_geojson(FEATURES)
+    OsmSpatialIndex.build(elements, kinds=kinds, bbox=(12.5, -8.2, 12.8, -7.8)).save(path)
+
+    with patch("app.services.osm_index.settings.OSM_INDEX_PATH", path), \
+            patch("app.services.overpass_pool.http_request", new_callable=AsyncMock) as mock_request:
+        osm_data = await get_osm_macro_counts(12.6392, -8.0029, 10000)
+
+    mock_request.assert_not_called()
+    assert osm_data["detail"] is False
+    assert len(osm_data["elements"]) == 0
+    assert osm_data["counts"]["maternities"] == 1
+    assert osm_data["counts"]["residential_buildings"] == 2
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services.geodesy import haversine_distances
+from app.services.osm_features import OSM_COUNT_KEYS, OsmElements, rule_hits
+from app.services.osm_tiles import OsmTileStore, decode_tile, encode_tile, tiles_for_disc
+from app.services.overpass_pool import OverpassUnavailableError
+
+OVERPASS_RESPONSE = {
+    "elements": [
+        {"type": "node", "id": 1, "lat": 12.6392, "lon": -8.0029, "tags": {"amenity": "clinic"}},
+        {"type": "way", "id": 2, "center": {"lat": 12.6401, "lon": -8.0031}, "tags": {"building": "yes"}},
+        {"type": "node", "id": 3, "lat": 12.6400, "lon": -8.0030, "tags": {"amenity": "driving_school"}},
+    ]
+}
+
+
+def test_tiles_for_disc_covers_disc_extent():
+    tiles = tiles_for_disc(12.6392, -8.0029, 5000, 0.025)
+
+    assert (505, -321) in tiles
+    assert len(tiles) >= 16
+
+
+def test_tile_encoding_roundtrip():
+    elements = OsmElements([1, 2], [12.6392, 12.6401], [-8.0029, -8.0031], [1, 256])
+
+    assert decode_tile(encode_tile(elements)).rows() == elements.rows()
+    assert decode_tile(encode_tile(OsmElements.empty())).rows() == []
+
+
+@pytest.mark.asyncio
+@patch("app.services.osm_tiles.cache_set", return_value=False)
+@patch("app.services.osm_tiles.cache_get_many", side_effect=lambda keys: [None] * len(keys))
+async def test_repeat_requests_are_served_from_memory(mock_get_many, mock_set, overpass_stream):
+    fake_stream = overpass_stream(OVERPASS_RESPONSE)
+    store = OsmTileStore(tile_degrees=0.025, ttl_seconds=60, max_memory_tiles=64)
+
+    with patch("app.services.overpass_pool.http_stream", fake_stream):
+        first = await store.get_elements(12.6392, -8.0029, 200)
+        second = await store.get_elements(12.6395, -8.0025, 200)
+
+    assert len(fake_stream.calls) == 1
+    # L'élément non classé (driving_school) n'est pas conservé
+    assert sorted(first.ids.tolist()) == [1, 2]
+    assert sorted(second.ids.tolist()) == [1, 2]
+
+
+@pytest.mark.asyncio
+@patch("app.services.osm_tiles.cache_set", return_value=False)
+@patch("app.services.overpass_pool.http_stream")
+async def test_tiles_found_in_redis_skip_overpass(mock_stream, mock_set):
+    store = OsmTileStore(tile_degrees=0.025, ttl_seconds=60, max_memory_tiles=64)
+    payload = encode_tile(OsmElements([1], [12.6392], [-8.0029], [1]))
+
+    with patch("app.services.osm_tiles.cache_get_many", side_effect=lambda keys: [payload] * len(keys)):
+        elements = await store.get_elements(12.6392, -8.0029, 200)
+
+    mock_stream.assert_not_called()
+    el_id, el_lat, el_lon, mask = elements.rows()[0]
+    assert (el_id, mask) == (1, 1)
+    assert el_lat == pytest.approx(12.6392, abs=1e-6)
+    assert el_lon == pytest.approx(-8.0029, abs=1e-6)
+
+
+@pytest.mark.asyncio
+@patch("app.services.osm_tiles.cache_set", return_value=False)
+@patch("app.services.osm_tiles.cache_get_many", side_effect=lambda keys: [None] * len(keys))
+async def test_incomplete_overpass_response_is_not_cached(mock_get_many, mock_set, overpass_stream):
+    partial = {**OVERPASS_RESPONSE, "remark": "runtime error: Query timed out in \"query\" at line 1 after 25 seconds."}
+    store = OsmTileStore(tile_degrees=0.025, ttl_seconds=60, max_memory_tiles=64)
+
+    with patch("app.services.overpass_pool.http_stream", overpass_stream(partial)):
+        with pytest.raises(OverpassUnavailableError):
+            await store.get_elements(12.6392, -8.0029, 200)
+
+    mock_set.assert_not_called()
+    complete = overpass_stream(OVERPASS_RESPONSE)
+    with patch("app.services.overpass_pool.http_stream", complete):
+        elements = await store.get_elements(12.6392, -8.0029, 200)
+
+    # Rien n'a été mémorisé non plus : la tuile est redemandée et complète
+    assert len(complete.calls) == 1
+    assert sorted(elements.ids.tolist()) == [1, 2]
+    mock_set.assert_called()
+
+
+@pytest.mark.asyncio
+@patch("app.services.osm_tiles.cache_set", return_value=False)
+async def test_hanging_redis_does_not_block_the_event_loop(mock_set, overpass_stream):
+    client = MagicMock()
+    # Redis qui ne répond qu'au bout du délai de socket
+    client.mget.side_effect = lambda keys: time.sleep(0.5) or [None] * len(keys)
+    store = OsmTileStore(tile_degrees=0.025, ttl_seconds=60, max_memory_tiles=64)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.02)
+            ticks += 1
+
+    running = asyncio.create_task(ticker())
+    with patch("app.services.redis_cache.get_redis_client", return_value=client), \
+            patch("app.services.overpass_pool.http_stream", overpass_stream(OVERPASS_RESPONSE)):
+        elements = await store.get_elements(12.6392, -8.0029, 200)
+    running.cancel()
+
+    client.mget.assert_called_once()
+    assert sorted(elements.ids.tolist()) == [1, 2]
+    # Les autres coroutines ont continué de tourner pendant l'attente de Redis
+    assert ticks >= 10
+
+
+def _cached_store(elements, radius):
+    """Store dont la mémoire contient les tuiles du disque de `radius` autour de Bamako, comme après une récupération Overpass."""
+    store = OsmTileStore(tile_degrees=0.025, ttl_seconds=60, max_memory_tiles=1024)
+    rows = np.floor(elements.lats.astype(np.float64) / 0.025).astype(np.int64)
+    cols = np.floor(elements.lons.astype(np.float64) / 0.025).astype(np.int64)
+    for tile in tiles_for_disc(12.6392, -8.0029, radius, 0.025):
+        store._put_memory(tile, elements[(rows == tile[0]) & (cols == tile[1])])
+    return store
+
+
+@pytest.mark.asyncio
+async def test_disc_counts_use_the_h3_pyramid_of_cached_tiles():
+    rng = np.random.default_rng(3)
+    count = 5000
+    elements = OsmElements(
+        np.arange(count),
+        12.6392 + rng.uniform(-0.06, 0.06, count),
+        -8.0029 + rng.uniform(-0.06, 0.06, count),
+        rng.choice([1, 2, 4, 8, 16, 256], count),
+    )
+    store = _cached_store(elements, 3000)
+    near = haversine_distances(12.6392, -8.0029, elements.lats.astype(np.float64), elements.lons.astype(np.float64)) <= 3000
+
+    with patch("app.services.osm_tiles.cache_get_many", side_effect=lambda keys: [None] * len(keys)):
+        counts = await store.cached_counts_within(12.6392, -8.0029, 3000)
+        # Une tuile du disque absente du cache : pas de décompte partiel
+        missing = await store.cached_counts_within(12.6392, -8.0029, 9000)
+
+    assert counts == dict(zip(OSM_COUNT_KEYS, rule_hits(elements.masks)[near].sum(axis=0).tolist()))
+    assert missing is None
+
+
+@pytest.mark.asyncio
+async def test_macro_counts_skip_overpass_when_tiles_are_cached():
+    from app.services.spatial_calculator import get_osm_macro_counts
+
+    store = _cached_store(OsmElements([1, 2], [12.6392, 12.6401], [-8.0029, -8.0031], [1, 256]), 1000)
+    with patch("app.services.spatial_calculator.get_osm_index", return_value=None), \
+            patch("app.services.spatial_calculator.osm_tile_store", store), \
+            patch("app.services.osm_tiles.cache_get_many", side_effect=lambda keys: [None] * len(keys)), \
+            patch("app.services.spatial_calculator.overpass_pool") as pool:
+        osm = await get_osm_macro_counts(12.6392, -8.0029, 1000)
+
+    pool.fetch_json.assert_not_called()
+    assert osm["detail"] is False
+    assert osm["counts"]["health_centers"] == 1
+    assert osm["counts"]["residential_buildings"] == 1
@@ -0,0 +1,101 @@
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from app.services.osm_features import OsmElements
+from app.services.overpass_pool import OverpassPool, OverpassUnavailableError, keep_inside, split_bbox
+
+MIRRORS = ["https://a.example/api/interpreter", "https://b.example/api/interpreter"]
+PAYLOAD = {"elements": [{"type": "node", "id": 1, "lat": 12.6392, "lon": -8.0029, "tags": {"amenity": "clinic"}}]}
+
+
+def _rate_limited_stream(overpass_stream, failing_url):
+    """`http_stream` dont un miroir répond 429 et l'autre la réponse Overpass."""
+    ok_stream = overpass_stream(PAYLOAD)
+    urls = []
+
+    @asynccontextmanager
+    async def fake_stream(method, url, **kwargs):
+        urls.append(url)
+        if url == failing_url:
+            request = httpx.Request(method, url)
+            response = httpx.Response(429, headers={"Retry-After": "120"}, request=request)
+            raise httpx.HTTPStatusError("429 Too Many Requests", request=request, response=response)
+        async with ok_stream(method, url, **kwargs) as response:
+            yield response
+
+    fake_stream.urls = urls
+    return fake_stream
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_mirror_fails_over_and_is_quarantined(overpass_stream):
+    pool = OverpassPool(MIRRORS, cooldown_seconds=30, max_cooldown_seconds=600)
+    fake_stream = _rate_limited_stream(overpass_stream, MIRRORS[0])
+
+    with patch("app.services.overpass_pool.http_stream", fake_stream):
+        first = await pool.fetch_elements("[out:json];")
+        second = await pool.fetch_elements("[out:json];")
+
+    assert first.ids.tolist() == second.ids.tolist() == [1]
+    # Le miroir en quarantaine n'est plus essayé en premier
+    assert fake_stream.urls == [MIRRORS[0], MIRRORS[1], MIRRORS[1]]
+    health = {entry["url"]: entry for entry in pool.health()}
+    assert health[MIRRORS[0]]["failures"] == 1
+    assert health[MIRRORS[0]]["cooldown_remaining"] > 60  # Retry-After respecté
+
+
+@pytest.mark.asyncio
+async def test_all_mirrors_failing_marks_osm_data_degraded():
+    from app.services.spatial_calculator import get_osm_data
+
+    @asynccontextmanager
+    async def failing_stream(method, url, **kwargs):
+        raise httpx.ConnectTimeout("timeout")
+        yield MagicMock()
+
+    pool = OverpassPool(MIRRORS, cooldown_seconds=30, max_cooldown_seconds=600)
+    with patch("app.services.spatial_calculator.settings.OSM_TILE_CACHE_ENABLED", False), \
+            patch("app.services.spatial_calculator.overpass_pool", pool), \
+            patch("app.services.overpass_pool.http_stream", failing_stream):
+        osm_data = await get_osm_data(12.6392, -8.0029, 500)
+
+        with pytest.raises(OverpassUnavailableError):
+            await pool.fetch_elements("[out:json];")
+
+    assert osm_data["degraded"] is True
+    assert len(osm_data["elements"]) == 0
+    assert all(entry["failures"] >= 1 for entry in pool.health())
+
+
+def test_split_bbox_tiles_the_area_without_overlap():
+    bbox = (12.60, -8.05, 12.70, -7.95)
+    cells = split_bbox(bbox, 4000)
+
+    assert len(cells) == 9
+    assert min(cell[0] for cell in cells) == bbox[0]
+    assert max(cell[2] for cell in cells) == bbox[2]
+    assert max(cell[3] for cell in cells) == bbox[3]
+
+    # Un élément sur une frontière commune (ou sur le bord extérieur) n'est gardé qu'une fois
+    elements = OsmElements([1, 2], [cells[0][2], bbox[2]], [cells[0][3], bbox[3]], [1, 1])
+    kept = [keep_inside(elements, cell, bbox).ids.tolist() for cell in cells]
+    assert sorted(sum(kept, [])) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_large_radius_is_split_into_parallel_sub_queries(overpass_stream):
+    from app.services.spatial_calculator import get_osm_data
+
+    fake_stream = overpass_stream(PAYLOAD)
+    with patch("app.services.spatial_calculator.settings.OSM_TILE_CACHE_ENABLED", False), \
+            patch("app.services.overpass_pool.settings.OVERPASS_SPLIT_CELL_METERS", 4000), \
+            patch("app.services.overpass_pool.http_stream", fake_stream):
+        osm_data = await get_osm_data(12.6392, -8.0029, 5000)
+
+    assert len(fake_stream.calls) > 1
+    # L'élément renvoyé par chaque sous-requête n'est compté qu'une fois
+    assert osm_data["elements"].ids.tolist() == [1]
+    assert osm_data["counts"]["health_centers"] == 1
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from app.services.overpass_stream import OverpassElementParser, OverpassStreamError, read_overpass_elements
+
+ELEMENTS = [
+    {"type": "node", "id": 1, "lat": 12.6392, "lon": -8.0029, "tags": {"amenity": "clinic", "name": "Centre [Nord], \"A\""}},
+    {"type": "way", "id": 2, "center": {"lat": 12.6393, "lon": -8.0028}, "tags": {"building": "yes"}},
+    {"type": "node", "id": 3, "lat": 12.6394, "lon": -8.0027, "tags": {"shop": "bakery"}},
+]
+DOCUMENT = json.dumps(
+    {"version": 0.6, "osm3s": {"timestamp_osm_base": "2024-01-01T00:00:00Z"}, "elements": ELEMENTS, "remark": "runtime error: Query timed out"},
+    indent=1,
+)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64, len(DOCUMENT)])
+def test_parser_yields_every_element_whatever_the_chunking(chunk_size):
+    parser = OverpassElementParser()
+
+    parsed = []
+    for start in range(0, len(DOCUMENT), chunk_size):
+        parsed.extend(parser.feed(DOCUMENT[start:start + chunk_size]))
+    parser.close()
+
+    assert parsed == ELEMENTS
+    assert parser.remark == "runtime error: Query timed out"
+
+
+def test_truncated_response_is_rejected():
+    parser = OverpassElementParser()
+    list(parser.feed(DOCUMENT[: len(DOCUMENT) // 2]))
+
+    with pytest.raises(OverpassStreamError):
+        parser.close()
+
+
+async def _chunks(document, size=16):
+    for start in range(0, len(document), size):
+        yield document[start:start + size]
+
+
+@pytest.mark.asyncio
+async def test_stream_feeds_compact_element_store():
+    complete = json.dumps({"version": 0.6, "elements": ELEMENTS})
+
+    elements = await read_overpass_elements(_chunks(complete))
+
+    assert elements.ids.tolist() == [1, 2]
+    assert elements.counts()["health_centers"] == 1
+    assert elements.counts()["residential_buildings"] == 1
+
+
+@pytest.mark.asyncio
+async def test_partial_result_with_error_remark_is_rejected():
+    # Délai dépassé côté serveur : tableau fermé après le premier élément, remarque d'erreur à la fin
+    partial = json.dumps({"version": 0.6, "elements": ELEMENTS[:1], "remark": "runtime error: Query run out of memory using about 2048 MB of RAM."})
+
+    with pytest.raises(OverpassStreamError, match="out of memory"):
+        await read_overpass_elements(_chunks(partial))
@@ -0,0 +1,102 @@
+import math
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from app.services.population_raster import PopulationRaster, get_population_raster, population_raster, reset_population_raster
+from app.services.spatial_calculator import calculate_human_impact, calculate_social_vulnerability
+
+ORIGIN = (12.6392, -8.0029)
+PIXEL_DEGREES = 0.001
+PEOPLE_PER_PIXEL = 12.0
+
+
+@pytest.fixture
+def raster_path(tmp_path):
+    """Raster WGS84 de 0,001° (≈ 110 m) centré sur Bamako, population uniforme."""
+    path = str(tmp_path / "population.tif")
+    size = 200
+    transform = from_origin(ORIGIN[1] - size / 2 * PIXEL_DEGREES, ORIGIN[0] + size / 2 * PIXEL_DEGREES, PIXEL_DEGREES, PIXEL_DEGREES)
+    values = np.full((size, size), PEOPLE_PER_PIXEL, dtype=np.float32)
+    values[0, 0] = -99999.0
+    with rasterio.open(
+        path, "w", driver="GTiff", height=size, width=size, count=1, dtype="float32",
+        crs="EPSG:4326", transform=transform, nodata=-99999.0,
+    ) as dataset:
+        dataset.write(values, 1)
+    yield path
+    reset_population_raster()
+
+
+def _pixel_area_m2(lat):
+    meters = PIXEL_DEGREES * math.pi / 180 * 6371000
+    return meters * meters * math.cos(math.radians(lat))
+
+
+@pytest.mark.parametrize("radius", [60, 500, 2000])
+def test_population_within_sums_covered_pixels(raster_path, radius):
+    raster = PopulationRaster(raster_path, subsamples=4)
+
+    expected = PEOPLE_PER_PIXEL * math.pi * radius ** 2 / _pixel_area_m2(ORIGIN[0])
+    assert raster.population_within(*ORIGIN, radius) == pytest.approx(expected, rel=0.05)
+
+    # Un seul tri pour tous les rayons jusqu'à 2 km, échantillonné pour le plus petit
+    radial = raster.radial_population(*ORIGIN, 2000, min_radius=radius)
+    assert radial.within(radius) == pytest.approx(expected, rel=0.05)
+    raster.close()
+
+
+def test_raster_coverage_and_configuration(raster_path):
+    with patch("app.services.population_raster.settings.POPULATION_RASTER_PATH", raster_path):
+        raster = get_population_raster()
+
+    assert raster is not None
+    assert raster.covers(*ORIGIN, 5000)
+    assert not raster.covers(*ORIGIN, 20000)
+
+
+def test_raster_population_replaces_building_estimates():
+    counts = {"residential_buildings": 2, "maternities": 1}
+
+    social = calculate_social_vulnerability(dict(counts), land_use="Inconnu", radius_meters=500, population=650.0)
+    human = calculate_human_impact(counts, estimated_buildings=social["estimated_buildings"], population=650.0)
+
+    assert social["estimated_buildings"] == 100
+    assert social["is_probabilistic"] is True
+    assert human["total_population_exposed"] == 650
+    assert human["maternities_count"] == 1
+
+
+def test_exposure_point_uses_raster_population(raster_path):
+    from app.services.impact_pipeline import exposure_point
+    from app.services.spatial_calculator import RadialCounts
+
+    raster = PopulationRaster(raster_path)
+    radial_counts = RadialCounts.from_osm({"elements": []}, *ORIGIN)
+    population = raster.radial_population(*ORIGIN, 5000, min_radius=500)
+
+    point = exposure_point(radial_counts, "Inconnu", 500, population)
+
+    assert point.human_impact.total_population_exposed == round(population.within(500))
+    assert point.human_impact.total_population_exposed > 0
+    raster.close()
+
+
+def test_replaced_raster_is_closed_after_its_last_reader(raster_path):
+    with patch("app.services.population_raster.settings.POPULATION_RASTER_PATH", raster_path):
+        with population_raster() as old:
+            # Fichier remplacé pendant la lecture : le suivant obtient le nouveau raster
+            stat = os.stat(raster_path)
+            os.utime(raster_path, (stat.st_atime, stat.st_mtime + 10))
+            new = get_population_raster()
+
+            assert new is not old
+            assert not old.closed
+            assert old.population_within(*ORIGIN, 500) > 0
+
+        assert old.closed
+        assert not new.closed
@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+from app.schemas import AnalyzeResponse, DeepSeekResponse
+from app.services.ai_service import _default_response, is_default_response
+from app.services.result_cache import (
+    TAXONOMY_VERSION,
+    get_cached_result,
+    image_digest,
+    result_cache_key,
+    store_result,
+)
+
+RESULT = {
+    "incident_id": "inc-1",
+    "latitude": 12.6392,
+    "longitude": -8.0029,
+    "ai_analysis": {
+        "macro_category": "Déchets & Insalubrité",
+        "sub_category": "Accumulation d'ordures",
+        "source_size_meters": 8.0,
+        "spread_vectors": [],
+        "description": "Tas d'ordures",
+    },
+    "topography": {"elevation": 0.0, "slope_percent": 1.0, "wind_speed": 5.0, "precipitation": 0.0, "temperature_celsius": 30.0},
+    "satellite": {"ndvi": None, "ndwi": None, "land_use": "Inconnu"},
+    "social_data": {"schools": 1},
+    "social_vulnerability_score": 2.5,
+    "is_social_probabilistic": False,
+    "human_impact": {
+        "total_population_exposed": 10,
+        "adult_men_exposed": 3,
+        "adult_women_exposed": 3,
+        "children_exposed": 4,
+        "maternities_count": 0,
+        "nurseries_count": 0,
+    },
+    "impact_radius_meters": 200,
+    "radius_explanation": "Rayon de base",
+    "global_impact_score": 5.0,
+    "base_severity": 5,
+    "impact_tags": ["Déchets"],
+    "geocoding": {"city": "Bamako", "region": "Bamako", "country": "Mali", "display_name": "Bamako"},
+    "recommendation": "Intervention directe",
+}
+
+
+def test_cache_key_depends_on_image_position_and_taxonomy():
+    digest = image_digest(b"image")
+    key = result_cache_key(digest, 12.639200001, -8.0029)
+
+    assert key == result_cache_key(digest, 12.6392, -8.0029)
+    assert key != result_cache_key(image_digest(b"other"), 12.6392, -8.0029)
+    assert key != result_cache_key(digest, 12.6492, -8.0029)
+    assert TAXONOMY_VERSION in key
+
+
+@patch("app.services.result_cache.cache_get")
+def test_cached_result_is_rebound_to_requested_incident(mock_get):
+    mock_get.return_value = AnalyzeResponse(**RESULT).model_dump_json().encode("utf-8")
+
+    cached = get_cached_result("key", incident_id="inc-2")
+
+    assert cached.incident_id == "inc-2"
+    assert cached.global_impact_score == 5.0
+
+
+@patch("app.services.result_cache.cache_set_bounded", return_value=True)
+def test_degraded_or_default_results_are_not_stored(mock_set):
+    assert store_result("key", AnalyzeResponse(**RESULT)) is True
+
+    degraded = AnalyzeResponse(**{**RESULT, "is_degraded": True, "degraded_providers": ["osm"]})
+    assert store_result("key", degraded) is False
+
+    failed_vision = AnalyzeResponse(**{**RESULT, "ai_analysis": _default_response("timeout")})
+    assert store_result("key", failed_vision) is False
+    assert mock_set.call_count == 1
+
+
+def test_default_response_flag_does_not_depend_on_description():
+    default = _default_response("timeout")
+    assert is_default_response(default) is True
+    assert "is_default" not in default.model_dump()
+
+    # Un moteur visuel qui décrit lui-même un échec ne produit pas une réponse par défaut
+    described = DeepSeekResponse(**{**default.model_dump(), "description": default.description})
+    assert is_default_response(described) is False
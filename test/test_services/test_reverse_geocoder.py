@@ -0,0 +1,79 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from shapely.geometry import box, mapping
+
+from app.services.reverse_geocoder import OfflineGeocoder, reverse_geocode_many
+
+
+def _boundary(name, admin_level, bounds):
+    return {"type": "Feature", "properties": {"name": name, "admin_level": str(admin_level)}, "geometry": mapping(box(*bounds))}
+
+
+def _place(name, place, lat, lon):
+    return {"type": "Feature", "properties": {"name": name, "place": place}, "geometry": {"type": "Point", "coordinates": [lon, lat]}}
+
+
+FEATURES = [
+    _boundary("Mali", 2, (-12.0, 10.0, 4.0, 25.0)),
+    _boundary("Bamako", 4, (-8.2, 12.4, -7.8, 12.8)),
+    _boundary("Koulikoro", 4, (-9.0, 12.0, -7.0, 15.0)),
+    _boundary("Commune III", 8, (-8.05, 12.6, -7.98, 12.7)),
+    _place("Bamako", "city", 12.6392, -8.0029),
+    _place("Ségou", "town", 13.4317, -6.2157),
+]
+
+
+def test_bulk_lookup_resolves_nested_boundaries_and_localities():
+    geocoder = OfflineGeocoder(FEATURES)
+
+    bamako, rural, outside = geocoder.reverse_many([12.64, 14.5, 48.85], [-8.0, -8.5, 2.35])
+
+    # La plus petite région contenant le point l'emporte sur Koulikoro qui la recouvre
+    assert bamako == {
+        "city": "Bamako", "region": "Bamako", "country": "Mali", "display_name": "Bamako, Commune III, Mali",
+    }
+    assert rural["city"] == "Zone non habitée"
+    assert rural["region"] == "Koulikoro"
+    assert outside is None
+
+
+@pytest.mark.asyncio
+async def test_geocoding_uses_local_boundaries_and_falls_back_to_nominatim(tmp_path):
+    from app.services.spatial_calculator import get_geocoding_context
+
+    path = tmp_path / "boundaries.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": FEATURES}), encoding="utf-8")
+    response = MagicMock()
+    response.json.return_value = {"address": {"city": "Paris", "country": "France"}, "display_name": "Paris, France"}
+    nominatim = AsyncMock(return_value=response)
+
+    with patch("app.services.reverse_geocoder.settings.GEOCODER_BOUNDARIES_PATH", str(path)), \
+            patch("app.services.spatial_calculator.http_request", nominatim):
+        local = await get_geocoding_context(12.64, -8.0)
+        assert nominatim.call_count == 0
+        remote = await get_geocoding_context(48.85, 2.35)
+
+    assert local["region"] == "Bamako"
+    assert remote["city"] == "Paris"
+    assert nominatim.call_count == 1
+    assert reverse_geocode_many([]) == []
+
+
+
+def test_geocoder_is_loaded_once_at_startup(tmp_path):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services import reverse_geocoder
+
+    path = tmp_path / "boundaries.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": FEATURES}), encoding="utf-8")
+    with patch("app.services.reverse_geocoder.settings.GEOCODER_BOUNDARIES_PATH", str(path)), \
+            patch("app.services.reverse_geocoder.load_geocoder", wraps=reverse_geocoder.load_geocoder) as load:
+        with TestClient(app):
+            assert load.call_count == 1
+        assert reverse_geocode_many([(12.64, -8.0)])[0]["region"] == "Bamako"
+
+    assert load.call_count == 1
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight, coordinate_key
+
+
+def test_coordinate_key_normalizes_nearby_points():
+    assert coordinate_key("weather", 12.639201, -8.002899) == coordinate_key("weather", 12.63924, -8.00286)
+    assert coordinate_key("osm", 12.6392, -8.0029, 5000) != coordinate_key("osm", 12.6392, -8.0029, 8000)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_upstream_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"wind_speed": 5.0}
+
+    key = coordinate_key("weather", 12.6392, -8.0029)
+    results = await asyncio.gather(*(flights.do(key, fetch) for _ in range(5)))
+
+    assert len(calls) == 1
+    assert all(result == {"wind_speed": 5.0} for result in results)
+    assert flights.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_cached():
+    flights = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("Overpass indisponible")
+
+    key = coordinate_key("osm", 12.6392, -8.0029, 5000)
+    results = await asyncio.gather(flights.do(key, failing), flights.do(key, failing), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(calls) == 1
+
+    with pytest.raises(RuntimeError):
+        await flights.do(key, failing)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_abandoned_caller_does_not_cancel_shared_call():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    key = coordinate_key("satellite", 12.6392, -8.0029)
+    impatient = asyncio.create_task(asyncio.wait_for(flights.do(key, fetch), 0.01))
+    patient = asyncio.create_task(flights.do(key, fetch))
+
+    with pytest.raises(asyncio.TimeoutError):
+        await impatient
+    assert await patient == "ok"
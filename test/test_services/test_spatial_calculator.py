@@ -1,3 +1,5 @@
+import pytest
+
 from app.services.spatial_calculator import (
     calculate_human_impact,
     calculate_social_vulnerability,
@@ -39,3 +41,142 @@ def test_probabilistic_human_impact_changes_with_radius():
 
     assert small_human["total_population_exposed"] != 975
     assert large_human["total_population_exposed"] > small_human["total_population_exposed"]
+
+
+def test_filter_osm_by_radius_counts_raw_and_compact_elements_alike():
+    from app.services.osm_features import compact_element
+    from app.services.spatial_calculator import filter_osm_by_radius
+
+    raw_elements = [
+        {"type": "node", "id": 1, "lat": 12.6392, "lon": -8.0029, "tags": {"amenity": "maternity"}},
+        {"type": "way", "id": 2, "center": {"lat": 12.6393, "lon": -8.0028}, "tags": {"amenity": "kindergarten", "building": "yes"}},
+        {"type": "node", "id": 3, "lat": 12.6394, "lon": -8.0027, "tags": {"amenity": "drinking_water", "man_made": "water_well"}},
+        {"type": "way", "id": 4, "center": {"lat": 12.6395, "lon": -8.0026}, "tags": {"building": "no"}},
+        {"type": "way", "id": 5, "center": {"lat": 12.7000, "lon": -8.0026}, "tags": {"building": "yes"}},
+    ]
+    compact_elements = [el for el in map(compact_element, raw_elements) if el is not None]
+
+    raw_counts = filter_osm_by_radius({"elements": raw_elements}, 12.6392, -8.0029, 100)
+    compact_counts = filter_osm_by_radius({"elements": compact_elements}, 12.6392, -8.0029, 100)
+
+    assert raw_counts == compact_counts
+    assert raw_counts["health_centers"] == 1
+    assert raw_counts["maternities"] == 1
+    assert raw_counts["schools"] == 1
+    assert raw_counts["nurseries"] == 1
+    assert raw_counts["water_points"] == 2
+    assert raw_counts["residential_buildings"] == 1
+
+
+def test_count_osm_by_radii_matches_one_pass_per_radius():
+    from app.services.osm_features import OsmElements
+    from app.services.spatial_calculator import count_osm_by_radii, filter_osm_by_radius, haversine_distances
+
+    elements = [
+        {"type": "node", "id": 1, "lat": 12.6392, "lon": -8.0029, "tags": {"amenity": "clinic"}},
+        {"type": "way", "id": 2, "center": {"lat": 12.6400, "lon": -8.0029}, "tags": {"building": "house"}},
+        {"type": "way", "id": 3, "center": {"lat": 12.6450, "lon": -8.0029}, "tags": {"amenity": "school", "building": "yes"}},
+        {"type": "node", "id": 4, "lat": 12.6600, "lon": -8.0029, "tags": {"amenity": "drinking_water", "man_made": "water_well"}},
+        {"type": "way", "id": 5, "tags": {"building": "yes"}},
+    ]
+    osm_data = {"elements": elements}
+    # Rayon passant exactement par l'école, mesuré sur les coordonnées stockées (float32)
+    school = OsmElements.from_overpass([elements[2]])
+    boundary = float(haversine_distances(12.6392, -8.0029, school.lats.astype(float), school.lons.astype(float))[0])
+    # 1 m : la clinique est sur le point d'incident, à la précision float32 près (~0.1 m)
+    radii = [1, 50, 100, boundary, 1000, 5000]
+
+    multi = count_osm_by_radii(osm_data, 12.6392, -8.0029, radii)
+
+    assert multi == [filter_osm_by_radius(osm_data, 12.6392, -8.0029, radius) for radius in radii]
+    assert multi[0]["health_centers"] == 1
+    assert multi[2]["residential_buildings"] == 1
+    assert multi[3]["schools"] == 1
+    assert multi[-1]["water_points"] == 2
+    assert multi[-1]["residential_buildings"] == 2
+
+
+def test_vectorized_counts_match_per_element_loop():
+    import random
+
+    from app.services.osm_features import add_mask_to_counts, classify_osm_tags, empty_osm_counts
+    from app.services.spatial_calculator import RadialCounts, haversine_distance
+
+    rng = random.Random(7)
+    tags_pool = [
+        {"building": "yes"},
+        {"amenity": "hospital"},
+        {"amenity": "maternity", "building": "yes"},
+        {"amenity": "kindergarten"},
+        {"amenity": "marketplace"},
+        {"amenity": "water_point", "man_made": "water_tap"},
+        {"highway": "primary"},
+        {"building": "no"},
+    ]
+    elements = [
+        {"type": "node", "id": i, "lat": 12.6392 + rng.uniform(-0.04, 0.04), "lon": -8.0029 + rng.uniform(-0.04, 0.04), "tags": rng.choice(tags_pool)}
+        for i in range(2000)
+    ]
+    radial = RadialCounts.from_osm({"elements": elements}, 12.6392, -8.0029)
+
+    for radius in (150, 1000, 3333.3):
+        expected = empty_osm_counts()
+        for el in elements:
+            if haversine_distance(12.6392, -8.0029, el["lat"], el["lon"]) <= radius:
+                add_mask_to_counts(expected, classify_osm_tags(el["tags"]))
+        assert radial.counts_within(radius) == expected
+
+
+@pytest.mark.asyncio
+async def test_get_osm_data_keeps_classified_elements_as_columns(overpass_stream):
+    from unittest.mock import patch
+
+    from app.services.osm_features import MATERNITY, OsmElements
+    from app.services.spatial_calculator import get_osm_data
+
+    payload = {
+        "version": 0.6,
+        "osm3s": {"copyright": "The data included in this document is from www.openstreetmap.org."},
+        "elements": [
+            {"type": "node", "id": 1, "lat": 12.6392, "lon": -8.0029, "tags": {"amenity": "maternity", "name": "CSRef"}},
+            {"type": "way", "id": 2, "center": {"lat": 12.6393, "lon": -8.0028}, "tags": {"building": "yes", "roof:shape": "flat"}},
+            {"type": "node", "id": 3, "lat": 12.6394, "lon": -8.0027, "tags": {"shop": "bakery"}},
+        ]
+    }
+    with patch("app.services.spatial_calculator.settings.OSM_TILE_CACHE_ENABLED", False), \
+            patch("app.services.overpass_pool.http_stream", overpass_stream(payload)):
+        osm_data = await get_osm_data(12.6392, -8.0029, 500)
+
+    elements = osm_data["elements"]
+    assert isinstance(elements, OsmElements)
+    assert elements.ids.tolist() == [1, 2]
+    assert elements.masks[0] == MATERNITY
+    assert osm_data["counts"]["maternities"] == 1
+    assert osm_data["counts"]["residential_buildings"] == 1
+    assert OsmElements.from_bytes(elements.to_bytes()).rows() == elements.rows()
+
+
+@pytest.mark.asyncio
+async def test_get_osm_macro_counts_reads_out_count_results():
+    from unittest.mock import AsyncMock, MagicMock, patch
+
+    from app.services.osm_features import OSM_COUNT_KEYS
+    from app.services.spatial_calculator import get_osm_macro_counts
+
+    response = MagicMock()
+    response.json.return_value = {
+        "elements": [
+            {"type": "count", "id": 0, "tags": {"nodes": "1", "ways": str(index), "total": str(index + 1)}}
+            for index in range(len(OSM_COUNT_KEYS))
+        ]
+    }
+    with patch("app.services.overpass_pool.http_request", new_callable=AsyncMock, return_value=response) as mock_request:
+        osm_data = await get_osm_macro_counts(12.6392, -8.0029, 5000)
+
+    query = mock_request.await_args.kwargs["data"]["data"]
+    assert query.count("out count;") == len(OSM_COUNT_KEYS)
+    assert "out center" not in query
+    assert osm_data["detail"] is False
+    assert len(osm_data["elements"]) == 0
+    assert osm_data["counts"]["health_centers"] == 1
+    assert osm_data["counts"]["residential_buildings"] == len(OSM_COUNT_KEYS)
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from app.services.stage_graph import Stage, StageCache, StageGraph
+
+
+def test_graph_rejects_cycles_and_unknown_inputs():
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", lambda b: b, ("b",)), Stage("b", lambda a: a, ("a",))])
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", lambda x: x, ("x",))])
+
+
+@pytest.mark.asyncio
+async def test_independent_stages_run_concurrently():
+    both_started = asyncio.Event()
+    started = []
+
+    async def provider(name):
+        started.append(name)
+        if len(started) == 2:
+            both_started.set()
+        # Chaque étape attend que l'autre ait démarré : impossible si elles s'exécutaient en série
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+        return name
+
+    graph = StageGraph(
+        [
+            Stage("left", lambda point: provider("left"), ("point",)),
+            Stage("right", lambda point: provider("right"), ("point",)),
+            Stage("total", lambda left, right: f"{left}+{right}", ("left", "right")),
+        ],
+        initial_inputs=("point",),
+    )
+
+    values = await graph.run({"point": (12.6, -8.0)})
+
+    assert values["total"] == "left+right"
+
+
+@pytest.mark.asyncio
+async def test_precomputed_stages_and_targets_skip_work():
+    calls = []
+
+    def stage(name):
+        def run(**inputs):
+            calls.append(name)
+            return name
+        return run
+
+    graph = StageGraph(
+        [
+            Stage("a", stage("a"), ("seed",)),
+            Stage("b", stage("b"), ("a",)),
+            Stage("c", stage("c"), ("seed",)),
+        ],
+        initial_inputs=("seed",),
+    )
+
+    values = await graph.run({"seed": 1, "a": "given"}, targets=("b",))
+
+    assert calls == ["b"]
+    assert values["b"] == "b"
+    assert "c" not in values
+
+
+@pytest.mark.asyncio
+async def test_stage_cache_reuses_results():
+    calls = []
+
+    def lookup(point):
+        calls.append(point)
+        return f"lieu {point}"
+
+    cache = StageCache(ttl_seconds=60)
+    graph = StageGraph(
+        [Stage("place", lookup, ("point",), cache=cache, cache_key=lambda point: point)],
+        initial_inputs=("point",),
+    )
+
+    await graph.run({"point": 1})
+    values = await graph.run({"point": 1})
+
+    assert values["place"] == "lieu 1"
+    assert calls == [1]
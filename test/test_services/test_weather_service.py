@@ -0,0 +1,68 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from app.services.weather_service import WeatherService
+
+
+def _response(payload):
+    response = MagicMock()
+    response.json.return_value = payload
+    return response
+
+
+def _current(temperature):
+    return {"current": {"temperature_2m": temperature, "precipitation": 0.0, "wind_speed_10m": 3.0}}
+
+
+@pytest.mark.asyncio
+async def test_burst_is_fetched_in_one_multi_location_request():
+    service = WeatherService(cell_degrees=0.1, bucket_seconds=900, batch_window=0.01, max_batch=50)
+    request = AsyncMock(return_value=_response([_current(30.0), _current(20.0)]))
+
+    with patch("app.services.weather_service.http_request", request):
+        # Deux points de Bamako (même cellule) et un de Mopti
+        results = await asyncio.gather(
+            service.get(12.6392, -8.0029), service.get(12.6395, -8.0021), service.get(14.4936, -4.1897),
+        )
+        cached = await service.get(12.6301, -8.0099)
+
+    request.assert_called_once()
+    url = request.call_args.args[1]
+    assert "latitude=12.65,14.45" in url and "longitude=-8.05,-4.15" in url
+    assert [result["temperature_celsius"] for result in results] == [30.0, 30.0, 20.0]
+    assert cached["temperature_celsius"] == 30.0
+
+
+@pytest.mark.asyncio
+async def test_cell_is_fetched_again_in_the_next_time_bucket():
+    service = WeatherService(cell_degrees=0.1, bucket_seconds=900, batch_window=0.0, max_batch=50)
+    request = AsyncMock(side_effect=[_response(_current(30.0)), _response(_current(32.0))])
+    clock = MagicMock(return_value=1000.0)
+
+    with patch("app.services.weather_service.http_request", request), \
+            patch("app.services.weather_service.time.time", clock):
+        first = await service.get(12.6392, -8.0029)
+        clock.return_value = 1000.0 + 900
+        second = await service.get(12.6392, -8.0029)
+
+    assert request.call_count == 2
+    assert (first["temperature_celsius"], second["temperature_celsius"]) == (30.0, 32.0)
+
+
+@pytest.mark.asyncio
+async def test_failed_request_falls_back_to_defaults_without_caching():
+    from app.services.spatial_calculator import DEFAULT_WEATHER, get_weather_data
+
+    service = WeatherService(cell_degrees=0.1, bucket_seconds=900, batch_window=0.0, max_batch=50)
+    request = AsyncMock(side_effect=[httpx.ConnectTimeout("timeout"), _response(_current(30.0))])
+
+    with patch("app.services.spatial_calculator.weather_service", service), \
+            patch("app.services.weather_service.http_request", request):
+        degraded = await get_weather_data(12.6392, -8.0029)
+        recovered = await get_weather_data(12.6392, -8.0029)
+
+    assert degraded == {**DEFAULT_WEATHER, "degraded": True}
+    assert recovered["temperature_celsius"] == 30.0
@@ -0,0 +1,79 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas import DeepSeekResponse
+
+client = TestClient(app)
+
+AI_DATA = DeepSeekResponse(
+    macro_category="Déchets & Insalubrité",
+    sub_category="Accumulation d'ordures",
+    source_size_meters=8.0,
+    spread_vectors=[],
+    description="Tas d'ordures",
+)
+
+
+def _parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@patch("app.services.impact_pipeline.get_geocoding_context", new_callable=AsyncMock, return_value={"city": "Bamako", "region": "Bamako", "country": "Mali", "display_name": "Bamako"})
+@patch("app.services.impact_pipeline.get_weather_data", new_callable=AsyncMock, return_value={"temperature_celsius": 30.0, "precipitation": 0.0, "wind_speed": 5.0})
+@patch("app.services.impact_pipeline.get_satellite_analysis", return_value={"ndvi": None, "ndwi": None, "land_use": "Inconnu"})
+@patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value={"counts": {"residential_buildings": 0}, "elements": []})
+@patch("app.services.impact_pipeline.get_slope_data", new_callable=AsyncMock, return_value={"elevation": 350.0, "slope_percent": 1.0})
+@patch("app.services.impact_pipeline.analyze_image_with_gemini", new_callable=AsyncMock, return_value=AI_DATA)
+def test_stream_emits_one_event_per_stage_then_result(*mocks):
+    response = client.post(
+        "/analyze/stream",
+        json={"image_url": "http://example.com/a.jpg", "latitude": 12.6392, "longitude": -8.0029, "incident_id": "a"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_events(response.text)
+    names = [name for name, _ in events]
+    assert set(names[:6]) == {"classification", "slope", "osm", "satellite", "weather", "geocoding"}
+    assert names[6] == "radius"
+    assert set(names[7:9]) == {"human_impact", "score"}
+    assert names[9:] == ["result"]
+    data = dict(events)
+    assert data["classification"]["sub_category"] == "Accumulation d'ordures"
+    assert data["osm"] == {"counts": {"residential_buildings": 0}}
+    assert data["result"]["incident_id"] == "a"
+    for section in ("radius", "human_impact", "score"):
+        assert data[section] == {key: data["result"][key] for key in data[section]}
+
+
+async def _slow_geocoding(*args, **kwargs):
+    await asyncio.sleep(0.3)
+    return {"city": "Bamako", "region": "Bamako", "country": "Mali", "display_name": "Bamako"}
+
+
+@patch("app.services.impact_pipeline.get_geocoding_context", side_effect=_slow_geocoding)
+@patch("app.services.impact_pipeline.get_weather_data", new_callable=AsyncMock, return_value={"temperature_celsius": 30.0, "precipitation": 0.0, "wind_speed": 5.0})
+@patch("app.services.impact_pipeline.get_satellite_analysis", return_value={"ndvi": None, "ndwi": None, "land_use": "Inconnu"})
+@patch("app.services.impact_pipeline.get_osm_data", new_callable=AsyncMock, return_value={"counts": {"residential_buildings": 0}, "elements": []})
+@patch("app.services.impact_pipeline.get_slope_data", new_callable=AsyncMock, return_value={"elevation": 350.0, "slope_percent": 1.0})
+@patch("app.services.impact_pipeline.analyze_image_with_gemini", new_callable=AsyncMock, return_value=AI_DATA)
+def test_sections_are_emitted_before_slow_stages_finish(*mocks):
+    # Le géocodage n'alimente que la réponse finale : rayon, impact et score ne l'attendent pas
+    response = client.post(
+        "/analyze/stream",
+        json={"image_url": "http://example.com/a.jpg", "latitude": 12.6393, "longitude": -8.0028, "incident_id": "b"},
+    )
+
+    names = [name for name, _ in _parse_events(response.text)]
+    assert names.index("radius") < names.index("geocoding")
+    assert names.index("human_impact") < names.index("geocoding")
+    assert names.index("score") < names.index("geocoding")
+    assert names[-1] == "result"
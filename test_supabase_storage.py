@@ -3,6 +3,7 @@
 Test script for Supabase storage functionality.
 """
 
+import asyncio
 import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
@@ -27,12 +28,12 @@ def test_supabase_upload():
     test_image_data = create_test_image()
     
     # Test upload
-    upload_url = upload_file_to_supabase(
+    upload_url = asyncio.run(upload_file_to_supabase(
         file_data=test_image_data,
         file_name="test_upload.png",
         bucket="images",
         content_type="image/png"
-    )
+    ))
     
     if upload_url:
         print(f"✅ Upload successful! URL: {upload_url}")
@@ -45,7 +46,7 @@ def test_signed_url(file_path):
     """Test creating a signed URL."""
     print(f"Testing signed URL creation for: {file_path}")
     
-    signed_url = create_signed_url(file_path, bucket="images", expires_in=3600)
+    signed_url = asyncio.run(create_signed_url(file_path, bucket="images", expires_in=3600))
     
     if signed_url:
         print(f"✅ Signed URL created: {signed_url}")